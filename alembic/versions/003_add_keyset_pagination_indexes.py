@@ -0,0 +1,39 @@
+"""Add composite (created_at, id) indexes for keyset pagination.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-02-05
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_sessions_created_at_id', 'sessions', ['created_at', 'id'])
+    op.create_index('idx_manuals_created_at_id', 'manuals', ['created_at', 'id'])
+
+    # Extend the transcript index with id as a tiebreaker
+    op.drop_index('idx_messages_created_at', table_name='conversation_messages')
+    op.create_index(
+        'idx_messages_created_at',
+        'conversation_messages',
+        ['session_uuid', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_messages_created_at', table_name='conversation_messages')
+    op.create_index(
+        'idx_messages_created_at',
+        'conversation_messages',
+        ['session_uuid', 'created_at']
+    )
+
+    op.drop_index('idx_manuals_created_at_id', table_name='manuals')
+    op.drop_index('idx_sessions_created_at_id', table_name='sessions')
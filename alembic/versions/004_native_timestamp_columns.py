@@ -0,0 +1,60 @@
+"""Convert ISO string timestamps to native timestamptz columns.
+
+Existing values are backfilled in place: every stored value is an ISO-8601
+string with a UTC offset, which Postgres parses directly with a
+`::timestamptz` cast inside the `ALTER COLUMN ... USING` clause.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-02-12
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+TIMESTAMP_COLUMNS = {
+    'manuals': ['created_at', 'updated_at'],
+    'manual_steps': ['created_at'],
+    'sessions': ['started_at', 'ended_at', 'last_activity_at', 'created_at', 'updated_at'],
+    'conversation_messages': ['created_at'],
+    'progress_events': ['created_at'],
+    'webhook_queue': ['created_at', 'last_attempt_at', 'next_retry_at'],
+}
+
+
+def upgrade() -> None:
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        clauses = ', '.join(
+            f'ALTER COLUMN {column} TYPE TIMESTAMP WITH TIME ZONE '
+            f'USING {column}::timestamptz'
+            for column in columns
+        )
+        op.execute(f'ALTER TABLE {table} {clauses}')
+
+    # Range-scan indexes for cleanup, analytics and activity windows
+    op.create_index('idx_sessions_status_last_activity', 'sessions', ['status', 'last_activity_at'])
+    op.create_index('idx_sessions_status_ended_at', 'sessions', ['status', 'ended_at'])
+    op.create_index('idx_progress_events_created_at', 'progress_events', ['created_at'])
+    op.create_index('idx_messages_time', 'conversation_messages', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_messages_time', table_name='conversation_messages')
+    op.drop_index('idx_progress_events_created_at', table_name='progress_events')
+    op.drop_index('idx_sessions_status_ended_at', table_name='sessions')
+    op.drop_index('idx_sessions_status_last_activity', table_name='sessions')
+
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        clauses = ', '.join(
+            f'ALTER COLUMN {column} TYPE VARCHAR(50) '
+            f"USING to_char({column} AT TIME ZONE 'UTC', "
+            f"'YYYY-MM-DD\"T\"HH24:MI:SS.US\"+00:00\"')"
+            for column in columns
+        )
+        op.execute(f'ALTER TABLE {table} {clauses}')
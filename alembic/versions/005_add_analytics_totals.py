@@ -0,0 +1,60 @@
+"""Add analytics_totals rollup table.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-02-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analytics_totals',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('sessions_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('sessions_active', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('sessions_completed', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('sessions_abandoned', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('manuals_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('messages_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('completed_duration_seconds', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('completed_duration_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('reconciled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.CheckConstraint('id = 1', name='check_analytics_totals_single_row'),
+    )
+
+    # Seed the rollup from existing data
+    op.execute("""
+        INSERT INTO analytics_totals (
+            id, sessions_total, sessions_active, sessions_completed, sessions_abandoned,
+            manuals_total, messages_total, completed_duration_seconds,
+            completed_duration_count, updated_at, reconciled_at
+        )
+        SELECT
+            1,
+            (SELECT count(*) FROM sessions),
+            (SELECT count(*) FROM sessions WHERE status = 'active'),
+            (SELECT count(*) FROM sessions WHERE status = 'completed'),
+            (SELECT count(*) FROM sessions WHERE status = 'abandoned'),
+            (SELECT count(*) FROM manuals),
+            (SELECT count(*) FROM conversation_messages),
+            (SELECT coalesce(sum(extract(epoch FROM ended_at - started_at)), 0)
+               FROM sessions WHERE status = 'completed' AND ended_at IS NOT NULL),
+            (SELECT count(*) FROM sessions WHERE status = 'completed' AND ended_at IS NOT NULL),
+            now(),
+            now()
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('analytics_totals')
@@ -0,0 +1,69 @@
+"""Add activity_rollups time-bucket table.
+
+Existing history is backfilled into minute and hour buckets from the
+source tables.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-02-26
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'activity_rollups',
+        sa.Column('granularity', sa.String(10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('new_sessions', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('completed_sessions', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('progress_updates', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('messages', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('granularity', 'bucket_start'),
+        sa.CheckConstraint(
+            "granularity IN ('minute', 'hour')",
+            name='check_activity_rollup_granularity'
+        ),
+    )
+
+    # Backfill buckets from existing events
+    for granularity in ('minute', 'hour'):
+        op.execute(f"""
+            INSERT INTO activity_rollups (
+                granularity, bucket_start, new_sessions, completed_sessions,
+                progress_updates, messages
+            )
+            SELECT
+                '{granularity}',
+                bucket AT TIME ZONE 'UTC',
+                sum(new_sessions), sum(completed_sessions),
+                sum(progress_updates), sum(messages)
+            FROM (
+                SELECT date_trunc('{granularity}', created_at AT TIME ZONE 'UTC') AS bucket,
+                       1 AS new_sessions, 0 AS completed_sessions,
+                       0 AS progress_updates, 0 AS messages
+                FROM sessions
+                UNION ALL
+                SELECT date_trunc('{granularity}', ended_at AT TIME ZONE 'UTC'), 0, 1, 0, 0
+                FROM sessions WHERE status = 'completed' AND ended_at IS NOT NULL
+                UNION ALL
+                SELECT date_trunc('{granularity}', created_at AT TIME ZONE 'UTC'), 0, 0, 1, 0
+                FROM progress_events
+                UNION ALL
+                SELECT date_trunc('{granularity}', created_at AT TIME ZONE 'UTC'), 0, 0, 0, 1
+                FROM conversation_messages
+            ) AS events
+            GROUP BY bucket
+        """)
+
+
+def downgrade() -> None:
+    op.drop_table('activity_rollups')
@@ -0,0 +1,102 @@
+"""Add step_funnel table and sessions.step_started_at.
+
+The funnel is backfilled from existing progress events; step_started_at is
+backfilled with the session's last completed step, or its start time.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-03-04
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'sessions',
+        sa.Column('step_started_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    op.execute("""
+        UPDATE sessions SET step_started_at = coalesce(
+            (SELECT max(p.created_at) FROM progress_events p
+             WHERE p.session_uuid = sessions.id AND p.processed),
+            started_at
+        )
+    """)
+
+    op.create_table(
+        'step_funnel',
+        sa.Column('manual_uuid', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('step_number', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('completions', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('drop_offs', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('time_histogram', postgresql.ARRAY(sa.BigInteger()), nullable=False),
+        sa.PrimaryKeyConstraint('manual_uuid', 'step_number'),
+        sa.ForeignKeyConstraint(['manual_uuid'], ['manuals.id'], ondelete='CASCADE'),
+    )
+
+    # Backfill from existing events (time-on-step histogram buckets are
+    # 5, 10, 15, 30, 45, 60, 90, 120, 180, 300, 600, 900, 1800, 3600 seconds)
+    op.execute("""
+        WITH completed_steps AS (
+            SELECT s.manual_uuid, p.step_number,
+                   extract(epoch FROM p.created_at - coalesce(
+                       lag(p.created_at) OVER (PARTITION BY p.session_uuid ORDER BY p.created_at),
+                       s.started_at
+                   ))::float8 AS seconds
+            FROM progress_events p JOIN sessions s ON s.id = p.session_uuid
+            WHERE p.processed
+        ),
+        counts AS (
+            SELECT s.manual_uuid, p.step_number,
+                   count(*) AS attempts,
+                   count(*) FILTER (WHERE p.step_status = 'DONE') AS completions
+            FROM progress_events p JOIN sessions s ON s.id = p.session_uuid
+            GROUP BY s.manual_uuid, p.step_number
+        ),
+        drops AS (
+            SELECT s.manual_uuid, s.current_step AS step_number, count(*) AS drop_offs
+            FROM sessions s JOIN manuals m ON m.id = s.manual_uuid
+            WHERE s.status = 'abandoned' AND s.current_step <= m.total_steps
+            GROUP BY s.manual_uuid, s.current_step
+        ),
+        histogram AS (
+            SELECT manual_uuid, step_number,
+                   width_bucket(seconds, ARRAY[5.0, 10.0, 15.0, 30.0, 45.0, 60.0, 90.0, 120.0, 180.0, 300.0, 600.0, 900.0, 1800.0, 3600.0]::float8[]) AS bucket,
+                   count(*) AS n
+            FROM completed_steps
+            GROUP BY 1, 2, 3
+        ),
+        keys AS (
+            SELECT manual_uuid, step_number FROM counts
+            UNION
+            SELECT manual_uuid, step_number FROM drops
+        )
+        INSERT INTO step_funnel (manual_uuid, step_number, attempts, completions, drop_offs, time_histogram)
+        SELECT k.manual_uuid, k.step_number,
+               coalesce(c.attempts, 0), coalesce(c.completions, 0), coalesce(d.drop_offs, 0),
+               ARRAY(
+                   SELECT coalesce(h.n, 0)
+                   FROM generate_series(0, 14) AS b
+                   LEFT JOIN histogram h
+                     ON h.manual_uuid = k.manual_uuid AND h.step_number = k.step_number AND h.bucket = b
+                   ORDER BY b
+               )
+        FROM keys k
+        LEFT JOIN counts c USING (manual_uuid, step_number)
+        LEFT JOIN drops d USING (manual_uuid, step_number)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('step_funnel')
+    op.drop_column('sessions', 'step_started_at')
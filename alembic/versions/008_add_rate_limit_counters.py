@@ -0,0 +1,32 @@
+"""Add rate_limit_counters table for the shared rate limit backend.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-03-11
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'rate_limit_counters',
+        sa.Column('client_id', sa.String(200), nullable=False),
+        sa.Column('window', sa.String(10), nullable=False),
+        sa.Column('window_start', sa.BigInteger(), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('client_id', 'window', 'window_start'),
+    )
+    op.create_index('idx_rate_limit_counters_window_start', 'rate_limit_counters', ['window_start'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_rate_limit_counters_window_start', table_name='rate_limit_counters')
+    op.drop_table('rate_limit_counters')
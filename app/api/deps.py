@@ -1,7 +1,16 @@
 """API dependencies."""
-from typing import AsyncGenerator
+import hmac
+from typing import AsyncGenerator, Optional
+from fastapi import Depends, Header
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import AsyncSessionLocal
+from app.config import get_settings
+from app.database import AsyncSessionLocal, ReadSessionLocal, has_read_replica
+from app.services.recent_writes import recent_writes
+from app.utils.exceptions import AdminDisabledError, AdminForbiddenError, QueryTimeoutError
+from app.utils.queries import STATEMENT_TIMEOUT_SQLSTATE, has_sqlstate, set_statement_timeout
+
+settings = get_settings()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -11,3 +20,66 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             yield session
         finally:
             await session.close()
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get a database session on the read replica.
+
+    Uses the primary when `DATABASE_READ_URL` is not set. Only for queries
+    that tolerate replica lag; see `pick_read_db` for read-your-writes.
+    """
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def pick_read_db(db: AsyncSession, read_db: AsyncSession, *keys: str) -> AsyncSession:
+    """
+    Choose the session for a read covering `keys` (see `app.services.recent_writes`).
+
+    Returns the primary session `db` if any key was written within
+    `READ_YOUR_WRITES_SECONDS`, so a client reading right after its own write
+    is not served a lagging replica, and the replica session otherwise.
+    Sessions connect lazily, so the one not chosen costs nothing.
+    """
+    if not has_read_replica():
+        return db
+    if recent_writes.is_recent(*keys):
+        recent_writes.primary_reads += 1
+        return db
+    recent_writes.replica_reads += 1
+    return read_db
+
+
+async def get_analytics_db(
+    db: AsyncSession = Depends(get_read_db)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get a database session for analytics queries.
+
+    Analytics read from the replica when one is configured; counters the
+    process has not flushed yet are added on top either way. Statements
+    are limited to `ANALYTICS_STATEMENT_TIMEOUT_MS`, so a slow aggregate
+    is cancelled by the server instead of holding a pooled connection the
+    progress path needs. A cancelled query becomes a 503.
+    """
+    await set_statement_timeout(db, settings.ANALYTICS_STATEMENT_TIMEOUT_MS)
+    try:
+        yield db
+    except DBAPIError as e:
+        if has_sqlstate(e, STATEMENT_TIMEOUT_SQLSTATE):
+            raise QueryTimeoutError(settings.ANALYTICS_STATEMENT_TIMEOUT_MS) from e
+        raise
+
+
+async def require_admin(
+    x_admin_token: Optional[str] = Header(None, description="Admin token (ADMIN_TOKEN)")
+) -> None:
+    """Dependency that rejects requests without the configured admin token."""
+    if not settings.ADMIN_TOKEN:
+        raise AdminDisabledError()
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise AdminForbiddenError()
@@ -1,6 +1,6 @@
 """API routes."""
 from fastapi import APIRouter
-from app.api.routes import sessions, messages, progress, manuals, analytics
+from app.api.routes import sessions, messages, progress, manuals, analytics, admin
 
 api_router = APIRouter()
 
@@ -33,3 +33,9 @@ api_router.include_router(
     prefix="/analytics",
     tags=["Analytics"]
 )
+
+api_router.include_router(
+    admin.router,
+    prefix="/admin",
+    tags=["Admin"]
+)
@@ -0,0 +1,53 @@
+"""Admin API routes."""
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.api.deps import require_admin
+from app.schemas.admin import ProfilerStart
+from app.services.profiler import profiler
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post("/profiler/start")
+async def start_profiler(params: ProfilerStart):
+    """
+    Start profiling live requests.
+
+    Samples the stacks of a fraction of requests (optionally one route
+    only) until `duration_seconds` have passed. Starting a new run discards
+    the previous run's results.
+    """
+    profiler.start(
+        duration_seconds=params.duration_seconds,
+        sample_rate=params.sample_rate,
+        route=params.route,
+        interval_ms=params.interval_ms,
+    )
+    return profiler.get_stats()
+
+
+@router.post("/profiler/stop")
+async def stop_profiler():
+    """Stop the current profiling run early, keeping its results."""
+    profiler.stop()
+    return profiler.get_stats()
+
+
+@router.get("/profiler")
+async def get_profiler_status():
+    """Get the state of the current or last profiling run and samples per route."""
+    return profiler.get_stats()
+
+
+@router.get("/profiler/collapsed", response_class=PlainTextResponse)
+async def get_collapsed_stacks(
+    route: Optional[str] = Query(None, description="Only stacks of this route template"),
+):
+    """
+    Get the sampled stacks in collapsed format, one `frame;frame;... count` per line.
+
+    Render with `flamegraph.pl`, or load into https://www.speedscope.app.
+    """
+    return PlainTextResponse(profiler.collapsed(route))
@@ -1,15 +1,17 @@
 """Analytics API routes."""
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_analytics_db
 from app.services.analytics_service import AnalyticsService
 
 router = APIRouter()
 
+MAX_MINUTE_TREND_HOURS = 24
+
 
 @router.get("/overview")
-async def get_overview(db: AsyncSession = Depends(get_db)):
+async def get_overview(db: AsyncSession = Depends(get_analytics_db)):
     """
     Get overall system statistics.
 
@@ -23,7 +25,7 @@ async def get_overview(db: AsyncSession = Depends(get_db)):
 @router.get("/popular-manuals")
 async def get_popular_manuals(
     limit: int = Query(default=5, ge=1, le=20, description="Number of manuals to return"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_analytics_db)
 ):
     """
     Get most popular manuals by session count.
@@ -37,7 +39,7 @@ async def get_popular_manuals(
 @router.get("/recent-activity")
 async def get_recent_activity(
     hours: int = Query(default=24, ge=1, le=168, description="Hours to look back"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_analytics_db)
 ):
     """
     Get activity statistics for a time period.
@@ -49,10 +51,32 @@ async def get_recent_activity(
     return await service.get_recent_activity(hours=hours)
 
 
+@router.get("/trends")
+async def get_activity_trends(
+    hours: int = Query(default=24, ge=1, le=168, description="Hours to look back"),
+    bucket: str = Query(default="hour", pattern="^(minute|hour)$", description="Bucket size"),
+    db: AsyncSession = Depends(get_analytics_db)
+):
+    """
+    Get activity time series for a time period.
+
+    Returns new sessions, completions, progress updates and messages per
+    minute or hour bucket. Minute buckets are limited to the last 24 hours.
+    """
+    if bucket == "minute" and hours > MAX_MINUTE_TREND_HOURS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Minute buckets are limited to {MAX_MINUTE_TREND_HOURS} hours"
+        )
+
+    service = AnalyticsService(db)
+    return await service.get_activity_trends(hours=hours, bucket=bucket)
+
+
 @router.get("/users/{user_id}")
 async def get_user_stats(
     user_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_analytics_db)
 ):
     """
     Get statistics for a specific user.
@@ -66,7 +90,7 @@ async def get_user_stats(
 @router.get("/manuals/{manual_id}/steps")
 async def get_step_analytics(
     manual_id: str,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_analytics_db)
 ):
     """
     Get step-by-step analytics for a manual.
@@ -1,11 +1,13 @@
 """Manual API routes."""
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db, pick_read_db
 from app.schemas.manual import ManualCreate, ManualResponse, ManualListResponse
 from app.services.manual_service import ManualService
+from app.services.recent_writes import MANUALS_KEY
+from app.utils.etags import etag_matches, manual_etag, not_modified
 from app.utils.exceptions import SessionServiceException
 
 router = APIRouter()
@@ -58,15 +60,29 @@ async def create_manual(
 async def list_manuals(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor (overrides skip)"),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
-    """List all manuals with pagination."""
-    service = ManualService(db)
-    manuals, total = await service.list_manuals(skip=skip, limit=limit)
-    return ManualListResponse(
-        manuals=[service.to_response(m) for m in manuals],
-        total=total
-    )
+    """
+    List all manuals with pagination, newest first.
+
+    Served from the read replica unless a manual was just created or deleted.
+    """
+    try:
+        service = ManualService(pick_read_db(db, read_db, MANUALS_KEY))
+        manuals, total, next_cursor = await service.list_manuals(
+            skip=skip,
+            limit=limit,
+            cursor=cursor
+        )
+        return ManualListResponse(
+            manuals=[service.to_response(m) for m in manuals],
+            total=total,
+            next_cursor=next_cursor
+        )
+    except SessionServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
 @router.get(
@@ -77,12 +93,24 @@ async def list_manuals(
 )
 async def get_manual(
     manual_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, description="ETag from a previous response"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get a specific manual by ID."""
+    """
+    Get a specific manual by ID.
+
+    Served from the manual cache. Responses carry an `ETag`; send it back
+    as `If-None-Match` to get an empty `304 Not Modified`.
+    """
     try:
         service = ManualService(db)
-        manual = await service.get_manual_by_id(manual_id)
+        manual = await service.get_cached_manual_by_id(manual_id)
+        etag = manual_etag(manual)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        response.headers["ETag"] = etag
         return service.to_response(manual)
     except SessionServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
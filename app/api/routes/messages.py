@@ -1,11 +1,15 @@
 """Message API routes for conversation storage."""
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db, pick_read_db
 from app.schemas.message import MessageCreate, MessageResponse, MessageListResponse
+from app.services.idempotency import idempotency_store, MESSAGE_SCOPE
 from app.services.message_service import MessageService
+from app.services.recent_writes import session_key
 from app.utils.exceptions import SessionServiceException
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -20,6 +24,11 @@ router = APIRouter()
 async def add_message(
     session_id: str,
     message_data: MessageCreate,
+    idempotency_key: Optional[str] = Header(
+        None,
+        max_length=100,
+        description="Key identifying this message; retries with it get the original response",
+    ),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -39,12 +48,25 @@ async def add_message(
       "sender": "user"
     }
     ```
+
+    Send an `Idempotency-Key` header to make retries safe: a retry with
+    the same key returns the original response (with an
+    `Idempotency-Replayed: true` header) instead of adding the message again.
     """
+    if idempotency_key:
+        stored = idempotency_store.lookup(MESSAGE_SCOPE, session_id, idempotency_key)
+        if stored is not None:
+            return stored.to_response()
+
     try:
         service = MessageService(db)
-        message = await service.add_message(session_id, message_data)
-        return service.to_response(message, session_id)
+        return await service.add_message(session_id, message_data, idempotency_key)
     except SessionServiceException as e:
+        if idempotency_key:
+            # The key may have been used by a request this process has not seen
+            stored = await idempotency_store.fetch(db, MESSAGE_SCOPE, session_id, idempotency_key)
+            if stored is not None:
+                return stored.to_response()
         raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
@@ -58,24 +80,31 @@ async def get_messages(
     session_id: str,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor (overrides skip)"),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get the conversation history for a session.
 
     Messages are returned in chronological order (oldest first).
+    Pass the `next_cursor` of a response as `cursor` to fetch the next page.
+    Served from the read replica unless the session was just written.
     """
     try:
-        service = MessageService(db)
-        messages, total, session_id = await service.get_messages(
+        service = MessageService(pick_read_db(db, read_db, session_key(session_id)))
+        messages, total, session_id, next_cursor = await service.get_messages(
             session_id,
             skip=skip,
-            limit=limit
-        )
-        return MessageListResponse(
-            messages=[service.to_response(m, session_id) for m in messages],
-            total=total,
-            session_id=session_id
+            limit=limit,
+            cursor=cursor
         )
+        # Rendered straight from the rows; the payload matches MessageListResponse
+        return FastJSONResponse({
+            "messages": [service.to_response_dict(m, session_id) for m in messages],
+            "total": total,
+            "session_id": session_id,
+            "next_cursor": next_cursor,
+        })
     except SessionServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -1,5 +1,6 @@
 """Progress API routes for step tracking."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_db
@@ -9,8 +10,14 @@ from app.schemas.progress import (
     NextStepResponse,
     DuplicateProgressResponse,
 )
+from app.services.idempotency import idempotency_store, PROGRESS_SCOPE
 from app.services.progress_service import ProgressService
-from app.utils.exceptions import SessionServiceException, DuplicateProgressUpdateError
+from app.utils.etags import etag_matches, not_modified, session_etag
+from app.utils.exceptions import (
+    SessionServiceException,
+    DuplicateProgressUpdateError,
+    DuplicateRequestError,
+)
 
 router = APIRouter()
 
@@ -22,10 +29,10 @@ router = APIRouter()
     description="Submit a progress update for a session (Type B & C input). "
                 "DONE status increments the step counter, ONGOING does not.",
     responses={
-        200: {"description": "Progress updated successfully"},
+        200: {"description": "Progress updated successfully, or the original response to a retried idempotency_key"},
         400: {"description": "Invalid step number or session ended"},
         404: {"description": "Session not found"},
-        409: {"description": "Duplicate update (if idempotency_key provided)"},
+        409: {"description": "Duplicate update whose stored response has expired"},
     }
 )
 async def update_progress(
@@ -44,7 +51,8 @@ async def update_progress(
 
     **Edge Cases Handled:**
     - Invalid step numbers (rejected with 400)
-    - Duplicate updates (rejected with 409 if idempotency_key matches)
+    - Duplicate updates (the original response is replayed, with an
+      `Idempotency-Replayed: true` header, if idempotency_key matches)
     - Out-of-order updates (logged but allowed)
     - Session already ended (rejected with 400)
     - Concurrent updates (handled with row-level locking)
@@ -59,18 +67,27 @@ async def update_progress(
     }
     ```
     """
+    key = progress_data.idempotency_key
+    if key:
+        stored = idempotency_store.lookup(PROGRESS_SCOPE, session_id, key)
+        if stored is not None:
+            return stored.to_response()
+
     try:
         service = ProgressService(db)
         return await service.update_progress(session_id, progress_data)
-    except DuplicateProgressUpdateError as e:
-        # Return 409 Conflict for duplicates
+    except (DuplicateProgressUpdateError, DuplicateRequestError) as e:
+        # Replay the original response; 409 Conflict if it has expired
+        stored = await idempotency_store.fetch(db, PROGRESS_SCOPE, session_id, key)
+        if stored is not None:
+            return stored.to_response()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail={
                 "status": "already_processed",
                 "message": e.message,
                 "session_id": session_id,
-                "idempotency_key": progress_data.idempotency_key,
+                "idempotency_key": key,
             }
         )
     except SessionServiceException as e:
@@ -85,16 +102,26 @@ async def update_progress(
 )
 async def get_next_step(
     session_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, description="ETag from a previous response"),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Get the next recommended step for a session.
 
     Returns the current step information including title and content,
-    or indicates if the session is completed.
+    or indicates if the session is completed. Responses carry an `ETag`;
+    send it back as `If-None-Match` to get an empty `304 Not Modified`
+    while the session is unchanged.
     """
     try:
         service = ProgressService(db)
-        return await service.get_next_step(session_id)
+        session = await service.session_service.get_session(session_id, load_manual=False)
+        etag = session_etag(session)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        response.headers["ETag"] = etag
+        return await service.get_next_step_for(session)
     except SessionServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
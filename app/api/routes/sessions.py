@@ -1,9 +1,9 @@
 """Session API routes."""
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_db
+from app.api.deps import get_db, get_read_db, pick_read_db
 from app.schemas.session import (
     SessionCreate,
     SessionResponse,
@@ -11,9 +11,12 @@ from app.schemas.session import (
     SessionListResponse,
     SessionDeleteResponse,
 )
+from app.services.idempotency import idempotency_store, SESSION_SCOPE
+from app.services.recent_writes import user_key
 from app.services.session_service import SessionService
-from app.services.feedback_service import FeedbackService
+from app.utils.etags import etag_matches, not_modified, session_etag
 from app.utils.exceptions import SessionServiceException
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -27,6 +30,11 @@ router = APIRouter()
 )
 async def create_session(
     session_data: SessionCreate,
+    idempotency_key: Optional[str] = Header(
+        None,
+        max_length=100,
+        description="Key identifying this request; retries with it get the original response",
+    ),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -44,17 +52,28 @@ async def create_session(
       "manual_id": "manual-abc"
     }
     ```
+
+    Send an `Idempotency-Key` header to make retries safe: a retry with
+    the same key returns the original response (with an
+    `Idempotency-Replayed: true` header) instead of a 409 for the existing
+    session.
     """
+    if idempotency_key:
+        stored = idempotency_store.lookup(SESSION_SCOPE, session_data.session_id, idempotency_key)
+        if stored is not None:
+            return stored.to_response()
+
     try:
         service = SessionService(db)
-        session = await service.create_session(session_data)
-
-        # Send webhook notification
-        feedback_service = FeedbackService()
-        await feedback_service.send_session_created(session, session.manual)
-
-        return service.to_response(session)
+        return await service.create_session(session_data, idempotency_key)
     except SessionServiceException as e:
+        if idempotency_key:
+            # The key may have been used by a request this process has not seen
+            stored = await idempotency_store.fetch(
+                db, SESSION_SCOPE, session_data.session_id, idempotency_key
+            )
+            if stored is not None:
+                return stored.to_response()
         raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
@@ -69,20 +88,35 @@ async def list_sessions(
     status: Optional[str] = Query(None, description="Filter by status (active, completed, abandoned)"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum records to return"),
-    db: AsyncSession = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor (overrides skip)"),
+    db: AsyncSession = Depends(get_db),
+    read_db: AsyncSession = Depends(get_read_db)
 ):
-    """List sessions with optional filters."""
-    service = SessionService(db)
-    sessions, total = await service.list_sessions(
-        user_id=user_id,
-        status=status,
-        skip=skip,
-        limit=limit
-    )
-    return SessionListResponse(
-        sessions=[service.to_response(s) for s in sessions],
-        total=total
-    )
+    """
+    List sessions with optional filters, newest first.
+
+    Pass the `next_cursor` of a response as `cursor` to fetch the next page.
+    Cursor pages cost the same at any depth and are stable under concurrent inserts.
+    Served from the read replica unless the user's sessions were just written.
+    """
+    try:
+        keys = (user_key(user_id),) if user_id else ()
+        service = SessionService(pick_read_db(db, read_db, *keys))
+        sessions, total, next_cursor = await service.list_sessions(
+            user_id=user_id,
+            status=status,
+            skip=skip,
+            limit=limit,
+            cursor=cursor
+        )
+        # Rendered straight from the rows; the payload matches SessionListResponse
+        return FastJSONResponse({
+            "sessions": [service.to_response_dict(s) for s in sessions],
+            "total": total,
+            "next_cursor": next_cursor,
+        })
+    except SessionServiceException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
 
 
 @router.get(
@@ -93,13 +127,26 @@ async def list_sessions(
 )
 async def get_session(
     session_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None, description="ETag from a previous response"),
     db: AsyncSession = Depends(get_db)
 ):
-    """Get a specific session by ID."""
+    """
+    Get a specific session by ID.
+
+    Responses carry an `ETag`; send it back as `If-None-Match` to get an
+    empty `304 Not Modified` while the session is unchanged.
+    """
     try:
         service = SessionService(db)
-        session = await service.get_session(session_id)
-        return service.to_response(session)
+        session = await service.get_session(session_id, load_manual=False)
+        etag = session_etag(session)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        manual = await service.manual_service.get_cached_manual(session.manual_uuid)
+        response.headers["ETag"] = etag
+        return service.to_response(session, manual)
     except SessionServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
 
@@ -130,12 +177,6 @@ async def update_session(
     try:
         service = SessionService(db)
         session = await service.update_session(session_id, update_data)
-
-        # Send webhook notification if session ended
-        if session.status in ["completed", "abandoned"]:
-            feedback_service = FeedbackService()
-            await feedback_service.send_session_ended(session, session.manual)
-
         return service.to_response(session)
     except SessionServiceException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -13,15 +13,67 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "postgresql+asyncpg://postgres:postgres@db:5432/sessions"
+    DATABASE_POOL_SIZE: int = 20
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 30.0  # Wait for a free connection before failing
+    DATABASE_POOL_RECYCLE_SECONDS: int = 1800  # Replace connections older than this (-1 = never)
+    DATABASE_POOL_PRE_PING: bool = False  # Ping on every checkout (one extra round trip)
+    DATABASE_STATEMENT_TIMEOUT_MS: int = 30000  # Server-side limit per statement (0 = none)
+    DATABASE_LOCK_TIMEOUT_MS: int = 5000  # Server-side limit on waiting for row locks (0 = none)
+    DATABASE_READ_URL: str = ""  # Read replica for list and analytics queries (empty = use DATABASE_URL)
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # Read from the primary this long after a write (covers replica lag)
 
     # External Services
     WEBHOOK_URL: str = "http://mock_webhook:8001/webhook"
     WEBHOOK_TIMEOUT: int = 10
     WEBHOOK_ENABLED: bool = True
+    WEBHOOK_MAX_CONNECTIONS: int = 100
+    WEBHOOK_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    WEBHOOK_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    WEBHOOK_HTTP2: bool = False
+    WEBHOOK_DISPATCH_BATCH_SIZE: int = 50
+    WEBHOOK_DISPATCH_CONCURRENCY: int = 10
+    WEBHOOK_LEASE_SECONDS: int = 120
 
     # Session Settings
     MAX_SESSION_DURATION_MINUTES: int = 30
 
+    # Listing
+    ESTIMATED_COUNTS_ENABLED: bool = False
+    ESTIMATED_COUNT_THRESHOLD: int = 100000
+
+    # Rate Limiting
+    RATE_LIMIT_BACKEND: str = "memory"  # 'memory' (per process) or 'postgres' (shared)
+    RATE_LIMIT_SYNC_INTERVAL_SECONDS: float = 1.0
+    RATE_LIMIT_SYNC_BATCH_SIZE: int = 100
+
+    # Response Compression
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Bytes; smaller bodies are sent as-is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"  # Preference order; br/zstd need brotli/zstandard
+
+    # Admin endpoints (/api/v1/admin, e.g. the profiler); disabled while empty
+    ADMIN_TOKEN: str = ""
+
+    # Metrics
+    METRICS_ENABLED: bool = True  # Per-route latency histograms for /metrics
+    SERVER_TIMING_ENABLED: bool = True  # Report SQL count and time per response in a Server-Timing header
+
+    # Manual Cache
+    MANUAL_CACHE_SIZE: int = 256
+    MANUAL_CACHE_TTL_SECONDS: int = 300
+
+    # Idempotency keys (stored responses replayed to retried writes)
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_CACHE_SIZE: int = 10000  # Responses also kept in process memory
+
+    # Analytics
+    ANALYTICS_FLUSH_INTERVAL_SECONDS: int = 10
+    ANALYTICS_RECONCILE_INTERVAL_MINUTES: int = 60
+    ANALYTICS_MINUTE_BUCKET_RETENTION_HOURS: int = 192
+    ANALYTICS_STATEMENT_TIMEOUT_MS: int = 5000  # Per-statement limit for analytics API queries
+
     class Config:
         env_file = ".env"
         case_sensitive = True
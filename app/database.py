@@ -1,18 +1,95 @@
 """Database connection and session management."""
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import get_settings
 
 settings = get_settings()
 
+
+class PoolStats:
+    """Connection pool checkout statistics."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, waited: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def get_stats(self, pool: AsyncAdaptedQueuePool) -> dict:
+        """Get checkout statistics and the pool's current occupancy."""
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0),
+            "idle": pool.checkedin(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.wait_seconds_max * 1000, 3),
+        }
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that records how long each checkout waits.
+
+    The wait covers queueing for a free connection and, below the pool
+    size, opening a new one; a growing wait means the pool is too small
+    for the request concurrency. Each pool keeps its own `stats`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.timeouts += 1
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return connection
+
+
+def make_engine(url: str) -> AsyncEngine:
+    """Create an engine with the configured pool and server-side timeouts."""
+    return create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args={
+            # Applied by the server to every statement on the connection
+            "server_settings": {
+                "statement_timeout": str(settings.DATABASE_STATEMENT_TIMEOUT_MS),
+                "lock_timeout": str(settings.DATABASE_LOCK_TIMEOUT_MS),
+            },
+        },
+    )
+
+
 # Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=settings.DEBUG,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
-)
+engine = make_engine(settings.DATABASE_URL)
+
+# Engine for read-only queries that tolerate replica lag; the primary unless a replica is configured
+read_engine = make_engine(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else engine
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -23,6 +100,14 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -48,3 +133,15 @@ async def init_db():
 async def close_db():
     """Close database connections."""
     await engine.dispose()
+    if has_read_replica():
+        await read_engine.dispose()
+
+
+def has_read_replica() -> bool:
+    """Whether read-only queries go to a separate replica."""
+    return read_engine is not engine
+
+
+def get_pool_stats(target: AsyncEngine = engine) -> dict:
+    """Get connection pool statistics for an engine (the primary by default)."""
+    return target.pool.stats.get_stats(target.pool)
@@ -2,21 +2,42 @@
 import logging
 import asyncio
 from contextlib import asynccontextmanager
-from uuid import uuid4
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, Request, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.openapi.utils import get_openapi
-from starlette.middleware.base import BaseHTTPMiddleware
 
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import get_settings
-from app.database import init_db, close_db, async_session_maker
+from app.database import (
+    init_db,
+    close_db,
+    async_session_maker,
+    ReadSessionLocal,
+    get_pool_stats,
+    has_read_replica,
+    read_engine,
+)
+from app.api.deps import get_db
 from app.api.routes import api_router
 from app.utils.exceptions import SessionServiceException
+from app.utils.responses import FastJSONResponse
 from app.services.background_tasks import background_service
-from app.middleware.rate_limiter import RateLimitMiddleware
+from app.services.manual_cache import manual_cache
+from app.services.idempotency import idempotency_store
+from app.services.recent_writes import recent_writes
+from app.services.http_client import webhook_http_client
+from app.services.metrics import record_pool_stats, registry
+from app.services.profiler import profiler
+from app.services.webhook_retry_service import webhook_retry_service
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiler import ProfilerMiddleware
+from app.middleware.rate_limiter import RateLimitMiddleware, rate_limiter
+from app.middleware.request_id import RequestIDMiddleware
+from app.middleware.server_timing import ServerTimingMiddleware
 
 # Configure logging
 logging.basicConfig(
@@ -36,6 +57,8 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("Database initialized")
 
+    await webhook_http_client.start()
+
     # Start background tasks
     background_task = asyncio.create_task(background_service.start())
     logger.info("Background task service started")
@@ -44,6 +67,7 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down Session Service...")
+    profiler.stop()
     background_service.stop()
     background_task.cancel()
     try:
@@ -52,6 +76,10 @@ async def lifespan(app: FastAPI):
         pass
     logger.info("Background task service stopped")
 
+    await background_service.flush_analytics()
+
+    await webhook_http_client.close()
+
     await close_db()
     logger.info("Database connections closed")
 
@@ -94,7 +122,7 @@ The service accepts two types of input from upstream:
 
 ### Edge Cases Handled
 - Invalid step numbers
-- Duplicate updates (via idempotency key)
+- Duplicate updates (via idempotency key, replaying the original response)
 - Out-of-order updates
 - Session already ended
 - Missing manual
@@ -102,6 +130,7 @@ The service accepts two types of input from upstream:
 
     """,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
@@ -115,6 +144,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (manual listings, transcripts)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        encodings=tuple(e.strip() for e in settings.COMPRESSION_ENCODINGS.split(",") if e.strip()),
+    )
+
 # Add rate limiting middleware
 app.add_middleware(RateLimitMiddleware)
 
@@ -123,7 +161,7 @@ app.add_middleware(RateLimitMiddleware)
 @app.exception_handler(SessionServiceException)
 async def service_exception_handler(request: Request, exc: SessionServiceException):
     """Handle service-level exceptions with standardized error format."""
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=exc.status_code,
         content=exc.to_dict()
     )
@@ -134,19 +172,18 @@ app.include_router(api_router, prefix="/api/v1")
 
 
 # Request ID middleware for tracing
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Add unique request ID to each request for tracing."""
-
-    async def dispatch(self, request: Request, call_next):
-        request_id = request.headers.get("X-Request-ID", str(uuid4()))
-        request.state.request_id = request_id
+app.add_middleware(RequestIDMiddleware)
 
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
-        return response
+# SQL statement count and time per request (Server-Timing header and metrics)
+app.add_middleware(ServerTimingMiddleware, header=settings.SERVER_TIMING_ENABLED)
 
+# Latency includes every middleware below; only the profiler wraps it
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
-app.add_middleware(RequestIDMiddleware)
+# Outermost, so profiles include every other middleware. Registers requests
+# picked by an admin-started profiling run; idle otherwise
+app.add_middleware(ProfilerMiddleware)
 
 
 # Health check endpoint
@@ -167,6 +204,30 @@ async def health_check():
     except Exception as e:
         db_error = str(e)
 
+    database_checks = {
+        "database": {
+            "healthy": db_healthy,
+            "error": db_error,
+            "pool": get_pool_stats(),
+        },
+    }
+    if has_read_replica():
+        replica_healthy = False
+        replica_error = None
+        try:
+            async with ReadSessionLocal() as db:
+                await db.execute(text("SELECT 1"))
+                replica_healthy = True
+        except Exception as e:
+            replica_error = str(e)
+        db_healthy = db_healthy and replica_healthy
+        database_checks["read_replica"] = {
+            "healthy": replica_healthy,
+            "error": replica_error,
+            "pool": get_pool_stats(read_engine),
+            "routing": recent_writes.get_stats(),
+        }
+
     # Get background service stats
     bg_stats = await background_service.get_stats()
 
@@ -177,15 +238,39 @@ async def health_check():
         "service": settings.APP_NAME,
         "version": settings.APP_VERSION,
         "checks": {
-            "database": {
-                "healthy": db_healthy,
-                "error": db_error,
-            },
+            **database_checks,
             "background_tasks": bg_stats,
+            "manual_cache": manual_cache.get_stats(),
+            "idempotency": idempotency_store.get_stats(),
+            "rate_limiter": rate_limiter.get_stats(),
         }
     }
 
 
+# Prometheus metrics endpoint
+@app.get("/metrics", tags=["Health"], response_class=PlainTextResponse)
+async def metrics(db: AsyncSession = Depends(get_db)):
+    """
+    Metrics in the Prometheus text format.
+
+    Request and webhook metrics are updated as events happen; pool usage
+    and the webhook queue depth are sampled here, on each scrape.
+    """
+    record_pool_stats("primary", get_pool_stats())
+    if has_read_replica():
+        record_pool_stats("replica", get_pool_stats(read_engine))
+    try:
+        await webhook_retry_service.count_pending(db)
+    except Exception as e:
+        # Keep the last sampled depth rather than failing the scrape
+        logger.warning(f"Failed to sample webhook queue depth: {e}")
+
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
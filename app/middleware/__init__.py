@@ -1,4 +1,17 @@
 """Middleware package."""
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiler import ProfilerMiddleware
 from app.middleware.rate_limiter import RateLimitMiddleware, rate_limiter
+from app.middleware.request_id import RequestIDMiddleware
+from app.middleware.server_timing import ServerTimingMiddleware
 
-__all__ = ["RateLimitMiddleware", "rate_limiter"]
+__all__ = [
+    "CompressionMiddleware",
+    "MetricsMiddleware",
+    "ProfilerMiddleware",
+    "RateLimitMiddleware",
+    "RequestIDMiddleware",
+    "ServerTimingMiddleware",
+    "rate_limiter",
+]
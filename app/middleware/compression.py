@@ -0,0 +1,199 @@
+"""Response compression middleware."""
+import logging
+import zlib
+from functools import partial
+from typing import Callable, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+# Text-like payloads worth compressing; images, archives etc. already are
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+    "image/svg+xml",
+)
+
+# Event streams must reach the client chunk by chunk
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# (compress chunk, finish) pair for one response body
+Compressor = tuple[Callable[[bytes], bytes], Callable[[], bytes]]
+
+
+def _gzip(level: int) -> Compressor:
+    obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 writes a gzip container
+    return obj.compress, obj.flush
+
+
+def _brotli() -> Compressor:
+    obj = brotli.Compressor(quality=BROTLI_QUALITY)
+    return obj.process, obj.finish
+
+
+def _zstd() -> Compressor:
+    obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return obj.compress, obj.flush
+
+
+# Encodings whose library is installed
+AVAILABLE_ENCODINGS = {"gzip"}
+if brotli is not None:
+    AVAILABLE_ENCODINGS.add("br")
+if zstandard is not None:
+    AVAILABLE_ENCODINGS.add("zstd")
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Parse an `Accept-Encoding` header into {coding: q-value}."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the best encoding the client accepts.
+
+    `encodings` lists the encodings to offer in order of preference;
+    encodings whose library is not installed are skipped. Among the
+    encodings the client accepts with the highest q-value the first in
+    `encodings` wins. Bodies smaller than `minimum_size`, non-text content
+    types and responses that already carry a `Content-Encoding` are passed
+    through unchanged. Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        encodings: tuple[str, ...] = ("zstd", "br", "gzip"),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoders: dict[str, Callable[[], Compressor]] = {
+            "gzip": partial(_gzip, gzip_level),
+            "br": _brotli,
+            "zstd": _zstd,
+        }
+        self.encodings = []
+        for encoding in encodings:
+            if encoding in AVAILABLE_ENCODINGS:
+                self.encodings.append(encoding)
+            else:
+                logger.info(
+                    f"Compression encoding '{encoding}' is unavailable "
+                    f"(install 'brotli' for br, 'zstandard' for zstd); skipping it"
+                )
+
+    def select_encoding(self, accept_encoding: str) -> Optional[str]:
+        """Pick the response encoding for an `Accept-Encoding` header."""
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            q = accepted.get(encoding, wildcard)
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.select_encoding(Headers(scope=scope).get("Accept-Encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[Compressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk shows whether to compress
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = MutableHeaders(scope=start_message)
+                content_type = headers.get("Content-Type", "")
+                compressible = (
+                    content_type.startswith(COMPRESSIBLE_TYPES)
+                    and not content_type.startswith(UNCOMPRESSIBLE_TYPES)
+                    and "Content-Encoding" not in headers
+                )
+                if compressible:
+                    headers.add_vary_header("Accept-Encoding")
+                if not compressible or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = self.encoders[encoding]()
+                headers["Content-Encoding"] = encoding
+                etag = headers.get("ETag")
+                if etag and not etag.startswith("W/"):
+                    # The compressed bytes differ, so a strong validator no longer holds
+                    headers["ETag"] = f"W/{etag}"
+
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor[0](body) + compressor[1]()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+
+            compress, finish = compressor
+            chunk = compress(body)
+            if not more_body:
+                chunk += finish()
+            if chunk or not more_body:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,53 @@
+"""Request metrics middleware."""
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.metrics import http_request_duration, http_requests_in_flight
+
+# Route label for requests that matched no route, so scanners cannot add label sets
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_label(scope: Scope) -> str:
+    """Path template of the route that handled the request."""
+    return getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    """
+    Record request latency per route template and status code.
+
+    Requests are labelled with the matched route's path template (e.g.
+    `/api/v1/sessions/{session_id}`), which the router stores in the scope,
+    so the number of label sets stays bounded by the number of routes.
+    Latency is measured until the last body chunk has been sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route_label(scope),
+                str(status_code),
+            )
@@ -0,0 +1,30 @@
+"""Request selection for the sampling profiler."""
+import sys
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.services.profiler import profiler
+
+
+class ProfilerMiddleware:
+    """
+    Register requests selected by an active profiling run with the profiler.
+
+    Added outermost, so the recorded stacks include every middleware below
+    it. See `app.services.profiler.SamplingProfiler`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not profiler.should_profile():
+            await self.app(scope, receive, send)
+            return
+
+        # This coroutine's frame is on the loop thread's stack whenever the request runs
+        frame = sys._getframe()
+        profiler.enter(frame, scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.exit(frame)
@@ -1,17 +1,29 @@
 """Rate limiting middleware for API protection."""
+import hashlib
+import math
 import os
 import time
 import logging
-from collections import defaultdict
-from typing import Callable
-from fastapi import Request, Response, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+from app.services.metrics import rate_limit_rejections
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 # Disable rate limiting during tests
 RATE_LIMIT_DISABLED = os.getenv("DISABLE_RATE_LIMIT", "false").lower() == "true"
 
+# Width of `rate_limit_counters.client_id`; longer client IDs are hashed
+MAX_CLIENT_ID_LENGTH = 200
+
 
 class RateLimitExceeded(HTTPException):
     """Exception raised when rate limit is exceeded."""
@@ -28,27 +40,152 @@ class RateLimitExceeded(HTTPException):
         )
 
 
-class InMemoryRateLimiter:
+def sliding_retry_after(previous: float, count: float, elapsed: float, size: int, limit: int) -> float:
+    """
+    Seconds until a sliding window counter estimate drops below `limit`.
+
+    `previous` and `count` are the previous and current fixed window counts
+    and `elapsed` is the time since the current window started.
+    """
+    if count >= limit:
+        # Wait for the next window, where this window's count decays
+        return (size - elapsed) + size * (1 - limit / count)
+    if previous:
+        return size * (1 - (limit - count) / previous) - elapsed
+    return 0
+
+
+class RateLimitBackend(ABC):
+    """
+    Interface for rate limit state used by `RateLimitMiddleware`.
+
+    Both methods are called on every request and must not block on I/O;
+    backends that share state between workers synchronize in the background.
     """
-    Simple in-memory rate limiter using sliding window algorithm.
 
-    For production, replace with Redis-based implementation.
+    @abstractmethod
+    def is_allowed(self, client_id: str) -> tuple[bool, int]:
+        """Check and record a request. Returns (is_allowed, retry_after_seconds)."""
+
+    @abstractmethod
+    def get_remaining(self, client_id: str) -> dict:
+        """Get remaining request counts for a client."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget all recorded requests."""
+
+    def get_stats(self) -> dict:
+        """Get backend statistics."""
+        return {}
+
+
+class _Window:
+    """Counts for one fixed window plus the window before it."""
+
+    __slots__ = ("start", "count", "previous")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        self.previous = 0
+
+    def roll(self, now: float, size: int) -> None:
+        """Advance to the window containing `now`."""
+        elapsed = int((now - self.start) // size)
+        if elapsed >= 1:
+            self.previous = self.count if elapsed == 1 else 0
+            self.count = 0
+            self.start += elapsed * size
+
+    def estimate(self, now: float, size: int) -> float:
+        """Estimate requests in the sliding window ending at `now`."""
+        overlap = 1 - (now - self.start) / size
+        return self.previous * overlap + self.count
+
+    def retry_after(self, now: float, size: int, limit: int) -> float:
+        """Seconds until the estimate drops below the limit."""
+        return sliding_retry_after(self.previous, self.count, now - self.start, size, limit)
+
+
+class _ClientState:
+    """Per-client limiter state; fixed size regardless of request volume."""
+
+    __slots__ = ("minute", "hour", "last_seen")
+
+    def __init__(self, now: float):
+        self.minute = _Window(now)
+        self.hour = _Window(now)
+        self.last_seen = now
+
+
+class InMemoryRateLimiter(RateLimitBackend):
+    """
+    In-memory rate limiter using the sliding window counter algorithm.
+
+    Each client keeps a count for the current and previous fixed window per
+    limit; the sliding-window count is estimated by weighting the previous
+    window by how much of it still overlaps. Checks are O(1) with constant
+    memory per client.
+
+    Clients are kept in LRU order. Idle clients (whose counts have fully
+    decayed) are swept periodically, and the least recently seen client is
+    evicted once `max_clients` is reached, so memory stays bounded however
+    many distinct clients are seen.
     """
 
+    MINUTE = 60
+    HOUR = 3600
+
     def __init__(
         self,
         requests_per_minute: int = 60,
         requests_per_hour: int = 1000,
+        max_clients: int = 100_000,
+        sweep_interval_seconds: int = 60,
+        clock: Callable[[], float] = time.monotonic,
     ):
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
-        self.minute_requests: dict[str, list[float]] = defaultdict(list)
-        self.hour_requests: dict[str, list[float]] = defaultdict(list)
+        self.max_clients = max_clients
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.clock = clock
+        self.clients: OrderedDict[str, _ClientState] = OrderedDict()
+        self.evicted = 0
+        self._next_sweep = clock() + sweep_interval_seconds
+
+    def _get_state(self, client_id: str, now: float) -> _ClientState:
+        """Get a client's state with both windows advanced to `now`."""
+        state = self.clients.get(client_id)
+        if state is None:
+            if len(self.clients) >= self.max_clients:
+                self.clients.popitem(last=False)
+                self.evicted += 1
+            state = self.clients[client_id] = _ClientState(now)
+        else:
+            self.clients.move_to_end(client_id)
+            state.minute.roll(now, self.MINUTE)
+            state.hour.roll(now, self.HOUR)
+        state.last_seen = now
+        return state
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Drop clients idle for two hour windows, whose counts are all zero.
 
-    def _cleanup_old_requests(self, requests: list[float], window_seconds: int) -> list[float]:
-        """Remove requests older than the window."""
-        cutoff = time.time() - window_seconds
-        return [req for req in requests if req > cutoff]
+        Clients are in LRU order, so the sweep stops at the first recent one.
+        """
+        now = self.clock() if now is None else now
+        cutoff = now - 2 * self.HOUR
+        evicted = 0
+        while self.clients:
+            client_id, state = next(iter(self.clients.items()))
+            if state.last_seen > cutoff:
+                break
+            del self.clients[client_id]
+            evicted += 1
+        self.evicted += evicted
+        return evicted
 
     def is_allowed(self, client_id: str) -> tuple[bool, int]:
         """
@@ -57,116 +194,182 @@ class InMemoryRateLimiter:
         Returns:
             tuple: (is_allowed, retry_after_seconds)
         """
-        current_time = time.time()
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+            self._next_sweep = now + self.sweep_interval_seconds
 
-        # Clean up old requests
-        self.minute_requests[client_id] = self._cleanup_old_requests(
-            self.minute_requests[client_id], 60
-        )
-        self.hour_requests[client_id] = self._cleanup_old_requests(
-            self.hour_requests[client_id], 3600
-        )
+        state = self._get_state(client_id, now)
 
         # Check minute limit
-        if len(self.minute_requests[client_id]) >= self.requests_per_minute:
-            oldest = min(self.minute_requests[client_id])
-            retry_after = int(60 - (current_time - oldest)) + 1
-            return False, retry_after
+        if state.minute.estimate(now, self.MINUTE) >= self.requests_per_minute:
+            retry_after = state.minute.retry_after(now, self.MINUTE, self.requests_per_minute)
+            return False, int(retry_after) + 1
 
         # Check hour limit
-        if len(self.hour_requests[client_id]) >= self.requests_per_hour:
-            oldest = min(self.hour_requests[client_id])
-            retry_after = int(3600 - (current_time - oldest)) + 1
-            return False, retry_after
+        if state.hour.estimate(now, self.HOUR) >= self.requests_per_hour:
+            retry_after = state.hour.retry_after(now, self.HOUR, self.requests_per_hour)
+            return False, int(retry_after) + 1
 
         # Record the request
-        self.minute_requests[client_id].append(current_time)
-        self.hour_requests[client_id].append(current_time)
+        state.minute.count += 1
+        state.hour.count += 1
 
         return True, 0
 
     def get_remaining(self, client_id: str) -> dict:
         """Get remaining request counts for a client."""
-        # Clean up first
-        self.minute_requests[client_id] = self._cleanup_old_requests(
-            self.minute_requests[client_id], 60
-        )
-        self.hour_requests[client_id] = self._cleanup_old_requests(
-            self.hour_requests[client_id], 3600
-        )
+        now = self.clock()
+        state = self.clients.get(client_id)
+        if state is None:
+            minute_used = hour_used = 0
+        else:
+            state.minute.roll(now, self.MINUTE)
+            state.hour.roll(now, self.HOUR)
+            minute_used = state.minute.estimate(now, self.MINUTE)
+            hour_used = state.hour.estimate(now, self.HOUR)
 
         return {
             "minute": {
                 "limit": self.requests_per_minute,
-                "remaining": self.requests_per_minute - len(self.minute_requests[client_id]),
+                "remaining": max(self.requests_per_minute - math.ceil(minute_used), 0),
                 "reset_seconds": 60,
             },
             "hour": {
                 "limit": self.requests_per_hour,
-                "remaining": self.requests_per_hour - len(self.hour_requests[client_id]),
+                "remaining": max(self.requests_per_hour - math.ceil(hour_used), 0),
                 "reset_seconds": 3600,
             },
         }
 
+    def clear(self) -> None:
+        """Forget all clients."""
+        self.clients.clear()
+
+    def get_stats(self) -> dict:
+        """Get limiter memory statistics."""
+        return {
+            "tracked_clients": len(self.clients),
+            "max_clients": self.max_clients,
+            "evicted_clients": self.evicted,
+        }
+
+
+REQUESTS_PER_MINUTE = 100
+REQUESTS_PER_HOUR = 2000
+
+
+def create_rate_limiter() -> RateLimitBackend:
+    """Create the rate limit backend selected by `RATE_LIMIT_BACKEND`."""
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        from app.database import async_session_maker
+        from app.middleware.shared_rate_limiter import PostgresCounterStore, SharedRateLimiter
+
+        return SharedRateLimiter(
+            PostgresCounterStore(async_session_maker),
+            requests_per_minute=REQUESTS_PER_MINUTE,
+            requests_per_hour=REQUESTS_PER_HOUR,
+            sync_interval_seconds=settings.RATE_LIMIT_SYNC_INTERVAL_SECONDS,
+            sync_batch_size=settings.RATE_LIMIT_SYNC_BATCH_SIZE,
+        )
+
+    return InMemoryRateLimiter(
+        requests_per_minute=REQUESTS_PER_MINUTE,
+        requests_per_hour=REQUESTS_PER_HOUR,
+    )
+
 
 # Global rate limiter instance
-rate_limiter = InMemoryRateLimiter(
-    requests_per_minute=100,  # 100 requests per minute
-    requests_per_hour=2000,   # 2000 requests per hour
-)
+rate_limiter = create_rate_limiter()
+
+
+def bounded_client_id(client_id: str) -> str:
+    """
+    Fit a client-supplied identifier into `MAX_CLIENT_ID_LENGTH`.
+
+    Forwarding headers are set by the client, so their length is not
+    bounded; longer values are replaced by their SHA-256 digest, which
+    still keys each distinct value separately.
+    """
+    if len(client_id) <= MAX_CLIENT_ID_LENGTH:
+        return client_id
+    return "sha256:" + hashlib.sha256(client_id.encode("utf-8")).hexdigest()
 
 
-def get_client_id(request: Request) -> str:
-    """Extract client identifier from request."""
+def get_client_id(scope: Scope) -> str:
+    """Extract client identifier from the request scope."""
+    headers = Headers(scope=scope)
+
     # Try X-Forwarded-For header first (for proxied requests)
-    forwarded = request.headers.get("X-Forwarded-For")
+    forwarded = headers.get("X-Forwarded-For")
     if forwarded:
-        return forwarded.split(",")[0].strip()
+        return bounded_client_id(forwarded.split(",")[0].strip())
 
     # Try X-Real-IP header
-    real_ip = request.headers.get("X-Real-IP")
+    real_ip = headers.get("X-Real-IP")
     if real_ip:
-        return real_ip
+        return bounded_client_id(real_ip)
 
     # Fall back to client host
-    if request.client:
-        return request.client.host
+    client = scope.get("client")
+    if client:
+        return client[0]
 
     return "unknown"
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware to enforce rate limiting on API requests."""
+class RateLimitMiddleware:
+    """
+    Middleware to enforce rate limiting on API requests.
+
+    Plain ASGI middleware: allowed requests go straight to the app and the
+    rate limit headers are added to the response start message as it passes
+    through, so responses are never buffered or re-wrapped.
+    """
 
     # Paths to exclude from rate limiting
-    EXCLUDED_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+    EXCLUDED_PATHS = {"/", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Skip rate limiting if disabled (for testing)
-        if RATE_LIMIT_DISABLED:
-            return await call_next(request)
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Skip rate limiting if disabled (for testing) and for non-HTTP scopes
+        if scope["type"] != "http" or RATE_LIMIT_DISABLED:
+            await self.app(scope, receive, send)
+            return
 
         # Skip rate limiting for excluded paths
-        if request.url.path in self.EXCLUDED_PATHS:
-            return await call_next(request)
+        if scope["path"] in self.EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
 
-        client_id = get_client_id(request)
+        client_id = get_client_id(scope)
         is_allowed, retry_after = rate_limiter.is_allowed(client_id)
 
         if not is_allowed:
             logger.warning(f"Rate limit exceeded for client: {client_id}")
-            raise RateLimitExceeded(retry_after=retry_after)
+            rate_limit_rejections.inc()
+            exc = RateLimitExceeded(retry_after=retry_after)
+            response = JSONResponse(
+                {"detail": exc.detail},
+                status_code=exc.status_code,
+                headers=exc.headers,
+            )
+            await response(scope, receive, send)
+            return
 
         # Get remaining limits
         remaining = rate_limiter.get_remaining(client_id)
 
-        # Process request
-        response = await call_next(request)
-
-        # Add rate limit headers
-        response.headers["X-RateLimit-Limit-Minute"] = str(remaining["minute"]["limit"])
-        response.headers["X-RateLimit-Remaining-Minute"] = str(remaining["minute"]["remaining"])
-        response.headers["X-RateLimit-Limit-Hour"] = str(remaining["hour"]["limit"])
-        response.headers["X-RateLimit-Remaining-Hour"] = str(remaining["hour"]["remaining"])
-
-        return response
+        async def send_with_rate_limit_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Add rate limit headers
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit-Minute"] = str(remaining["minute"]["limit"])
+                headers["X-RateLimit-Remaining-Minute"] = str(remaining["minute"]["remaining"])
+                headers["X-RateLimit-Limit-Hour"] = str(remaining["hour"]["limit"])
+                headers["X-RateLimit-Remaining-Hour"] = str(remaining["hour"]["remaining"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_rate_limit_headers)
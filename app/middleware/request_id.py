@@ -0,0 +1,33 @@
+"""Request ID middleware for tracing."""
+from uuid import uuid4
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestIDMiddleware:
+    """
+    Add unique request ID to each request for tracing.
+
+    Reuses the caller's `X-Request-ID` header when present, exposes the ID as
+    `request.state.request_id` and echoes it on the response. Written as plain
+    ASGI middleware so the response is passed through untouched, including
+    streaming bodies.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("X-Request-ID", str(uuid4()))
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
+        await self.app(scope, receive, send_with_request_id)
@@ -0,0 +1,51 @@
+"""SQL query count and time per request."""
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.metrics import route_label
+from app.services.metrics import http_request_db_duration, http_request_db_queries
+from app.utils.query_stats import track_queries
+
+
+class ServerTimingMiddleware:
+    """
+    Count the SQL statements each request executes and the time they take.
+
+    Both are recorded per route template in the metrics and, unless
+    `header` is off, reported to the client as a `Server-Timing` header:
+
+        Server-Timing: db;dur=4.2;desc="5 queries", app;dur=11.8
+
+    The header is written when the response starts, so statements a
+    streaming response runs afterwards only show up in the metrics.
+    """
+
+    def __init__(self, app: ASGIApp, header: bool = True):
+        self.app = app
+        self.header = header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+
+        with track_queries() as stats:
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start" and self.header:
+                    app_ms = (time.perf_counter() - start) * 1000
+                    queries = "1 query" if stats.count == 1 else f"{stats.count} queries"
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        f'db;dur={stats.milliseconds:.1f};desc="{queries}", app;dur={app_ms:.1f}',
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                route = route_label(scope)
+                http_request_db_queries.observe(stats.count, route)
+                http_request_db_duration.observe(stats.seconds, route)
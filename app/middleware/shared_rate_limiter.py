@@ -0,0 +1,320 @@
+"""Rate limit backend shared between worker processes."""
+import asyncio
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.middleware.rate_limiter import RateLimitBackend, sliding_retry_after
+from app.models.rate_limit import RateLimitCounter
+from app.utils.queries import DATA_EXCEPTION_SQLSTATE_CLASS, has_sqlstate_class
+
+logger = logging.getLogger(__name__)
+
+# (client_id, window name, window start in epoch seconds)
+CounterKey = tuple[str, str, int]
+
+
+def is_rejected_counter(error: Exception) -> bool:
+    """Whether the store refused a counter's values, so retrying cannot succeed."""
+    return isinstance(error, DBAPIError) and has_sqlstate_class(error, DATA_EXCEPTION_SQLSTATE_CLASS)
+
+
+class CounterStore(ABC):
+    """Shared storage for per-window request counters."""
+
+    @abstractmethod
+    async def increment(self, deltas: dict[CounterKey, int]) -> dict[CounterKey, int]:
+        """Atomically add the deltas and return the resulting totals."""
+
+    @abstractmethod
+    async def prune(self, before: int) -> int:
+        """Delete counters for windows that started before `before`."""
+
+
+class LocalCounterStore(CounterStore):
+    """
+    In-process counter store.
+
+    Stands in for a shared store in tests and single-process development:
+    several `SharedRateLimiter` instances sharing one `LocalCounterStore`
+    behave like workers sharing a database.
+    """
+
+    def __init__(self):
+        self.counters: dict[CounterKey, int] = {}
+        self.increments = 0
+
+    async def increment(self, deltas: dict[CounterKey, int]) -> dict[CounterKey, int]:
+        self.increments += 1
+        totals = {}
+        for key, delta in deltas.items():
+            totals[key] = self.counters[key] = self.counters.get(key, 0) + delta
+        return totals
+
+    async def prune(self, before: int) -> int:
+        expired = [key for key in self.counters if key[2] < before]
+        for key in expired:
+            del self.counters[key]
+        return len(expired)
+
+
+class PostgresCounterStore(CounterStore):
+    """
+    Counter store backed by the `rate_limit_counters` table.
+
+    A batch of increments is one `INSERT ... ON CONFLICT DO UPDATE SET
+    count = count + excluded.count RETURNING` statement, so concurrent
+    workers never lose updates and each flush is a single round trip.
+    """
+
+    MAX_ROWS_PER_STATEMENT = 1000
+
+    def __init__(self, session_maker: async_sessionmaker):
+        self.session_maker = session_maker
+
+    async def increment(self, deltas: dict[CounterKey, int]) -> dict[CounterKey, int]:
+        # Sorted so concurrent batches lock rows in the same order
+        rows = [
+            {"client_id": client_id, "window": window, "window_start": start, "count": delta}
+            for (client_id, window, start), delta in sorted(deltas.items())
+        ]
+
+        totals = {}
+        async with self.session_maker() as db:
+            for i in range(0, len(rows), self.MAX_ROWS_PER_STATEMENT):
+                stmt = insert(RateLimitCounter).values(rows[i:i + self.MAX_ROWS_PER_STATEMENT])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[
+                        RateLimitCounter.client_id,
+                        RateLimitCounter.window,
+                        RateLimitCounter.window_start,
+                    ],
+                    set_={"count": RateLimitCounter.count + stmt.excluded["count"]},
+                ).returning(
+                    RateLimitCounter.client_id,
+                    RateLimitCounter.window,
+                    RateLimitCounter.window_start,
+                    RateLimitCounter.count,
+                )
+                result = await db.execute(stmt)
+                for row in result:
+                    totals[(row.client_id, row.window, row.window_start)] = row.count
+            await db.commit()
+        return totals
+
+    async def prune(self, before: int) -> int:
+        async with self.session_maker() as db:
+            result = await db.execute(
+                delete(RateLimitCounter).where(RateLimitCounter.window_start < before)
+            )
+            await db.commit()
+            return result.rowcount
+
+
+class SharedRateLimiter(RateLimitBackend):
+    """
+    Sliding window counter limiter whose counts are shared across workers.
+
+    Windows are aligned to wall-clock boundaries so every worker agrees on
+    them. Requests are decided locally from the last known shared totals
+    plus this worker's unsynchronized increments, so no request waits on
+    the store. Increments are pushed in batches, at most every
+    `sync_interval_seconds` or once `sync_batch_size` requests are pending,
+    and the store returns fresh totals that include other workers' counts.
+
+    Between syncs a client can exceed the limit by the requests other
+    workers admitted but have not pushed yet, bounded by the sync interval.
+    """
+
+    WINDOWS = (("minute", 60), ("hour", 3600))
+    PRUNE_INTERVAL_SECONDS = 300
+
+    def __init__(
+        self,
+        store: CounterStore,
+        requests_per_minute: int = 60,
+        requests_per_hour: int = 1000,
+        sync_interval_seconds: float = 1.0,
+        sync_batch_size: int = 100,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store
+        self.limits = {"minute": requests_per_minute, "hour": requests_per_hour}
+        self.sync_interval_seconds = sync_interval_seconds
+        self.sync_batch_size = sync_batch_size
+        self.clock = clock
+        self._shared: dict[CounterKey, int] = {}
+        self._pending: dict[CounterKey, int] = {}
+        self._pending_requests = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        now = clock()
+        self._next_flush = now + sync_interval_seconds
+        self._next_prune = now + self.PRUNE_INTERVAL_SECONDS
+        self.flushes = 0
+        self.flush_errors = 0
+        self.dropped_counters = 0
+
+    @property
+    def requests_per_minute(self) -> int:
+        return self.limits["minute"]
+
+    @property
+    def requests_per_hour(self) -> int:
+        return self.limits["hour"]
+
+    def _count(self, key: CounterKey) -> int:
+        """Known shared total plus local increments not yet pushed."""
+        return self._shared.get(key, 0) + self._pending.get(key, 0)
+
+    def _window_counts(self, client_id: str, window: str, size: int, now: float) -> tuple[int, int, int]:
+        """Get (window_start, previous_count, current_count) for a client."""
+        start = int(now // size) * size
+        return (
+            start,
+            self._count((client_id, window, start - size)),
+            self._count((client_id, window, start)),
+        )
+
+    def is_allowed(self, client_id: str) -> tuple[bool, int]:
+        """
+        Check if request is allowed for the client.
+
+        Returns:
+            tuple: (is_allowed, retry_after_seconds)
+        """
+        now = self.clock()
+        starts = []
+        for window, size in self.WINDOWS:
+            start, previous, count = self._window_counts(client_id, window, size, now)
+            elapsed = now - start
+            limit = self.limits[window]
+            if previous * (1 - elapsed / size) + count >= limit:
+                retry_after = sliding_retry_after(previous, count, elapsed, size, limit)
+                return False, int(retry_after) + 1
+            starts.append((window, start))
+
+        for window, start in starts:
+            key = (client_id, window, start)
+            self._pending[key] = self._pending.get(key, 0) + 1
+        self._pending_requests += 1
+
+        if self._pending_requests >= self.sync_batch_size or now >= self._next_flush:
+            self._schedule_flush()
+
+        return True, 0
+
+    def get_remaining(self, client_id: str) -> dict:
+        """Get remaining request counts for a client."""
+        now = self.clock()
+        remaining = {}
+        for window, size in self.WINDOWS:
+            start, previous, count = self._window_counts(client_id, window, size, now)
+            used = previous * (1 - (now - start) / size) + count
+            limit = self.limits[window]
+            remaining[window] = {
+                "limit": limit,
+                "remaining": max(limit - math.ceil(used), 0),
+                "reset_seconds": size,
+            }
+        return remaining
+
+    def clear(self) -> None:
+        """Forget known totals and pending increments; the store is left as is."""
+        self._shared.clear()
+        self._pending.clear()
+        self._pending_requests = 0
+
+    def _schedule_flush(self) -> None:
+        """Push pending increments in the background if no push is running."""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_task = loop.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """
+        Push pending increments to the store and refresh shared totals.
+
+        Returns the number of counters pushed.
+        """
+        pending, self._pending = self._pending, {}
+        self._pending_requests = 0
+        now = self.clock()
+        self._next_flush = now + self.sync_interval_seconds
+        if not pending:
+            return 0
+
+        try:
+            totals = await self.store.increment(pending)
+        except Exception as e:
+            self.flush_errors += 1
+            if not is_rejected_counter(e):
+                logger.error(f"Failed to sync rate limit counters: {e}")
+                self._requeue(pending)
+                return 0
+            # A counter the store rejects would fail every retry of the batch
+            logger.error(f"Rate limit counter batch rejected, pushing counters one by one: {e}")
+            totals = await self._increment_each(pending)
+
+        self._shared.update(totals)
+        self.flushes += 1
+
+        if now >= self._next_prune:
+            self._next_prune = now + self.PRUNE_INTERVAL_SECONDS
+            await self._prune(now)
+
+        return len(pending)
+
+    def _requeue(self, pending: dict[CounterKey, int]) -> None:
+        """Keep increments for the next attempt."""
+        for key, delta in pending.items():
+            self._pending[key] = self._pending.get(key, 0) + delta
+
+    async def _increment_each(self, pending: dict[CounterKey, int]) -> dict[CounterKey, int]:
+        """Push counters separately, dropping the ones the store rejects."""
+        totals = {}
+        for key, delta in pending.items():
+            try:
+                totals.update(await self.store.increment({key: delta}))
+            except Exception as e:
+                if is_rejected_counter(e):
+                    self.dropped_counters += 1
+                    logger.error(f"Dropped rate limit counter for client '{key[0][:50]}': {e}")
+                else:
+                    logger.error(f"Failed to sync rate limit counters: {e}")
+                    self._requeue({key: delta})
+        return totals
+
+    async def _prune(self, now: float) -> None:
+        """Forget windows that no longer affect any estimate."""
+        oldest = {
+            window: int(now // size) * size - size
+            for window, size in self.WINDOWS
+        }
+        self._shared = {
+            key: count for key, count in self._shared.items()
+            if key[2] >= oldest[key[1]]
+        }
+        try:
+            await self.store.prune(min(oldest.values()))
+        except Exception as e:
+            logger.error(f"Failed to prune rate limit counters: {e}")
+
+    def get_stats(self) -> dict:
+        """Get synchronization statistics."""
+        return {
+            "tracked_counters": len(self._shared),
+            "pending_counters": len(self._pending),
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "dropped_counters": self.dropped_counters,
+        }
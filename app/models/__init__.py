@@ -3,6 +3,9 @@ from app.models.manual import Manual, ManualStep
 from app.models.session import Session
 from app.models.message import ConversationMessage, ProgressEvent
 from app.models.webhook_queue import WebhookQueueItem
+from app.models.analytics import AnalyticsTotals, ActivityRollup, StepFunnel
+from app.models.rate_limit import RateLimitCounter
+from app.models.idempotency import IdempotencyKey
 
 __all__ = [
     "Manual",
@@ -11,4 +14,9 @@ __all__ = [
     "ConversationMessage",
     "ProgressEvent",
     "WebhookQueueItem",
+    "AnalyticsTotals",
+    "ActivityRollup",
+    "StepFunnel",
+    "RateLimitCounter",
+    "IdempotencyKey",
 ]
@@ -0,0 +1,102 @@
+"""Analytics rollup models."""
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, BigInteger, Float, String, CheckConstraint, ForeignKey
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from app.database import Base
+
+
+class AnalyticsTotals(Base):
+    """
+    Single-row rollup of system-wide counters for the analytics overview.
+
+    Maintained incrementally from in-process counters and periodically
+    reconciled against the source tables.
+    """
+
+    __tablename__ = "analytics_totals"
+
+    id = Column(Integer, primary_key=True, default=1)
+    sessions_total = Column(BigInteger, nullable=False, default=0)
+    sessions_active = Column(BigInteger, nullable=False, default=0)
+    sessions_completed = Column(BigInteger, nullable=False, default=0)
+    sessions_abandoned = Column(BigInteger, nullable=False, default=0)
+    manuals_total = Column(BigInteger, nullable=False, default=0)
+    messages_total = Column(BigInteger, nullable=False, default=0)
+    completed_duration_seconds = Column(Float, nullable=False, default=0)
+    completed_duration_count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+    reconciled_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        CheckConstraint("id = 1", name="check_analytics_totals_single_row"),
+    )
+
+    def __repr__(self):
+        return f"<AnalyticsTotals(sessions_total={self.sessions_total}, messages_total={self.messages_total})>"
+
+
+class ActivityRollup(Base):
+    """
+    Event counts per time bucket for activity windows and trends.
+
+    Rows exist for both `minute` and `hour` granularity; counts are added
+    as events are flushed and can be rebuilt from the source tables.
+    """
+
+    __tablename__ = "activity_rollups"
+
+    granularity = Column(String(10), primary_key=True)  # 'minute', 'hour'
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    new_sessions = Column(BigInteger, nullable=False, default=0)
+    completed_sessions = Column(BigInteger, nullable=False, default=0)
+    progress_updates = Column(BigInteger, nullable=False, default=0)
+    messages = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint(
+            "granularity IN ('minute', 'hour')",
+            name="check_activity_rollup_granularity"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<ActivityRollup(granularity='{self.granularity}', bucket_start='{self.bucket_start}')>"
+
+
+# Upper bounds (seconds) of the time-on-step histogram buckets; the last
+# bucket counts everything above the final bound.
+TIME_ON_STEP_BOUNDS = (5, 10, 15, 30, 45, 60, 90, 120, 180, 300, 600, 900, 1800, 3600)
+
+
+class StepFunnel(Base):
+    """
+    Per-step funnel counters for a manual.
+
+    Time spent on a step is kept as a fixed-bucket histogram so the median
+    can be estimated without storing individual durations.
+    """
+
+    __tablename__ = "step_funnel"
+
+    manual_uuid = Column(
+        UUID(as_uuid=True),
+        ForeignKey("manuals.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    step_number = Column(Integer, primary_key=True)
+    attempts = Column(BigInteger, nullable=False, default=0)
+    completions = Column(BigInteger, nullable=False, default=0)
+    drop_offs = Column(BigInteger, nullable=False, default=0)
+    time_histogram = Column(
+        ARRAY(BigInteger),
+        nullable=False,
+        default=lambda: [0] * (len(TIME_ON_STEP_BOUNDS) + 1)
+    )
+
+    def __repr__(self):
+        return f"<StepFunnel(manual_uuid='{self.manual_uuid}', step_number={self.step_number}, attempts={self.attempts})>"
@@ -0,0 +1,29 @@
+"""Stored responses for idempotent requests."""
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, Integer, Text, DateTime, Index
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Response of the first request sent with an idempotency key, replayed to retries."""
+
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String(20), primary_key=True)  # 'progress', 'message', 'session'
+    resource_id = Column(String(100), primary_key=True)  # Session ID the request targeted
+    key = Column(String(100), primary_key=True)
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)  # Rendered JSON body
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc)
+    )
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("idx_idempotency_keys_expires_at", "expires_at"),
+    )
+
+    def __repr__(self):
+        return f"<IdempotencyKey(scope='{self.scope}', resource_id='{self.resource_id}', key='{self.key}')>"
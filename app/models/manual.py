@@ -1,7 +1,7 @@
 """Manual and ManualStep database models."""
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Integer, Text, ForeignKey, UniqueConstraint, Index
+from sqlalchemy import Column, String, DateTime, Integer, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -18,15 +18,15 @@ class Manual(Base):
     title = Column(String(255), nullable=False)
     total_steps = Column(Integer, nullable=False)
     created_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
     updated_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat(),
-        onupdate=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
     )
 
     # Relationships
@@ -38,6 +38,10 @@ class Manual(Base):
     )
     sessions = relationship("Session", back_populates="manual")
 
+    __table_args__ = (
+        Index("idx_manuals_created_at_id", "created_at", "id"),
+    )
+
     def __repr__(self):
         return f"<Manual(manual_id='{self.manual_id}', title='{self.title}', total_steps={self.total_steps})>"
 
@@ -57,9 +61,9 @@ class ManualStep(Base):
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
 
     # Relationships
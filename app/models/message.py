@@ -1,7 +1,7 @@
 """ConversationMessage and ProgressEvent database models."""
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Integer, Text, Boolean, ForeignKey, Index, UniqueConstraint, CheckConstraint
+from sqlalchemy import Column, String, DateTime, Integer, Text, Boolean, ForeignKey, Index, UniqueConstraint, CheckConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -22,9 +22,9 @@ class ConversationMessage(Base):
     sender = Column(String(20), nullable=False)  # 'user', 'agent', 'system'
     step_at_time = Column(Integer, nullable=True)  # Which step user was on
     created_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
 
     # Relationships
@@ -36,7 +36,8 @@ class ConversationMessage(Base):
             name="check_valid_sender"
         ),
         Index("idx_messages_session_id", "session_uuid"),
-        Index("idx_messages_created_at", "session_uuid", "created_at"),
+        Index("idx_messages_created_at", "session_uuid", "created_at", "id"),
+        Index("idx_messages_time", "created_at"),
     )
 
     def __repr__(self):
@@ -60,9 +61,9 @@ class ProgressEvent(Base):
     processed = Column(Boolean, nullable=False, default=False)
     idempotency_key = Column(String(100), nullable=True)
     created_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
 
     # Relationships
@@ -80,6 +81,7 @@ class ProgressEvent(Base):
         ),
         Index("idx_progress_events_session_id", "session_uuid"),
         Index("idx_progress_events_idempotency", "idempotency_key"),
+        Index("idx_progress_events_created_at", "created_at"),
     )
 
     def __repr__(self):
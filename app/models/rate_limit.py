@@ -0,0 +1,21 @@
+"""Shared rate limit counter model."""
+from sqlalchemy import Column, String, BigInteger, Index
+from app.database import Base
+
+
+class RateLimitCounter(Base):
+    """Request count for one client in one fixed rate limit window."""
+
+    __tablename__ = "rate_limit_counters"
+
+    client_id = Column(String(200), primary_key=True)
+    window = Column(String(10), primary_key=True)  # 'minute', 'hour'
+    window_start = Column(BigInteger, primary_key=True)  # Unix epoch seconds
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_rate_limit_counters_window_start", "window_start"),
+    )
+
+    def __repr__(self):
+        return f"<RateLimitCounter(client_id='{self.client_id}', window='{self.window}', count={self.count})>"
@@ -1,7 +1,7 @@
 """Session database model."""
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Integer, ForeignKey, Index, CheckConstraint
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, Index, CheckConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -23,27 +23,32 @@ class Session(Base):
     current_step = Column(Integer, nullable=False, default=1)
     status = Column(String(20), nullable=False, default="active")
     started_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
-    ended_at = Column(String(50), nullable=True)
+    ended_at = Column(DateTime(timezone=True), nullable=True)
     last_activity_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
-    version = Column(Integer, nullable=False, default=1)  # For optimistic locking
+    step_started_at = Column(
+        DateTime(timezone=True),
+        nullable=True,
+        default=lambda: datetime.now(timezone.utc)
+    )  # When the user reached the current step
+    version = Column(Integer, nullable=False, default=1)  # Bumped on every mutation (optimistic locking, ETags)
     created_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
     updated_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat(),
-        onupdate=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
     )
 
     # Relationships
@@ -52,12 +57,14 @@ class Session(Base):
         "ConversationMessage",
         back_populates="session",
         cascade="all, delete-orphan",
+        passive_deletes=True,  # Rows go with the session via ON DELETE CASCADE
         order_by="ConversationMessage.created_at"
     )
     progress_events = relationship(
         "ProgressEvent",
         back_populates="session",
         cascade="all, delete-orphan",
+        passive_deletes=True,  # Rows go with the session via ON DELETE CASCADE
         order_by="ProgressEvent.created_at"
     )
 
@@ -70,6 +77,9 @@ class Session(Base):
         Index("idx_sessions_user_id", "user_id"),
         Index("idx_sessions_status", "status"),
         Index("idx_sessions_manual_id", "manual_uuid"),
+        Index("idx_sessions_created_at_id", "created_at", "id"),
+        Index("idx_sessions_status_last_activity", "status", "last_activity_at"),
+        Index("idx_sessions_status_ended_at", "status", "ended_at"),
     )
 
     def __repr__(self):
@@ -81,11 +91,5 @@ class Session(Base):
         if not self.started_at:
             return None
 
-        start = datetime.fromisoformat(self.started_at.replace("Z", "+00:00"))
-
-        if self.ended_at:
-            end = datetime.fromisoformat(self.ended_at.replace("Z", "+00:00"))
-        else:
-            end = datetime.now(timezone.utc)
-
-        return (end - start).total_seconds()
+        end = self.ended_at or datetime.now(timezone.utc)
+        return (end - self.started_at).total_seconds()
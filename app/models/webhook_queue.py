@@ -1,7 +1,7 @@
 """Webhook queue model for retry mechanism."""
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy import Column, String, Integer, Text, Index
+from sqlalchemy import Column, String, DateTime, Integer, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
 
@@ -18,18 +18,18 @@ class WebhookQueueItem(Base):
     session_id = Column(String(100), nullable=True)
     attempts = Column(Integer, nullable=False, default=0)
     max_attempts = Column(Integer, nullable=False, default=3)
-    last_attempt_at = Column(String(50), nullable=True)
+    last_attempt_at = Column(DateTime(timezone=True), nullable=True)
     last_error = Column(Text, nullable=True)
     status = Column(String(20), nullable=False, default="pending")  # pending, success, failed
     created_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
     next_retry_at = Column(
-        String(50),
+        DateTime(timezone=True),
         nullable=False,
-        default=lambda: datetime.now(timezone.utc).isoformat()
+        default=lambda: datetime.now(timezone.utc)
     )
 
     __table_args__ = (
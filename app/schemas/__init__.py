@@ -1,4 +1,5 @@
 """Pydantic schemas for request/response validation."""
+from app.schemas.admin import ProfilerStart
 from app.schemas.manual import (
     ManualCreate,
     ManualResponse,
@@ -43,4 +44,6 @@ __all__ = [
     "ProgressUpdate",
     "ProgressResponse",
     "NextStepResponse",
+    # Admin schemas
+    "ProfilerStart",
 ]
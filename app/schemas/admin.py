@@ -0,0 +1,31 @@
+"""Pydantic schemas for admin operations."""
+from typing import Optional
+from pydantic import BaseModel, Field
+
+
+class ProfilerStart(BaseModel):
+    """Schema for starting a profiling run."""
+
+    duration_seconds: float = Field(
+        30,
+        gt=0,
+        le=600,
+        description="How long to profile; the run stops by itself afterwards"
+    )
+    sample_rate: float = Field(
+        1.0,
+        gt=0,
+        le=1,
+        description="Fraction of requests to profile"
+    )
+    route: Optional[str] = Field(
+        None,
+        max_length=200,
+        description="Only profile this route template, e.g. /api/v1/sessions/{session_id}/progress"
+    )
+    interval_ms: float = Field(
+        5,
+        ge=1,
+        le=1000,
+        description="Time between stack samples"
+    )
@@ -20,7 +20,7 @@ class ManualStepResponse(BaseModel):
     step_number: int
     title: str
     content: str
-    created_at: str
+    created_at: datetime
 
     class Config:
         from_attributes = True
@@ -74,8 +74,8 @@ class ManualResponse(BaseModel):
     title: str
     total_steps: int
     steps: List[ManualStepResponse] = []
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
 
     class Config:
         from_attributes = True
@@ -86,3 +86,7 @@ class ManualListResponse(BaseModel):
 
     manuals: List[ManualResponse]
     total: int
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor for the next page; None on the last page"
+    )
@@ -42,7 +42,7 @@ class MessageResponse(BaseModel):
     message: str
     sender: str
     step_at_time: Optional[int] = None
-    created_at: str
+    created_at: datetime
 
     class Config:
         from_attributes = True
@@ -54,3 +54,7 @@ class MessageListResponse(BaseModel):
     messages: List[MessageResponse]
     total: int
     session_id: str
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor for the next page; None on the last page"
+    )
@@ -56,12 +56,12 @@ class SessionResponse(BaseModel):
     current_step: int
     total_steps: int
     status: str
-    started_at: str
-    ended_at: Optional[str] = None
-    last_activity_at: str
+    started_at: datetime
+    ended_at: Optional[datetime] = None
+    last_activity_at: datetime
     duration_seconds: Optional[float] = None
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: datetime
 
     class Config:
         from_attributes = True
@@ -72,6 +72,10 @@ class SessionListResponse(BaseModel):
 
     sessions: List[SessionResponse]
     total: int
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor for the next page; None on the last page"
+    )
 
 
 class SessionDeleteResponse(BaseModel):
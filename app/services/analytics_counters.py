@@ -0,0 +1,569 @@
+"""In-process analytics counters flushed to the analytics rollup tables."""
+import asyncio
+import logging
+from bisect import bisect_right
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+from uuid import UUID
+from sqlalchemy import select, update, delete, func, case, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Session, Manual, ConversationMessage, ProgressEvent, AnalyticsTotals, ActivityRollup, StepFunnel
+from app.models.analytics import TIME_ON_STEP_BOUNDS
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = (
+    "sessions_total",
+    "sessions_active",
+    "sessions_completed",
+    "sessions_abandoned",
+    "manuals_total",
+    "messages_total",
+    "completed_duration_seconds",
+    "completed_duration_count",
+)
+
+ACTIVITY_FIELDS = (
+    "new_sessions",
+    "completed_sessions",
+    "progress_updates",
+    "messages",
+)
+
+BUCKET_GRANULARITIES = ("minute", "hour")
+
+# Bucket rows per INSERT when backfilling (six bind parameters each)
+BACKFILL_INSERT_ROWS = 1000
+
+
+FUNNEL_FIELDS = ("attempts", "completions", "drop_offs")
+
+HISTOGRAM_SIZE = len(TIME_ON_STEP_BOUNDS) + 1
+
+# Rebuilds the whole funnel from progress_events and sessions. A step's
+# time-on-step is the gap between the event that completed it and the
+# previous completion in the session (or the session start); the histogram
+# bucket matches `time_on_step_bucket` via `width_bucket`.
+REBUILD_STEP_FUNNEL_SQL = f"""
+WITH completed_steps AS (
+    SELECT s.manual_uuid, p.step_number,
+           extract(epoch FROM p.created_at - coalesce(
+               lag(p.created_at) OVER (PARTITION BY p.session_uuid ORDER BY p.created_at),
+               s.started_at
+           ))::float8 AS seconds
+    FROM progress_events p JOIN sessions s ON s.id = p.session_uuid
+    WHERE p.processed
+),
+counts AS (
+    SELECT s.manual_uuid, p.step_number,
+           count(*) AS attempts,
+           count(*) FILTER (WHERE p.step_status = 'DONE') AS completions
+    FROM progress_events p JOIN sessions s ON s.id = p.session_uuid
+    GROUP BY s.manual_uuid, p.step_number
+),
+drops AS (
+    SELECT s.manual_uuid, s.current_step AS step_number, count(*) AS drop_offs
+    FROM sessions s JOIN manuals m ON m.id = s.manual_uuid
+    WHERE s.status = 'abandoned' AND s.current_step <= m.total_steps
+    GROUP BY s.manual_uuid, s.current_step
+),
+histogram AS (
+    SELECT manual_uuid, step_number,
+           width_bucket(seconds, ARRAY{list(map(float, TIME_ON_STEP_BOUNDS))}::float8[]) AS bucket,
+           count(*) AS n
+    FROM completed_steps
+    GROUP BY 1, 2, 3
+),
+keys AS (
+    SELECT manual_uuid, step_number FROM counts
+    UNION
+    SELECT manual_uuid, step_number FROM drops
+)
+INSERT INTO step_funnel (manual_uuid, step_number, attempts, completions, drop_offs, time_histogram)
+SELECT k.manual_uuid, k.step_number,
+       coalesce(c.attempts, 0), coalesce(c.completions, 0), coalesce(d.drop_offs, 0),
+       ARRAY(
+           SELECT coalesce(h.n, 0)
+           FROM generate_series(0, {HISTOGRAM_SIZE - 1}) AS b
+           LEFT JOIN histogram h
+             ON h.manual_uuid = k.manual_uuid AND h.step_number = k.step_number AND h.bucket = b
+           ORDER BY b
+       )
+FROM keys k
+LEFT JOIN counts c USING (manual_uuid, step_number)
+LEFT JOIN drops d USING (manual_uuid, step_number)
+"""
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Truncate a timestamp to the start of its bucket."""
+    if granularity == "minute":
+        return moment.replace(second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def time_on_step_bucket(seconds: float) -> int:
+    """Get the histogram bucket index for a time-on-step duration."""
+    return bisect_right(TIME_ON_STEP_BOUNDS, seconds)
+
+
+def empty_funnel_entry() -> dict:
+    """Create zeroed funnel counters for one step."""
+    return {
+        **dict.fromkeys(FUNNEL_FIELDS, 0),
+        "time_histogram": [0] * HISTOGRAM_SIZE,
+    }
+
+
+class AnalyticsCounters:
+    """
+    Accumulator for analytics deltas with periodic flush and reconcile.
+
+    Services record deltas after their transaction commits; recording is a
+    dict update and never touches the database. The background worker
+    flushes pending deltas into the single `analytics_totals` row with
+    atomic `col = col + delta` updates, so any number of processes can
+    share the rollup.
+
+    Events are also counted per minute and per hour bucket and upserted
+    into `activity_rollups` in the same flush, so activity windows and
+    trends read O(buckets) rows instead of scanning the event tables.
+    Progress events and drop-offs are likewise merged into the per-step
+    `step_funnel` rows.
+
+    Deltas are lost if a process dies before flushing, and a few events can
+    be double counted around a reconcile. `reconcile()` recomputes every
+    counter from the source tables and overwrites the row to correct that
+    drift.
+    """
+
+    ROW_ID = 1
+
+    def __init__(self):
+        self._pending: dict[str, float] = {}
+        self._activity: dict[tuple[str, datetime], dict[str, int]] = {}
+        self._funnel: dict[tuple[UUID, int], dict] = {}
+        self._lock = asyncio.Lock()
+        self.flushes = 0
+        self.last_flush_at: Optional[datetime] = None
+        self.last_reconcile_at: Optional[datetime] = None
+
+    def add(self, **deltas: float) -> None:
+        """Record counter deltas to be flushed."""
+        for field, delta in deltas.items():
+            if delta:
+                self._pending[field] = self._pending.get(field, 0) + delta
+
+    def record_activity(self, moment: Optional[datetime] = None, **counts: int) -> None:
+        """Count events in the minute and hour buckets containing `moment`."""
+        moment = moment or datetime.now(timezone.utc)
+        for granularity in BUCKET_GRANULARITIES:
+            bucket = self._activity.setdefault(
+                (granularity, bucket_start(moment, granularity)), {}
+            )
+            for field, count in counts.items():
+                bucket[field] = bucket.get(field, 0) + count
+
+    def _enter_status(self, status: str, duration_seconds: Optional[float]) -> None:
+        """Count a session entering a status."""
+        self.add(**{f"sessions_{status}": 1})
+        if status == "completed":
+            self.record_activity(completed_sessions=1)
+            if duration_seconds is not None:
+                self.add(completed_duration_seconds=duration_seconds, completed_duration_count=1)
+
+    def _leave_status(self, status: str, duration_seconds: Optional[float]) -> None:
+        """Count a session leaving a status."""
+        self.add(**{f"sessions_{status}": -1})
+        if status == "completed" and duration_seconds is not None:
+            self.add(completed_duration_seconds=-duration_seconds, completed_duration_count=-1)
+
+    def session_created(self) -> None:
+        """Record a new active session."""
+        self.add(sessions_total=1)
+        self._enter_status("active", None)
+        self.record_activity(new_sessions=1)
+
+    def session_status_changed(
+        self,
+        previous: str,
+        current: str,
+        duration_seconds: Optional[float] = None,
+        previous_duration_seconds: Optional[float] = None,
+    ) -> None:
+        """Record a session moving between statuses."""
+        if previous == current:
+            return
+        self._leave_status(previous, previous_duration_seconds)
+        self._enter_status(current, duration_seconds)
+
+    def sessions_abandoned(self, count: int) -> None:
+        """Record active sessions abandoned in bulk by the cleanup task."""
+        self.add(sessions_active=-count, sessions_abandoned=count)
+
+    def session_deleted(
+        self,
+        status: str,
+        duration_seconds: Optional[float],
+        message_count: int,
+    ) -> None:
+        """Record a deleted session and its cascaded messages."""
+        self.add(sessions_total=-1, messages_total=-message_count)
+        self._leave_status(status, duration_seconds)
+
+    def message_added(self, count: int = 1) -> None:
+        """Record new conversation messages."""
+        self.add(messages_total=count)
+        self.record_activity(messages=count)
+
+    def progress_recorded(self) -> None:
+        """Record a progress event."""
+        self.record_activity(progress_updates=1)
+
+    def step_recorded(
+        self,
+        manual_uuid: UUID,
+        step_number: int,
+        completed: bool,
+        time_on_step: Optional[float] = None,
+    ) -> None:
+        """Record a progress event in the step funnel."""
+        entry = self._funnel.setdefault((manual_uuid, step_number), empty_funnel_entry())
+        entry["attempts"] += 1
+        if completed:
+            entry["completions"] += 1
+        if time_on_step is not None:
+            entry["time_histogram"][time_on_step_bucket(time_on_step)] += 1
+
+    def step_dropped(self, manual_uuid: UUID, step_number: int, count: int = 1) -> None:
+        """Record sessions abandoned on a step."""
+        entry = self._funnel.setdefault((manual_uuid, step_number), empty_funnel_entry())
+        entry["drop_offs"] += count
+
+    def manual_created(self) -> None:
+        """Record a new manual."""
+        self.add(manuals_total=1)
+
+    def manual_deleted(self) -> None:
+        """Record a deleted manual."""
+        self.add(manuals_total=-1)
+
+    def clear(self) -> None:
+        """Drop pending deltas."""
+        self._pending.clear()
+        self._activity.clear()
+        self._funnel.clear()
+
+    def _restore(self, pending: dict, activity: dict, funnel: dict) -> None:
+        """Merge deltas from a failed flush back into the pending state."""
+        self.add(**pending)
+        for key, counts in activity.items():
+            bucket = self._activity.setdefault(key, {})
+            for field, count in counts.items():
+                bucket[field] = bucket.get(field, 0) + count
+        for key, counts in funnel.items():
+            entry = self._funnel.setdefault(key, empty_funnel_entry())
+            for field in FUNNEL_FIELDS:
+                entry[field] += counts[field]
+            for i, count in enumerate(counts["time_histogram"]):
+                entry["time_histogram"][i] += count
+
+    async def flush(self, db: AsyncSession) -> int:
+        """
+        Apply pending deltas to the rollup tables.
+
+        Returns the number of counters and buckets written. If the totals
+        row does not exist yet it is created by a full reconcile instead.
+        """
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            activity, self._activity = self._activity, {}
+            funnel, self._funnel = self._funnel, {}
+            if not pending and not activity and not funnel:
+                return 0
+
+            try:
+                if activity:
+                    await self._upsert_activity(db, activity)
+                if funnel:
+                    await self._upsert_funnel(db, funnel)
+
+                if pending:
+                    values = {
+                        field: getattr(AnalyticsTotals, field) + delta
+                        for field, delta in pending.items()
+                    }
+                    values["updated_at"] = datetime.now(timezone.utc)
+                    result = await db.execute(
+                        update(AnalyticsTotals)
+                        .where(AnalyticsTotals.id == self.ROW_ID)
+                        .values(**values)
+                    )
+                    if result.rowcount == 0:
+                        # The reconcile counts these committed events itself
+                        await self._reconcile(db)
+
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                # Keep the deltas for the next attempt
+                self._restore(pending, activity, funnel)
+                raise
+
+            self.flushes += 1
+            self.last_flush_at = datetime.now(timezone.utc)
+            return len(pending) + len(activity) + len(funnel)
+
+    async def _upsert_activity(
+        self,
+        db: AsyncSession,
+        activity: dict[tuple[str, datetime], dict[str, int]],
+    ) -> None:
+        """Add bucket counts to `activity_rollups`, creating missing buckets."""
+        # Sorted so concurrent flushes lock bucket rows in the same order
+        rows = [
+            {
+                "granularity": granularity,
+                "bucket_start": start,
+                **{field: counts.get(field, 0) for field in ACTIVITY_FIELDS},
+            }
+            for (granularity, start), counts in sorted(activity.items())
+        ]
+        stmt = insert(ActivityRollup).values(rows)
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ActivityRollup.granularity, ActivityRollup.bucket_start],
+                set_={
+                    field: getattr(ActivityRollup, field) + stmt.excluded[field]
+                    for field in ACTIVITY_FIELDS
+                },
+            )
+        )
+
+    async def _upsert_funnel(self, db: AsyncSession, funnel: dict[tuple[UUID, int], dict]) -> None:
+        """Add step counters to `step_funnel`, merging histograms element-wise."""
+        rows = [
+            {"manual_uuid": manual_uuid, "step_number": step_number, **counts}
+            for (manual_uuid, step_number), counts in sorted(funnel.items())
+        ]
+        stmt = insert(StepFunnel).values(rows)
+        merged_histogram = literal_column(
+            "ARRAY(SELECT a + b FROM unnest(step_funnel.time_histogram, "
+            "excluded.time_histogram) WITH ORDINALITY AS t(a, b, i) ORDER BY i)"
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[StepFunnel.manual_uuid, StepFunnel.step_number],
+                set_={
+                    **{
+                        field: getattr(StepFunnel, field) + stmt.excluded[field]
+                        for field in FUNNEL_FIELDS
+                    },
+                    "time_histogram": merged_histogram,
+                },
+            )
+        )
+
+    async def rebuild_step_funnel(self, db: AsyncSession) -> None:
+        """Recompute the step funnel from progress events and sessions."""
+        async with self._lock:
+            # Committed events are about to be counted from the tables
+            self._funnel.clear()
+            await db.execute(delete(StepFunnel))
+            await db.execute(text(REBUILD_STEP_FUNNEL_SQL))
+            await db.commit()
+
+    def get_pending_funnel(self, manual_uuid: UUID) -> dict[int, dict]:
+        """Get step counters recorded in this process but not yet flushed."""
+        return {
+            step_number: counts
+            for (entry_manual, step_number), counts in self._funnel.items()
+            if entry_manual == manual_uuid
+        }
+
+    async def reconcile(self, db: AsyncSession) -> dict:
+        """Recompute every counter from the source tables."""
+        async with self._lock:
+            return await self._reconcile(db)
+
+    async def _reconcile(self, db: AsyncSession) -> dict:
+        """Recompute and overwrite the rollup row. Caller holds the lock."""
+        # Committed events are about to be counted from the tables
+        self._pending.clear()
+        totals = await self._count_totals(db)
+
+        now = datetime.now(timezone.utc)
+        stmt = insert(AnalyticsTotals).values(
+            id=self.ROW_ID, updated_at=now, reconciled_at=now, **totals
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[AnalyticsTotals.id],
+                set_={
+                    **{field: stmt.excluded[field] for field in COUNTER_FIELDS},
+                    "updated_at": now,
+                    "reconciled_at": now,
+                },
+            )
+        )
+        await db.commit()
+
+        self.last_reconcile_at = now
+        logger.info(f"Reconciled analytics totals: {totals}")
+        return totals
+
+    async def _count_totals(self, db: AsyncSession) -> dict:
+        """Count every counter from the source tables without writing."""
+        session_stats = (await db.execute(
+            select(
+                func.count(Session.id).label("total"),
+                func.sum(case((Session.status == "active", 1), else_=0)).label("active"),
+                func.sum(case((Session.status == "completed", 1), else_=0)).label("completed"),
+                func.sum(case((Session.status == "abandoned", 1), else_=0)).label("abandoned"),
+            )
+        )).one()
+
+        duration_stats = (await db.execute(
+            select(
+                func.sum(func.extract("epoch", Session.ended_at - Session.started_at)),
+                func.count(Session.id),
+            ).where(Session.status == "completed", Session.ended_at.isnot(None))
+        )).one()
+
+        manuals_total = (await db.execute(select(func.count(Manual.id)))).scalar() or 0
+        messages_total = (await db.execute(select(func.count(ConversationMessage.id)))).scalar() or 0
+
+        return {
+            "sessions_total": session_stats.total or 0,
+            "sessions_active": session_stats.active or 0,
+            "sessions_completed": session_stats.completed or 0,
+            "sessions_abandoned": session_stats.abandoned or 0,
+            "manuals_total": manuals_total,
+            "messages_total": messages_total,
+            "completed_duration_seconds": float(duration_stats[0] or 0),
+            "completed_duration_count": duration_stats[1] or 0,
+        }
+
+    async def get_totals(self, db: AsyncSession) -> dict:
+        """
+        Get current counter values with a single-row read.
+
+        Deltas recorded in this process but not yet flushed are added on
+        top, so the caller sees its own writes immediately. Nothing is
+        written, so `db` may be a read replica: until the rollup row exists
+        the counters are counted from the source tables, which already
+        include those deltas, and the next flush or reconcile creates the row.
+        """
+        row = (await db.execute(
+            select(AnalyticsTotals).where(AnalyticsTotals.id == self.ROW_ID)
+        )).scalar_one_or_none()
+
+        if row is None:
+            return await self._count_totals(db)
+
+        totals = {field: getattr(row, field) for field in COUNTER_FIELDS}
+        for field, delta in self._pending.items():
+            totals[field] += delta
+        return totals
+
+    def get_pending_activity(self, granularity: str) -> dict[datetime, dict[str, int]]:
+        """Get bucket counts recorded in this process but not yet flushed."""
+        return {
+            start: counts
+            for (bucket_granularity, start), counts in self._activity.items()
+            if bucket_granularity == granularity
+        }
+
+    async def backfill_activity(
+        self,
+        db: AsyncSession,
+        since: datetime,
+        until: Optional[datetime] = None,
+    ) -> int:
+        """
+        Rebuild activity buckets between `since` and `until` from the source tables.
+
+        Existing buckets in the range are replaced. Returns the number of
+        bucket rows written.
+        """
+        since = bucket_start(since, "hour")
+        until = until or datetime.now(timezone.utc)
+
+        sources = (
+            ("new_sessions", Session.created_at, ()),
+            ("completed_sessions", Session.ended_at, (Session.status == "completed",)),
+            ("progress_updates", ProgressEvent.created_at, ()),
+            ("messages", ConversationMessage.created_at, ()),
+        )
+
+        async with self._lock:
+            rows = []
+            for granularity in BUCKET_GRANULARITIES:
+                buckets: dict[datetime, dict[str, int]] = {}
+                for field, column, criteria in sources:
+                    # Truncate in UTC regardless of the connection's time zone
+                    bucket = func.date_trunc(granularity, func.timezone("UTC", column))
+                    result = await db.execute(
+                        select(bucket, func.count())
+                        .where(column >= since, column < until, *criteria)
+                        .group_by(bucket)
+                    )
+                    for start, count in result:
+                        start = start.replace(tzinfo=timezone.utc)
+                        buckets.setdefault(start, {})[field] = count
+
+                rows.extend(
+                    {
+                        "granularity": granularity,
+                        "bucket_start": start,
+                        **{field: counts.get(field, 0) for field in ACTIVITY_FIELDS},
+                    }
+                    for start, counts in sorted(buckets.items())
+                )
+
+            await db.execute(
+                delete(ActivityRollup).where(
+                    ActivityRollup.bucket_start >= since,
+                    ActivityRollup.bucket_start < until,
+                )
+            )
+            # A week of minute buckets exceeds the bind parameter limit of one statement
+            for i in range(0, len(rows), BACKFILL_INSERT_ROWS):
+                await db.execute(insert(ActivityRollup).values(rows[i:i + BACKFILL_INSERT_ROWS]))
+            await db.commit()
+
+            # Pending events in the range were committed and are now counted
+            for key in [key for key in self._activity if since <= key[1] < until]:
+                del self._activity[key]
+
+        logger.info(f"Backfilled {len(rows)} activity buckets since {since.isoformat()}")
+        return len(rows)
+
+    async def prune_activity(self, db: AsyncSession, retention_hours: int) -> int:
+        """Delete minute buckets older than the retention window."""
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=retention_hours)
+        result = await db.execute(
+            delete(ActivityRollup).where(
+                ActivityRollup.granularity == "minute",
+                ActivityRollup.bucket_start < cutoff,
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+    def get_stats(self) -> dict:
+        """Get flush and reconcile statistics."""
+        return {
+            "pending_counters": len(self._pending),
+            "pending_buckets": len(self._activity),
+            "pending_funnel_steps": len(self._funnel),
+            "flushes": self.flushes,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+            "last_reconcile_at": self.last_reconcile_at.isoformat() if self.last_reconcile_at else None,
+        }
+
+
+# Global instance
+analytics_counters = AnalyticsCounters()
@@ -2,15 +2,48 @@
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import Optional
-from sqlalchemy import select, func, case, and_, cast
-from sqlalchemy.types import DateTime
+from sqlalchemy import select, func, case, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Session, Manual, ConversationMessage, ProgressEvent
+from app.models import Session, Manual, ConversationMessage, ActivityRollup, StepFunnel
+from app.models.analytics import TIME_ON_STEP_BOUNDS
+from app.services.analytics_counters import (
+    ACTIVITY_FIELDS,
+    FUNNEL_FIELDS,
+    analytics_counters,
+    bucket_start,
+    empty_funnel_entry,
+)
+from app.services.manual_service import ManualService
+from app.utils.exceptions import ManualNotFoundError
 
 logger = logging.getLogger(__name__)
 
 
+def histogram_median(histogram: list[int]) -> Optional[float]:
+    """
+    Estimate the median time-on-step from a bucket histogram.
+
+    Interpolates linearly inside the bucket holding the middle value; the
+    open-ended last bucket reports its lower bound.
+    """
+    total = sum(histogram)
+    if total == 0:
+        return None
+
+    target = total / 2
+    cumulative = 0
+    for i, count in enumerate(histogram):
+        if count and cumulative + count >= target:
+            lower = TIME_ON_STEP_BOUNDS[i - 1] if i > 0 else 0
+            if i >= len(TIME_ON_STEP_BOUNDS):
+                return float(lower)
+            upper = TIME_ON_STEP_BOUNDS[i]
+            return lower + (target - cumulative) / count * (upper - lower)
+        cumulative += count
+    return None
+
+
 class AnalyticsService:
     """Service for generating analytics and statistics."""
 
@@ -18,55 +51,38 @@ class AnalyticsService:
         self.db = db
 
     async def get_overview_stats(self) -> dict:
-        """Get overall system statistics."""
-        # Session counts by status
-        session_stats = await self.db.execute(
-            select(
-                func.count(Session.id).label("total"),
-                func.sum(case((Session.status == "active", 1), else_=0)).label("active"),
-                func.sum(case((Session.status == "completed", 1), else_=0)).label("completed"),
-                func.sum(case((Session.status == "abandoned", 1), else_=0)).label("abandoned"),
-            )
-        )
-        stats = session_stats.one()
-
-        # Manual count
-        manual_count = await self.db.execute(select(func.count(Manual.id)))
-        total_manuals = manual_count.scalar() or 0
+        """
+        Get overall system statistics.
 
-        # Message count
-        message_count = await self.db.execute(select(func.count(ConversationMessage.id)))
-        total_messages = message_count.scalar() or 0
+        Reads the maintained `analytics_totals` rollup, so the cost does not
+        grow with the number of sessions or messages.
+        """
+        totals = await analytics_counters.get_totals(self.db)
 
         # Average completion rate
-        total = stats.total or 0
-        completed = stats.completed or 0
+        total = totals["sessions_total"]
+        completed = totals["sessions_completed"]
         completion_rate = (completed / total * 100) if total > 0 else 0
 
         # Average session duration for completed sessions
-        # Note: started_at and ended_at are stored as ISO strings
-        duration_result = await self.db.execute(
-            select(func.avg(
-                func.extract('epoch',
-                    cast(Session.ended_at, DateTime) -
-                    cast(Session.started_at, DateTime)
-                )
-            )).where(Session.status == "completed", Session.ended_at.isnot(None))
+        duration_count = totals["completed_duration_count"]
+        avg_duration = (
+            totals["completed_duration_seconds"] / duration_count
+            if duration_count > 0 else 0
         )
-        avg_duration = duration_result.scalar() or 0
 
         return {
             "sessions": {
-                "total": stats.total or 0,
-                "active": stats.active or 0,
-                "completed": stats.completed or 0,
-                "abandoned": stats.abandoned or 0,
+                "total": total,
+                "active": totals["sessions_active"],
+                "completed": completed,
+                "abandoned": totals["sessions_abandoned"],
             },
             "manuals": {
-                "total": total_manuals,
+                "total": totals["manuals_total"],
             },
             "messages": {
-                "total": total_messages,
+                "total": totals["messages_total"],
             },
             "metrics": {
                 "completion_rate_percent": round(completion_rate, 2),
@@ -104,44 +120,86 @@ class AnalyticsService:
 
         return manuals
 
-    async def get_recent_activity(self, hours: int = 24) -> dict:
-        """Get activity statistics for the last N hours."""
-        cutoff = datetime.now(timezone.utc) - timedelta(hours=hours)
-        cutoff_str = cutoff.isoformat()
-
-        # New sessions in time period
-        new_sessions = await self.db.execute(
-            select(func.count(Session.id))
-            .where(Session.created_at >= cutoff_str)
-        )
-
-        # Completed sessions in time period
-        completed_sessions = await self.db.execute(
-            select(func.count(Session.id))
-            .where(
-                Session.status == "completed",
-                Session.ended_at >= cutoff_str
+    async def _load_buckets(
+        self,
+        granularity: str,
+        since: datetime,
+        until: datetime
+    ) -> dict[datetime, dict[str, int]]:
+        """Get activity buckets in `[since, until)` including unflushed counts."""
+        result = await self.db.execute(
+            select(ActivityRollup).where(
+                ActivityRollup.granularity == granularity,
+                ActivityRollup.bucket_start >= since,
+                ActivityRollup.bucket_start < until,
             )
         )
+        buckets = {
+            row.bucket_start: {field: getattr(row, field) for field in ACTIVITY_FIELDS}
+            for row in result.scalars()
+        }
 
-        # Progress events in time period
-        progress_events = await self.db.execute(
-            select(func.count(ProgressEvent.id))
-            .where(ProgressEvent.created_at >= cutoff_str)
-        )
+        for start, counts in analytics_counters.get_pending_activity(granularity).items():
+            if since <= start < until:
+                bucket = buckets.setdefault(start, dict.fromkeys(ACTIVITY_FIELDS, 0))
+                for field, count in counts.items():
+                    bucket[field] += count
 
-        # Messages in time period
-        messages = await self.db.execute(
-            select(func.count(ConversationMessage.id))
-            .where(ConversationMessage.created_at >= cutoff_str)
+        return buckets
+
+    async def get_recent_activity(self, hours: int = 24) -> dict:
+        """
+        Get activity statistics for the last N hours.
+
+        Sums hour buckets for the whole hours in the window and minute
+        buckets for the partial hour at its start, so at most a few hundred
+        rollup rows are read however much activity there was.
+        """
+        now = datetime.now(timezone.utc)
+        cutoff = bucket_start(now - timedelta(hours=hours), "minute")
+        first_hour = bucket_start(cutoff, "hour")
+        if first_hour < cutoff:
+            first_hour += timedelta(hours=1)
+
+        totals = dict.fromkeys(ACTIVITY_FIELDS, 0)
+        ranges = (
+            ("minute", cutoff, first_hour),
+            ("hour", first_hour, now + timedelta(hours=1)),
         )
+        for granularity, since, until in ranges:
+            buckets = await self._load_buckets(granularity, since, until)
+            for counts in buckets.values():
+                for field, count in counts.items():
+                    totals[field] += count
 
         return {
             "time_period_hours": hours,
-            "new_sessions": new_sessions.scalar() or 0,
-            "completed_sessions": completed_sessions.scalar() or 0,
-            "progress_updates": progress_events.scalar() or 0,
-            "messages": messages.scalar() or 0,
+            "new_sessions": totals["new_sessions"],
+            "completed_sessions": totals["completed_sessions"],
+            "progress_updates": totals["progress_updates"],
+            "messages": totals["messages"],
+        }
+
+    async def get_activity_trends(self, hours: int = 24, bucket: str = "hour") -> dict:
+        """Get activity counts per time bucket for the last N hours."""
+        step = timedelta(minutes=1) if bucket == "minute" else timedelta(hours=1)
+        now = datetime.now(timezone.utc)
+        since = bucket_start(now - timedelta(hours=hours), bucket)
+        buckets = await self._load_buckets(bucket, since, now + step)
+
+        # Zero-fill empty buckets so the series is continuous for charting
+        series = []
+        start = since
+        last = bucket_start(now, bucket)
+        while start <= last:
+            counts = buckets.get(start, dict.fromkeys(ACTIVITY_FIELDS, 0))
+            series.append({"bucket_start": start.isoformat(), **counts})
+            start += step
+
+        return {
+            "time_period_hours": hours,
+            "bucket": bucket,
+            "series": series,
         }
 
     async def get_user_stats(self, user_id: str) -> dict:
@@ -175,37 +233,51 @@ class AnalyticsService:
         }
 
     async def get_step_analytics(self, manual_id: str) -> dict:
-        """Get step-by-step analytics for a manual."""
-        # Get manual
-        manual_result = await self.db.execute(
-            select(Manual).where(Manual.manual_id == manual_id)
-        )
-        manual = manual_result.scalar_one_or_none()
+        """
+        Get step-by-step analytics for a manual.
 
-        if not manual:
+        Reads the precomputed `step_funnel` rows for the manual, so the cost
+        depends on the number of steps rather than the number of events.
+        """
+        try:
+            manual = await ManualService(self.db).get_cached_manual_by_id(manual_id)
+        except ManualNotFoundError:
             return {"error": f"Manual '{manual_id}' not found"}
 
-        # Get completion count per step
-        step_stats = await self.db.execute(
-            select(
-                ProgressEvent.step_number,
-                func.count(ProgressEvent.id).label("attempts"),
-                func.sum(case((ProgressEvent.step_status == "DONE", 1), else_=0)).label("completions"),
-            )
-            .join(Session, ProgressEvent.session_uuid == Session.id)
-            .where(Session.manual_uuid == manual.id)
-            .group_by(ProgressEvent.step_number)
-            .order_by(ProgressEvent.step_number)
+        result = await self.db.execute(
+            select(StepFunnel).where(StepFunnel.manual_uuid == manual.id)
         )
+        funnel = {
+            row.step_number: {
+                "attempts": row.attempts,
+                "completions": row.completions,
+                "drop_offs": row.drop_offs,
+                "time_histogram": list(row.time_histogram),
+            }
+            for row in result.scalars()
+        }
+
+        for step_number, counts in analytics_counters.get_pending_funnel(manual.id).items():
+            entry = funnel.setdefault(step_number, empty_funnel_entry())
+            for field in FUNNEL_FIELDS:
+                entry[field] += counts[field]
+            entry["time_histogram"] = [
+                a + b for a, b in zip(entry["time_histogram"], counts["time_histogram"])
+            ]
 
         steps = []
-        for row in step_stats:
-            completion_rate = (row.completions / row.attempts * 100) if row.attempts > 0 else 0
+        for step_number in sorted(funnel):
+            row = funnel[step_number]
+            attempts = row["attempts"]
+            completion_rate = (row["completions"] / attempts * 100) if attempts > 0 else 0
+            median = histogram_median(row["time_histogram"])
             steps.append({
-                "step_number": row.step_number,
-                "attempts": row.attempts,
-                "completions": row.completions or 0,
+                "step_number": step_number,
+                "attempts": attempts,
+                "completions": row["completions"],
                 "completion_rate_percent": round(completion_rate, 2),
+                "drop_offs": row["drop_offs"],
+                "median_time_on_step_seconds": round(median, 2) if median is not None else None,
             })
 
         return {
@@ -1,12 +1,15 @@
 """Background task service for automated maintenance."""
 import logging
 import asyncio
+from collections import Counter
 from datetime import datetime, timezone, timedelta
 from sqlalchemy import update, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import async_session_maker
 from app.models import Session
+from app.services.analytics_counters import analytics_counters
+from app.services.idempotency import idempotency_store
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -21,6 +24,9 @@ class BackgroundTaskService:
         self.cleanup_interval_seconds = 300  # Run every 5 minutes
         self.session_timeout_minutes = 30  # Mark sessions as abandoned after 30 min inactivity
         self.webhook_retry_task = None
+        self.analytics_task = None
+        self.analytics_flush_interval_seconds = settings.ANALYTICS_FLUSH_INTERVAL_SECONDS
+        self.analytics_reconcile_interval_seconds = settings.ANALYTICS_RECONCILE_INTERVAL_MINUTES * 60
 
     async def start(self):
         """Start background task loop."""
@@ -34,9 +40,12 @@ class BackgroundTaskService:
         )
         logger.info("Started webhook retry worker")
 
+        self.analytics_task = asyncio.create_task(self.run_analytics_worker())
+
         while self.is_running:
             try:
                 await self.cleanup_stale_sessions()
+                await self.prune_idempotency_keys()
             except Exception as e:
                 logger.error(f"Error in background task: {e}")
 
@@ -54,6 +63,40 @@ class BackgroundTaskService:
             self.webhook_retry_task.cancel()
         logger.info("Stopped webhook retry worker")
 
+        if self.analytics_task:
+            self.analytics_task.cancel()
+
+    async def run_analytics_worker(self):
+        """Flush analytics counters periodically and reconcile them less often."""
+        last_reconcile = asyncio.get_running_loop().time()
+
+        while self.is_running:
+            await asyncio.sleep(self.analytics_flush_interval_seconds)
+
+            try:
+                async with async_session_maker() as db:
+                    now = asyncio.get_running_loop().time()
+                    if now - last_reconcile >= self.analytics_reconcile_interval_seconds:
+                        await analytics_counters.flush(db)
+                        await analytics_counters.reconcile(db)
+                        await analytics_counters.rebuild_step_funnel(db)
+                        await analytics_counters.prune_activity(
+                            db, settings.ANALYTICS_MINUTE_BUCKET_RETENTION_HOURS
+                        )
+                        last_reconcile = now
+                    else:
+                        await analytics_counters.flush(db)
+            except Exception as e:
+                logger.error(f"Failed to flush analytics counters: {e}")
+
+    async def flush_analytics(self):
+        """Flush pending analytics counters, e.g. before shutdown."""
+        try:
+            async with async_session_maker() as db:
+                await analytics_counters.flush(db)
+        except Exception as e:
+            logger.error(f"Failed to flush analytics counters: {e}")
+
     async def cleanup_stale_sessions(self):
         """
         Mark sessions as abandoned if no activity for configured timeout.
@@ -62,7 +105,6 @@ class BackgroundTaskService:
         explicitly ending them.
         """
         cutoff = datetime.now(timezone.utc) - timedelta(minutes=self.session_timeout_minutes)
-        cutoff_str = cutoff.isoformat()
 
         async with async_session_maker() as db:
             try:
@@ -71,19 +113,26 @@ class BackgroundTaskService:
                     update(Session)
                     .where(
                         Session.status == "active",
-                        Session.last_activity_at < cutoff_str
+                        Session.last_activity_at < cutoff
                     )
                     .values(
                         status="abandoned",
-                        ended_at=datetime.now(timezone.utc).isoformat(),
-                        updated_at=datetime.now(timezone.utc).isoformat()
+                        ended_at=datetime.now(timezone.utc),
+                        updated_at=datetime.now(timezone.utc),
+                        version=Session.version + 1,
                     )
-                    .returning(Session.session_id)
+                    .returning(Session.session_id, Session.manual_uuid, Session.current_step)
                 )
 
-                abandoned_sessions = result.scalars().all()
+                abandoned = result.all()
+                abandoned_sessions = [row.session_id for row in abandoned]
                 await db.commit()
 
+                analytics_counters.sessions_abandoned(len(abandoned))
+                drop_offs = Counter((row.manual_uuid, row.current_step) for row in abandoned)
+                for (manual_uuid, step_number), count in drop_offs.items():
+                    analytics_counters.step_dropped(manual_uuid, step_number, count)
+
                 if abandoned_sessions:
                     logger.info(
                         f"Marked {len(abandoned_sessions)} sessions as abandoned due to inactivity: "
@@ -94,6 +143,17 @@ class BackgroundTaskService:
                 logger.error(f"Failed to cleanup stale sessions: {e}")
                 await db.rollback()
 
+    async def prune_idempotency_keys(self):
+        """Delete stored responses whose idempotency keys have expired."""
+        async with async_session_maker() as db:
+            try:
+                pruned = await idempotency_store.prune(db)
+                if pruned:
+                    logger.info(f"Pruned {pruned} expired idempotency keys")
+            except Exception as e:
+                logger.error(f"Failed to prune idempotency keys: {e}")
+                await db.rollback()
+
     async def get_stats(self) -> dict:
         """Get background task statistics."""
         async with async_session_maker() as db:
@@ -108,7 +168,7 @@ class BackgroundTaskService:
                 select(func.count(Session.id))
                 .where(
                     Session.status == "active",
-                    Session.last_activity_at < risk_cutoff.isoformat()
+                    Session.last_activity_at < risk_cutoff
                 )
             )
 
@@ -126,6 +186,7 @@ class BackgroundTaskService:
                 "active_sessions": active_count.scalar() or 0,
                 "sessions_at_risk_of_timeout": at_risk.scalar() or 0,
                 "webhook_retry_queue": webhook_stats,
+                "analytics_counters": analytics_counters.get_stats(),
             }
 
 
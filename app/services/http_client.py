@@ -0,0 +1,116 @@
+"""Shared, pooled HTTP client for outbound webhook delivery."""
+import logging
+from typing import Any, Optional
+import httpx
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class WebhookHTTPClient:
+    """
+    Application-lifetime `httpx.AsyncClient` shared by all webhook delivery.
+
+    Connections are kept alive and reused across events instead of paying
+    TCP (and TLS) setup per webhook. The client is opened and closed by the
+    application lifespan; it is created lazily if used outside of it
+    (scripts, tests).
+
+    Connection reuse is measured with httpcore's trace extension: every
+    request is counted, and every new TCP connection is counted, so
+    `requests - connections_opened` is the number of requests that reused
+    a pooled connection.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.errors = 0
+        self.http2 = False
+
+    def _build_client(self) -> httpx.AsyncClient:
+        """Create the underlying client from settings."""
+        http2 = settings.WEBHOOK_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning(
+                    "WEBHOOK_HTTP2 is enabled but the 'h2' package is not installed; "
+                    "falling back to HTTP/1.1 (pip install 'httpx[http2]')"
+                )
+                http2 = False
+        self.http2 = http2
+
+        limits = httpx.Limits(
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WEBHOOK_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.WEBHOOK_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        return httpx.AsyncClient(
+            timeout=settings.WEBHOOK_TIMEOUT,
+            limits=limits,
+            http2=http2,
+            headers={"Content-Type": "application/json"},
+        )
+
+    async def start(self) -> None:
+        """Open the shared client."""
+        if self._client is None:
+            self._client = self._build_client()
+            logger.info("Webhook HTTP client started")
+
+    async def close(self) -> None:
+        """Close the shared client and its pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Webhook HTTP client closed")
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the shared client, creating it on first use."""
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    async def _trace(self, event_name: str, info: dict[str, Any]) -> None:
+        """Count new connections via httpcore trace events."""
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    async def post(self, url: str, payload: dict) -> httpx.Response:
+        """POST a JSON payload using a pooled connection."""
+        self.requests += 1
+        try:
+            return await self.client.post(
+                url,
+                json=payload,
+                extensions={"trace": self._trace},
+            )
+        except httpx.HTTPError:
+            self.errors += 1
+            raise
+
+    def get_stats(self) -> dict:
+        """Get connection reuse statistics."""
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0,
+            "tls_handshakes": self.tls_handshakes,
+            "errors": self.errors,
+            "http2": self.http2,
+        }
+
+
+# Global instance
+webhook_http_client = WebhookHTTPClient()
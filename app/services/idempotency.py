@@ -0,0 +1,222 @@
+"""Stored responses for requests retried with an idempotency key."""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from pydantic import BaseModel
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from app.config import get_settings
+from app.models import IdempotencyKey
+from app.utils.exceptions import DuplicateRequestError
+from app.utils.queries import UNIQUE_VIOLATION_SQLSTATE, has_sqlstate, violated_constraint
+from app.utils.responses import dumps
+
+settings = get_settings()
+
+# Scopes of the endpoints that accept idempotency keys
+PROGRESS_SCOPE = "progress"
+MESSAGE_SCOPE = "message"
+SESSION_SCOPE = "session"
+
+# Set on responses replayed from the store
+REPLAYED_HEADER = "Idempotency-Replayed"
+
+# PostgreSQL's default name for the primary key of `idempotency_keys`
+KEY_CONSTRAINT = "idempotency_keys_pkey"
+
+CacheKey = tuple[str, str, str]
+
+
+@dataclass(frozen=True, slots=True)
+class StoredResponse:
+    """Rendered response of the first request sent with a key."""
+
+    status_code: int
+    body: bytes
+    expires_at: float  # Unix time
+
+    def to_response(self) -> Response:
+        """Replay the stored body and status code."""
+        return Response(
+            content=self.body,
+            status_code=self.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PendingResponse:
+    """Response staged in a transaction that has not committed yet."""
+
+    cache_key: CacheKey
+    stored: StoredResponse
+
+
+class IdempotencyStore:
+    """
+    Bounded TTL cache of `(scope, resource_id, key)` to the original response.
+
+    Writes stage their response in the `idempotency_keys` table in the same
+    transaction as the write itself, so a response is stored if and only if
+    the write committed. After the commit the response is also kept in
+    memory, where retries reaching the same process are answered without a
+    query. Other processes, and this one after an eviction, find it in the
+    table once the write reports the key as a duplicate.
+
+    Responses expire after `ttl_seconds`. Expired rows are deleted by
+    `prune`; until then the key stays taken and a retry gets the endpoint's
+    duplicate error instead of a replay.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 86400,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[CacheKey, StoredResponse] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def lookup(self, scope: str, resource_id: str, key: str) -> Optional[StoredResponse]:
+        """Get a stored response from memory only."""
+        cache_key = (scope, resource_id, key)
+        with self._lock:
+            stored = self._entries.get(cache_key)
+            if stored is None:
+                return None
+            if stored.expires_at <= self._clock():
+                del self._entries[cache_key]
+                return None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return stored
+
+    async def fetch(
+        self,
+        db: AsyncSession,
+        scope: str,
+        resource_id: str,
+        key: str
+    ) -> Optional[StoredResponse]:
+        """Get a stored response from memory, falling back to the table."""
+        stored = self.lookup(scope, resource_id, key)
+        if stored is not None:
+            return stored
+
+        result = await db.execute(
+            select(IdempotencyKey.status_code, IdempotencyKey.response, IdempotencyKey.expires_at)
+            .where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.resource_id == resource_id,
+                IdempotencyKey.key == key,
+            )
+        )
+        row = result.one_or_none()
+        if row is None or row.expires_at.timestamp() <= self._clock():
+            self.misses += 1
+            return None
+
+        self.db_hits += 1
+        stored = StoredResponse(row.status_code, row.response.encode("utf-8"), row.expires_at.timestamp())
+        self._remember((scope, resource_id, key), stored)
+        return stored
+
+    def stage(
+        self,
+        db: AsyncSession,
+        scope: str,
+        resource_id: str,
+        key: str,
+        status_code: int,
+        content: BaseModel,
+    ) -> PendingResponse:
+        """Add the response to the caller's transaction; pass the result to `commit`."""
+        now = self._clock()
+        body = dumps(content.model_dump(mode="json"))
+        stored = StoredResponse(status_code, body, now + self.ttl_seconds)
+        db.add(IdempotencyKey(
+            scope=scope,
+            resource_id=resource_id,
+            key=key,
+            status_code=status_code,
+            response=body.decode("utf-8"),
+            created_at=datetime.fromtimestamp(now, timezone.utc),
+            expires_at=datetime.fromtimestamp(stored.expires_at, timezone.utc),
+        ))
+        return PendingResponse((scope, resource_id, key), stored)
+
+    async def commit(self, db: AsyncSession, pending: Optional[PendingResponse]) -> None:
+        """
+        Commit the caller's transaction and keep the staged response in memory.
+
+        A concurrent request that committed the same key first makes the
+        insert fail; that is raised as `DuplicateRequestError`, after which
+        the winner's response can be fetched. Other integrity errors are
+        re-raised for the caller to map.
+        """
+        try:
+            await db.commit()
+        except IntegrityError as e:
+            if (
+                pending is None
+                or not has_sqlstate(e, UNIQUE_VIOLATION_SQLSTATE)
+                or violated_constraint(e) != KEY_CONSTRAINT
+            ):
+                raise
+            await db.rollback()
+            raise DuplicateRequestError(pending.cache_key[2]) from e
+
+        if pending is not None:
+            self._remember(pending.cache_key, pending.stored)
+
+    def _remember(self, cache_key: CacheKey, stored: StoredResponse) -> None:
+        with self._lock:
+            self._entries[cache_key] = stored
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def prune(self, db: AsyncSession) -> int:
+        """Delete expired responses so their keys can be reused."""
+        now = datetime.fromtimestamp(self._clock(), timezone.utc)
+        result = await db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= now)
+        )
+        await db.commit()
+        return result.rowcount
+
+    def clear(self) -> None:
+        """Drop all responses held in memory."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
+
+
+# Global instance
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    max_entries=settings.IDEMPOTENCY_CACHE_SIZE,
+)
@@ -0,0 +1,190 @@
+"""In-process cache of manuals for the progress hot path."""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from app.config import get_settings
+from app.models import Manual
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True, slots=True)
+class CachedStep:
+    """Immutable snapshot of a manual step."""
+
+    id: UUID
+    step_number: int
+    title: str
+    content: str
+    created_at: datetime
+
+
+@dataclass(frozen=True, slots=True)
+class CachedManual:
+    """
+    Immutable snapshot of a manual and its steps.
+
+    Steps are stored in an array indexed by step number so that
+    step lookups are O(1) without touching the database.
+    """
+
+    id: UUID
+    manual_id: str
+    title: str
+    total_steps: int
+    created_at: datetime
+    updated_at: datetime
+    steps: tuple[CachedStep, ...]
+
+    @classmethod
+    def from_model(cls, manual: Manual) -> "CachedManual":
+        """Build a snapshot from a manual with its steps loaded."""
+        steps = tuple(
+            CachedStep(
+                id=step.id,
+                step_number=step.step_number,
+                title=step.title,
+                content=step.content,
+                created_at=step.created_at,
+            )
+            for step in sorted(manual.steps, key=lambda s: s.step_number)
+        )
+        return cls(
+            id=manual.id,
+            manual_id=manual.manual_id,
+            title=manual.title,
+            total_steps=manual.total_steps,
+            created_at=manual.created_at,
+            updated_at=manual.updated_at,
+            steps=steps,
+        )
+
+    def get_step(self, step_number: int) -> Optional[CachedStep]:
+        """Get a step by its number (1-indexed)."""
+        if 1 <= step_number <= len(self.steps):
+            step = self.steps[step_number - 1]
+            if step.step_number == step_number:
+                return step
+        return None
+
+
+class ManualCache:
+    """
+    Bounded LRU cache of manual snapshots keyed by `Manual.id` and `manual_id`.
+
+    Every invalidation bumps a version counter. Loaders read the version
+    before querying the database and only store their result if it is
+    unchanged, so a load racing with `create_manual`/`delete_manual` can
+    never re-insert a stale entry. Entries also expire after a TTL to bound
+    staleness across worker processes.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._by_uuid: OrderedDict[UUID, tuple[CachedManual, float]] = OrderedDict()
+        self._by_manual_id: dict[str, UUID] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, manual_uuid: UUID) -> Optional[CachedManual]:
+        """Get a cached manual by its internal UUID."""
+        with self._lock:
+            entry = self._by_uuid.get(manual_uuid)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            manual, expires_at = entry
+            if expires_at < time.monotonic():
+                self._remove(manual_uuid)
+                self.misses += 1
+                return None
+
+            self._by_uuid.move_to_end(manual_uuid)
+            self.hits += 1
+            return manual
+
+    def get_by_manual_id(self, manual_id: str) -> Optional[CachedManual]:
+        """Get a cached manual by its external ID."""
+        with self._lock:
+            manual_uuid = self._by_manual_id.get(manual_id)
+            if manual_uuid is None:
+                self.misses += 1
+                return None
+        # An entry removed in between is counted as a miss by `get`
+        return self.get(manual_uuid)
+
+    def put(self, manual: CachedManual, version: int) -> bool:
+        """
+        Store a manual loaded while the cache was at `version`.
+
+        Returns False (and stores nothing) if the cache was invalidated
+        since the load started.
+        """
+        with self._lock:
+            if version != self.version:
+                return False
+
+            self._remove(manual.id)
+            self._by_uuid[manual.id] = (manual, time.monotonic() + self.ttl_seconds)
+            self._by_manual_id[manual.manual_id] = manual.id
+
+            while len(self._by_uuid) > self.max_size:
+                oldest_uuid = next(iter(self._by_uuid))
+                self._remove(oldest_uuid)
+
+            return True
+
+    def invalidate(self, manual_uuid: Optional[UUID] = None, manual_id: Optional[str] = None) -> None:
+        """Drop a manual from the cache and bump the version."""
+        with self._lock:
+            self.version += 1
+            if manual_id is not None and manual_uuid is None:
+                manual_uuid = self._by_manual_id.get(manual_id)
+            if manual_uuid is not None:
+                self._remove(manual_uuid)
+            if manual_id is not None:
+                self._by_manual_id.pop(manual_id, None)
+
+    def clear(self) -> None:
+        """Drop all cached manuals."""
+        with self._lock:
+            self.version += 1
+            self._by_uuid.clear()
+            self._by_manual_id.clear()
+
+    def _remove(self, manual_uuid: UUID) -> None:
+        """Remove an entry from both indexes (caller holds the lock)."""
+        entry = self._by_uuid.pop(manual_uuid, None)
+        if entry is not None:
+            manual = entry[0]
+            if self._by_manual_id.get(manual.manual_id) == manual_uuid:
+                del self._by_manual_id[manual.manual_id]
+
+    def get_stats(self) -> dict:
+        """Get cache statistics."""
+        return {
+            "size": len(self._by_uuid),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Global instance
+manual_cache = ManualCache(
+    max_size=settings.MANUAL_CACHE_SIZE,
+    ttl_seconds=settings.MANUAL_CACHE_TTL_SECONDS,
+)
@@ -1,6 +1,6 @@
 """Manual service for business logic."""
 import logging
-from typing import List, Optional
+from typing import List, Optional, Union
 from uuid import UUID
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,6 +8,11 @@ from sqlalchemy.orm import selectinload
 
 from app.models import Manual, ManualStep
 from app.schemas.manual import ManualCreate, ManualResponse, ManualStepResponse
+from app.services.manual_cache import CachedManual, manual_cache
+from app.services.analytics_counters import analytics_counters
+from app.services.recent_writes import MANUALS_KEY, recent_writes
+from app.utils.queries import count_all_rows
+from app.utils.pagination import apply_keyset, split_page
 from app.utils.exceptions import ManualNotFoundError, SessionServiceException
 
 logger = logging.getLogger(__name__)
@@ -51,6 +56,9 @@ class ManualService:
             self.db.add(step)
 
         await self.db.commit()
+        manual_cache.invalidate(manual_uuid=manual.id, manual_id=manual.manual_id)
+        analytics_counters.manual_created()
+        recent_writes.record(MANUALS_KEY)
         await self.db.refresh(manual)
 
         # Load steps relationship
@@ -92,27 +100,59 @@ class ManualService:
 
         return manual
 
+    async def get_cached_manual(self, manual_uuid: UUID) -> CachedManual:
+        """Get a manual snapshot by its internal UUID, loading it on a cache miss."""
+        cached = manual_cache.get(manual_uuid)
+        if cached:
+            return cached
+
+        version = manual_cache.version
+        manual = await self.get_manual_by_uuid(manual_uuid)
+        cached = CachedManual.from_model(manual)
+        manual_cache.put(cached, version)
+        return cached
+
+    async def get_cached_manual_by_id(self, manual_id: str) -> CachedManual:
+        """Get a manual snapshot by its external ID, loading it on a cache miss."""
+        cached = manual_cache.get_by_manual_id(manual_id)
+        if cached:
+            return cached
+
+        version = manual_cache.version
+        manual = await self.get_manual_by_id(manual_id)
+        cached = CachedManual.from_model(manual)
+        manual_cache.put(cached, version)
+        return cached
+
     async def list_manuals(
         self,
         skip: int = 0,
-        limit: int = 100
-    ) -> tuple[List[Manual], int]:
-        """List all manuals with pagination."""
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> tuple[List[Manual], int, Optional[str]]:
+        """
+        List all manuals with pagination, newest first.
+
+        When a cursor is given the page starts right after it and `skip`
+        is ignored. Returns the page, the total and the next cursor.
+        """
         # Get total count
-        count_result = await self.db.execute(select(Manual))
-        total = len(count_result.scalars().all())
+        total = await count_all_rows(self.db, Manual)
 
         # Get paginated results
-        result = await self.db.execute(
-            select(Manual)
-            .options(selectinload(Manual.steps))
-            .offset(skip)
-            .limit(limit)
-            .order_by(Manual.created_at.desc())
+        query = apply_keyset(
+            select(Manual).options(selectinload(Manual.steps)),
+            Manual.created_at,
+            Manual.id,
+            cursor,
+            descending=True,
         )
-        manuals = result.scalars().all()
+        if not cursor:
+            query = query.offset(skip)
+        result = await self.db.execute(query.limit(limit + 1))
+        manuals, next_cursor = split_page(result.scalars().all(), limit)
 
-        return list(manuals), total
+        return manuals, total, next_cursor
 
     async def get_step(self, manual_uuid: UUID, step_number: int) -> Optional[ManualStep]:
         """Get a specific step from a manual."""
@@ -128,13 +168,17 @@ class ManualService:
     async def delete_manual(self, manual_id: str) -> bool:
         """Delete a manual by its external ID."""
         manual = await self.get_manual_by_id(manual_id)
+        manual_uuid = manual.id
         await self.db.delete(manual)
         await self.db.commit()
+        manual_cache.invalidate(manual_uuid=manual_uuid, manual_id=manual_id)
+        analytics_counters.manual_deleted()
+        recent_writes.record(MANUALS_KEY)
         logger.info(f"Deleted manual '{manual_id}'")
         return True
 
-    def to_response(self, manual: Manual) -> ManualResponse:
-        """Convert manual model to response schema."""
+    def to_response(self, manual: Union[Manual, CachedManual]) -> ManualResponse:
+        """Convert a manual model or cached snapshot to response schema."""
         steps = [
             ManualStepResponse(
                 id=step.id,
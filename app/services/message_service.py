@@ -1,12 +1,19 @@
 """Message service for conversation storage."""
 import logging
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Optional
+from uuid import uuid4
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import ConversationMessage, Session
 from app.schemas.message import MessageCreate, MessageResponse
 from app.services.session_service import SessionService
+from app.services.analytics_counters import analytics_counters
+from app.services.recent_writes import recent_writes
+from app.services.idempotency import idempotency_store, MESSAGE_SCOPE
+from app.utils.queries import count_rows
+from app.utils.pagination import apply_keyset, split_page
 
 logger = logging.getLogger(__name__)
 
@@ -21,62 +28,88 @@ class MessageService:
     async def add_message(
         self,
         session_id: str,
-        message_data: MessageCreate
-    ) -> ConversationMessage:
-        """Add a message to a session's conversation."""
+        message_data: MessageCreate,
+        idempotency_key: Optional[str] = None
+    ) -> MessageResponse:
+        """
+        Add a message to a session's conversation.
+
+        With an `idempotency_key` the response is stored with the message,
+        so a retry can be answered with it instead of adding a copy.
+        """
         # Get session and validate it's active
         session = await self.session_service.get_session(session_id)
         self.session_service.validate_session_active(session)
 
-        # Create message
+        # Create message; the ID and timestamp are set here so the response
+        # is known before the commit
         message = ConversationMessage(
+            id=uuid4(),
             session_uuid=session.id,
             message_text=message_data.message,
             sender=message_data.sender.value,
             step_at_time=session.current_step,
+            created_at=datetime.now(timezone.utc),
         )
         self.db.add(message)
 
         # Update session activity
-        await self.session_service.update_activity(session)
+        self.session_service.update_activity(session)
+
+        response = self.to_response(message, session.session_id)
+        pending = None
+        if idempotency_key:
+            pending = idempotency_store.stage(
+                self.db, MESSAGE_SCOPE, session_id, idempotency_key, 201, response
+            )
 
-        await self.db.commit()
-        await self.db.refresh(message)
+        await idempotency_store.commit(self.db, pending)
+        analytics_counters.message_added()
+        recent_writes.session_written(session.session_id, session.user_id)
 
         logger.info(
             f"Added message from '{message_data.sender.value}' to session '{session_id}' "
             f"at step {session.current_step}"
         )
-        return message
+        return response
 
     async def get_messages(
         self,
         session_id: str,
         skip: int = 0,
-        limit: int = 100
-    ) -> tuple[List[ConversationMessage], int, str]:
-        """Get all messages for a session."""
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> tuple[List[ConversationMessage], int, str, Optional[str]]:
+        """
+        Get messages for a session in chronological order.
+
+        When a cursor is given the page starts right after it and `skip`
+        is ignored. Returns the page, the total, the session ID and the
+        next cursor.
+        """
         # Verify session exists
-        session = await self.session_service.get_session(session_id)
+        session = await self.session_service.get_session(session_id, load_manual=False)
 
         # Get total count
-        count_result = await self.db.execute(
-            select(ConversationMessage)
-            .where(ConversationMessage.session_uuid == session.id)
+        total = await count_rows(
+            self.db,
+            ConversationMessage,
+            ConversationMessage.session_uuid == session.id
         )
-        total = len(count_result.scalars().all())
 
         # Get paginated messages
-        result = await self.db.execute(
-            select(ConversationMessage)
-            .where(ConversationMessage.session_uuid == session.id)
-            .order_by(ConversationMessage.created_at.asc())
-            .offset(skip)
-            .limit(limit)
+        query = apply_keyset(
+            select(ConversationMessage).where(ConversationMessage.session_uuid == session.id),
+            ConversationMessage.created_at,
+            ConversationMessage.id,
+            cursor,
         )
-        messages = result.scalars().all()
+        if not cursor:
+            query = query.offset(skip)
+        result = await self.db.execute(query.limit(limit + 1))
+        messages, next_cursor = split_page(result.scalars().all(), limit)
 
-        return list(messages), total, session.session_id
+        return messages, total, session.session_id, next_cursor
 
     def to_response(
         self,
@@ -84,11 +117,24 @@ class MessageService:
         session_id: str
     ) -> MessageResponse:
         """Convert message model to response schema."""
-        return MessageResponse(
-            id=message.id,
-            session_id=session_id,
-            message=message.message_text,
-            sender=message.sender,
-            step_at_time=message.step_at_time,
-            created_at=message.created_at,
-        )
+        return MessageResponse(**self.to_response_dict(message, session_id))
+
+    def to_response_dict(
+        self,
+        message: ConversationMessage,
+        session_id: str
+    ) -> dict:
+        """
+        Convert message model to the fields of `MessageResponse`.
+
+        Used by the history endpoint to render rows without building a
+        Pydantic model per message.
+        """
+        return {
+            "id": message.id,
+            "session_id": session_id,
+            "message": message.message_text,
+            "sender": message.sender,
+            "step_at_time": message.step_at_time,
+            "created_at": message.created_at,
+        }
@@ -0,0 +1,240 @@
+"""In-process metrics in the Prometheus text exposition format."""
+from bisect import bisect_left
+from typing import Iterator, Optional
+
+# Request latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Base class for a metric family with fixed label names.
+
+    Values are kept in plain dicts keyed by label values and updated
+    without locks: the event loop runs one update at a time, and a scrape
+    racing an update from another thread is at most one event off.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+        return "\n".join(lines)
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels: str) -> None:
+        """Mirror a running total kept elsewhere, sampled on scrape."""
+        self._values[labels] = value
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Gauge(Counter):
+    """Value that goes up and down, or is set when scraped."""
+
+    type_name = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in cumulative buckets.
+
+    An observation increments one bucket found by bisection; the cumulative
+    counts Prometheus expects are only summed when rendering.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def get_count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{float(bound)!r}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total[0])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format (version 0.0.4)."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+    def clear(self) -> None:
+        """Reset every metric's values."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+# Global registry and the application's metrics
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status code.",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled.",
+))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request by route template.",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55),
+))
+http_request_db_duration = registry.register(Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL per request by route template.",
+    ("route",),
+))
+rate_limit_rejections = registry.register(Counter(
+    "rate_limit_rejections_total",
+    "Requests rejected with 429 by the rate limiter.",
+))
+webhook_send_duration = registry.register(Histogram(
+    "webhook_send_duration_seconds",
+    "Webhook delivery latency by outcome (success, timeout, http_error, error).",
+    ("outcome",),
+))
+webhook_queue_depth = registry.register(Gauge(
+    "webhook_queue_pending",
+    "Webhook outbox items waiting for delivery or retry (sampled on scrape).",
+))
+db_pool_connections = registry.register(Gauge(
+    "db_pool_connections",
+    "Database pool connections by pool and state (checked_out, idle, overflow).",
+    ("pool", "state"),
+))
+db_pool_size = registry.register(Gauge(
+    "db_pool_size",
+    "Configured database pool size.",
+    ("pool",),
+))
+db_pool_checkouts = registry.register(Counter(
+    "db_pool_checkouts_total",
+    "Connections checked out of the pool since start.",
+    ("pool",),
+))
+db_pool_timeouts = registry.register(Counter(
+    "db_pool_timeouts_total",
+    "Checkouts that timed out waiting for a free connection.",
+    ("pool",),
+))
+db_pool_max_wait = registry.register(Gauge(
+    "db_pool_checkout_wait_max_seconds",
+    "Longest wait for a pooled connection since start.",
+    ("pool",),
+))
+
+
+def record_pool_stats(pool: str, stats: dict) -> None:
+    """Copy `get_pool_stats()` output into the pool gauges."""
+    db_pool_size.set(stats["size"], pool)
+    db_pool_connections.set(stats["checked_out"], pool, "checked_out")
+    db_pool_connections.set(stats["idle"], pool, "idle")
+    db_pool_connections.set(stats["overflow"], pool, "overflow")
+    db_pool_checkouts.set(stats["checkouts"], pool)
+    db_pool_timeouts.set(stats["timeouts"], pool)
+    db_pool_max_wait.set(stats["max_wait_ms"] / 1000, pool)
@@ -0,0 +1,214 @@
+"""Sampling profiler for live requests."""
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import CodeType, FrameType
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Import roots (project, site-packages, stdlib), longest first, stripped from frame paths
+_PATH_PREFIXES = sorted(
+    {os.path.join(os.path.abspath(path), "") for path in sys.path if path},
+    key=len,
+    reverse=True,
+)
+
+_labels: dict[CodeType, str] = {}
+
+
+def _frame_label(frame: FrameType) -> str:
+    """`function (module path:first line)`, so samples aggregate per function."""
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        for prefix in _PATH_PREFIXES:
+            if filename.startswith(prefix):
+                filename = filename[len(prefix):]
+                break
+        label = _labels[code] = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+    return label
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a fraction of live requests.
+
+    While a profiling run is active a background thread wakes every
+    `interval_ms`, reads the event loop thread's current stack and, if the
+    loop is running a selected request, counts the stack under that
+    request's route. Requests register the frame of the middleware
+    coroutine that handles them; the sampler walks the stack up to the
+    first registered frame, so only the request's own frames are recorded
+    and samples taken while the loop is idle or serving other requests are
+    dropped.
+
+    The sampler needs the GIL to read a stack, so samples land when the
+    loop thread releases it: at blocking I/O calls, or after
+    `sys.getswitchinterval()` (5 ms by default) of pure Python work.
+    Intervals shorter than that add no resolution for CPU-bound code.
+
+    Outside a run the only cost is one attribute check per request. During
+    a run a selected request costs a dict insert and delete; the sampling
+    thread holds the GIL for one stack walk per interval.
+
+    Output is in the collapsed-stack format (`frame;frame;frame count`)
+    read by flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, max_stacks: int = 10_000):
+        self.max_stacks = max_stacks
+        self.active = False
+        self.sample_rate = 1.0
+        self.route: Optional[str] = None
+        self.interval_seconds = 0.005
+        self.started_at: Optional[datetime] = None
+        self.ends_at: Optional[float] = None
+        self.samples = 0
+        self.idle_samples = 0
+        self.dropped_samples = 0
+        self.requests_profiled = 0
+        self._stacks: Counter[str] = Counter()
+        self._stacks_lock = threading.Lock()  # The sampler adds stacks while requests read them
+        self._requests: dict[FrameType, dict] = {}
+        self._loop_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(
+        self,
+        duration_seconds: float,
+        sample_rate: float = 1.0,
+        route: Optional[str] = None,
+        interval_ms: float = 5.0,
+    ) -> None:
+        """
+        Start a profiling run on the calling thread's event loop.
+
+        `sample_rate` is the fraction of requests profiled and `route`
+        restricts the run to one route template (e.g.
+        `/api/v1/sessions/{session_id}/progress`). Results of the previous
+        run are discarded. The run stops by itself after `duration_seconds`.
+        """
+        self.stop()
+        with self._stacks_lock:
+            self._stacks.clear()
+        self.samples = self.idle_samples = self.dropped_samples = self.requests_profiled = 0
+        self.sample_rate = sample_rate
+        self.route = route
+        self.interval_seconds = interval_ms / 1000
+        self.started_at = datetime.now(timezone.utc)
+        self.ends_at = time.monotonic() + duration_seconds
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.active = True
+        self._thread.start()
+        logger.info(
+            f"Profiling {sample_rate:.0%} of requests to {route or 'all routes'} "
+            f"for {duration_seconds}s every {interval_ms} ms"
+        )
+
+    def stop(self) -> None:
+        """Stop the current run, keeping its results."""
+        if self._thread is None:
+            return
+        self.active = False
+        self._stop.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self._requests.clear()
+        logger.info(f"Profiling stopped after {self.samples} samples")
+
+    def should_profile(self) -> bool:
+        """Decide whether a request starting now is profiled."""
+        return self.active and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def enter(self, frame: FrameType, scope: dict) -> None:
+        """Register the frame of the coroutine handling a selected request."""
+        self._requests[frame] = scope
+        self.requests_profiled += 1
+
+    def exit(self, frame: FrameType) -> None:
+        self._requests.pop(frame, None)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            if time.monotonic() >= self.ends_at:
+                self.active = False
+                self._requests.clear()
+                logger.info(f"Profiling run finished after {self.samples} samples")
+                return
+            self._sample()
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        requests = self._requests
+        stack = []
+        while frame is not None:
+            scope = requests.get(frame)
+            if scope is not None:
+                break
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        else:
+            self.idle_samples += 1
+            return
+
+        route = getattr(scope.get("route"), "path", None)
+        if route is None or (self.route is not None and route != self.route):
+            # Not routed yet, or another route than the one being profiled
+            self.idle_samples += 1
+            return
+
+        stack.append(f"{scope['method']} {route}")
+        key = ";".join(reversed(stack))
+        with self._stacks_lock:
+            if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                self.dropped_samples += 1
+                return
+            self._stacks[key] += 1
+            self.samples += 1
+
+    def collapsed(self, route: Optional[str] = None) -> str:
+        """Aggregated stacks, optionally for one route template, most sampled first."""
+        with self._stacks_lock:
+            stacks = self._stacks.most_common()
+        lines = [
+            f"{stack} {count}"
+            for stack, count in stacks
+            if route is None or stack.split(";", 1)[0].split(" ", 1)[1] == route
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def get_stats(self) -> dict[str, Any]:
+        """Get the state of the current or last run."""
+        with self._stacks_lock:
+            stacks = list(self._stacks.items())
+        routes: Counter[str] = Counter()
+        for stack, count in stacks:
+            routes[stack.split(";", 1)[0]] += count
+        return {
+            "active": self.active,
+            "started_at": self.started_at,
+            "seconds_remaining": max(round(self.ends_at - time.monotonic(), 1), 0) if self.active else 0,
+            "sample_rate": self.sample_rate,
+            "route": self.route,
+            "interval_ms": self.interval_seconds * 1000,
+            "requests_profiled": self.requests_profiled,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "dropped_samples": self.dropped_samples,
+            "samples_by_route": dict(routes.most_common()),
+        }
+
+
+# Global instance
+profiler = SamplingProfiler()
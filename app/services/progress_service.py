@@ -2,10 +2,12 @@
 import logging
 from datetime import datetime, timezone
 from typing import Optional
-from sqlalchemy import select
+from uuid import uuid4
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Session, ProgressEvent, ManualStep
+from app.models import Session
 from app.schemas.progress import (
     ProgressUpdate,
     ProgressResponse,
@@ -16,15 +18,74 @@ from app.schemas.progress import (
 from app.services.session_service import SessionService
 from app.services.manual_service import ManualService
 from app.services.feedback_service import FeedbackService
+from app.services.webhook_retry_service import webhook_retry_service
+from app.services.analytics_counters import analytics_counters
+from app.services.recent_writes import recent_writes
+from app.services.idempotency import idempotency_store, PROGRESS_SCOPE
+from app.utils.queries import LOCK_TIMEOUT_SQLSTATE, UNIQUE_VIOLATION_SQLSTATE, has_sqlstate
 from app.utils.exceptions import (
     InvalidStepError,
     DuplicateProgressUpdateError,
     OutOfOrderUpdateError,
     SessionEndedError,
+    SessionNotFoundError,
+    ConcurrentUpdateError,
 )
 
 logger = logging.getLogger(__name__)
 
+# Records a progress update in one statement. `target` reads the session,
+# its manual's step count and whether the idempotency key was used, for
+# error reporting. `previous` locks the session row if the update is
+# valid; FOR UPDATE re-reads the latest committed row, so the status
+# check and the step it captures are current even after waiting for the
+# lock. `updated` applies the increment (completing the session after
+# the last step) and `event` records the audit row. The final SELECT
+# returns one row per existing session: the `target` columns always, and
+# the `updated` columns only when the update was applied.
+UPDATE_PROGRESS_SQL = """
+WITH target AS (
+    SELECT s.id, s.status, m.total_steps,
+           EXISTS (
+               SELECT 1 FROM progress_events e
+               WHERE e.session_uuid = s.id AND e.idempotency_key = :idempotency_key
+           ) AS duplicate
+    FROM sessions s JOIN manuals m ON m.id = s.manual_uuid
+    WHERE s.session_id = :session_id
+),
+previous AS (
+    SELECT s.id, s.current_step, s.step_started_at,
+           CAST(:done AS boolean) AND :step >= s.current_step AS incremented
+    FROM sessions s JOIN target t ON t.id = s.id
+    WHERE s.status = 'active' AND :step <= t.total_steps AND NOT t.duplicate
+    FOR UPDATE OF s
+),
+updated AS (
+    UPDATE sessions s SET
+        current_step = CASE WHEN p.incremented THEN :step + 1 ELSE s.current_step END,
+        step_started_at = CASE WHEN p.incremented THEN :now ELSE s.step_started_at END,
+        status = CASE WHEN p.incremented AND :step >= t.total_steps THEN 'completed' ELSE s.status END,
+        ended_at = CASE WHEN p.incremented AND :step >= t.total_steps THEN :now ELSE s.ended_at END,
+        last_activity_at = :now,
+        updated_at = :now,
+        version = s.version + 1
+    FROM previous p, target t
+    WHERE s.id = p.id AND t.id = p.id
+    RETURNING s.id, s.session_id, s.user_id, s.manual_uuid, s.current_step, s.status,
+              s.started_at, s.ended_at, p.current_step AS previous_step,
+              p.step_started_at AS previous_step_started_at, p.incremented
+),
+event AS (
+    INSERT INTO progress_events (
+        id, session_uuid, step_number, step_status, previous_step, processed, idempotency_key, created_at
+    )
+    SELECT :event_id, u.id, :step, :step_status, u.previous_step, u.incremented, :idempotency_key, :now
+    FROM updated u
+)
+SELECT t.status AS checked_status, t.total_steps, t.duplicate, u.*
+FROM target t LEFT JOIN updated u ON true
+"""
+
 
 class ProgressService:
     """Service for progress tracking operations."""
@@ -33,7 +94,7 @@ class ProgressService:
         self.db = db
         self.session_service = SessionService(db)
         self.manual_service = ManualService(db)
-        self.feedback_service = FeedbackService()
+        self.feedback_service = FeedbackService(db)
 
     async def update_progress(
         self,
@@ -49,84 +110,92 @@ class ProgressService:
         - Out-of-order updates
         - Session already ended
         - Concurrent updates (via row locking)
+
+        Validation, the event insert and the step increment run as one
+        statement (`UPDATE_PROGRESS_SQL`), so the session row is locked for
+        a single round trip plus the commit (and the outbox and stored
+        response inserts when webhooks are enabled or a key is sent).
         """
-        # Get session with lock to prevent concurrent updates
-        session = await self.session_service.get_session_with_lock(session_id)
+        # Edge Case 1: Invalid Step Numbers (the upper bound is checked in SQL)
+        if progress_data.current_step < 1:
+            raise InvalidStepError("Step number must be >= 1")
 
-        # Edge Case 4: Session Already Ended
-        self.session_service.validate_session_active(session)
+        now = datetime.now(timezone.utc)
+        params = {
+            "session_id": session_id,
+            "step": progress_data.current_step,
+            "step_status": progress_data.step_status.value,
+            "done": progress_data.step_status == StepStatus.DONE,
+            "idempotency_key": progress_data.idempotency_key,
+            "event_id": uuid4(),
+            "now": now,
+        }
 
-        # Get manual for validation
-        manual = await self.manual_service.get_manual_by_uuid(session.manual_uuid)
+        for _ in range(2):
+            try:
+                row = (await self.db.execute(text(UPDATE_PROGRESS_SQL), params)).one_or_none()
+            except DBAPIError as e:
+                # Edge Case 2: a concurrent duplicate committed while we waited for the lock
+                if has_sqlstate(e, UNIQUE_VIOLATION_SQLSTATE) and progress_data.idempotency_key:
+                    await self.db.rollback()
+                    raise DuplicateProgressUpdateError(progress_data.idempotency_key) from e
+                # Edge Case 6: another writer held the row past DATABASE_LOCK_TIMEOUT_MS
+                if has_sqlstate(e, LOCK_TIMEOUT_SQLSTATE):
+                    raise ConcurrentUpdateError(session_id) from e
+                raise
 
-        # Edge Case 1: Invalid Step Numbers
-        if progress_data.current_step < 1:
-            raise InvalidStepError("Step number must be >= 1")
-        if progress_data.current_step > manual.total_steps:
-            raise InvalidStepError(
-                f"Step {progress_data.current_step} exceeds manual's total steps ({manual.total_steps})"
-            )
+            if row is None:
+                raise SessionNotFoundError(session_id)
+            if row.previous_step is not None:
+                break
 
-        # Edge Case 2: Duplicate Updates (check idempotency key)
-        if progress_data.idempotency_key:
-            existing = await self.db.execute(
-                select(ProgressEvent).where(
-                    ProgressEvent.session_uuid == session.id,
-                    ProgressEvent.idempotency_key == progress_data.idempotency_key
-                )
-            )
-            if existing.scalar_one_or_none():
+            # Nothing was updated; the checks below run on the statement's snapshot
+            # A retry of an update that ended the session is a duplicate, not an error
+            if row.duplicate:
                 raise DuplicateProgressUpdateError(progress_data.idempotency_key)
+            # Edge Case 4: Session Already Ended
+            if row.checked_status != "active":
+                raise SessionEndedError(session_id, row.checked_status)
+            if progress_data.current_step > row.total_steps:
+                raise InvalidStepError(
+                    f"Step {progress_data.current_step} exceeds manual's total steps ({row.total_steps})"
+                )
+            # The session ended after the snapshot was taken; retry to report why
+        else:
+            raise ConcurrentUpdateError(session_id)
 
-        # Edge Case 3: Out-of-Order Updates
-        # Only process if it's the current step or exactly the next step
-        if progress_data.current_step < session.current_step:
+        # Edge Case 3: Out-of-Order Updates (allowed, to handle replays gracefully)
+        if progress_data.current_step < row.previous_step:
             logger.warning(
                 f"Received update for step {progress_data.current_step} but session "
-                f"is already on step {session.current_step}"
+                f"is already on step {row.previous_step}"
             )
-            # Allow it but log as warning - this handles replays gracefully
-
-        previous_step = session.current_step
-        should_increment = False
-
-        # Only increment if:
-        # 1. Status is DONE
-        # 2. The current_step matches the session's current step (or is ahead)
-        if progress_data.step_status == StepStatus.DONE:
-            if progress_data.current_step >= session.current_step:
-                should_increment = True
-
-        # Record progress event for audit trail
-        progress_event = ProgressEvent(
-            session_uuid=session.id,
-            step_number=progress_data.current_step,
-            step_status=progress_data.step_status.value,
-            previous_step=previous_step,
-            processed=should_increment,
-            idempotency_key=progress_data.idempotency_key,
-        )
-        self.db.add(progress_event)
-
-        # Update session if incrementing
-        if should_increment:
-            session.current_step = progress_data.current_step + 1
-            session.version += 1
 
-            # Check if session is completed
-            if session.current_step > manual.total_steps:
-                session.status = "completed"
-                session.ended_at = datetime.now(timezone.utc).isoformat()
+        previous_step = row.previous_step
+        should_increment = row.incremented
+        session = Session(
+            id=row.id,
+            session_id=row.session_id,
+            user_id=row.user_id,
+            manual_uuid=row.manual_uuid,
+            current_step=row.current_step,
+            status=row.status,
+            started_at=row.started_at,
+            ended_at=row.ended_at,
+        )
 
-        # Update activity
-        session.last_activity_at = datetime.now(timezone.utc).isoformat()
-        session.updated_at = datetime.now(timezone.utc).isoformat()
+        # Served from the in-process cache
+        manual = await self.manual_service.get_cached_manual(row.manual_uuid)
 
-        await self.db.commit()
-        await self.db.refresh(session)
+        time_on_step = None
+        completed_duration = None
+        if should_increment:
+            time_on_step = (now - (row.previous_step_started_at or row.started_at)).total_seconds()
+            if session.status == "completed":
+                completed_duration = session.duration_seconds
 
-        # Send feedback to external service
-        feedback_sent = await self.feedback_service.send_progress_update(
+        # Queue feedback for the external service in the same transaction
+        feedback_sent = self.feedback_service.queue_progress_update(
             session=session,
             manual=manual,
             previous_step=previous_step,
@@ -136,7 +205,7 @@ class ProgressService:
         # Get next step info if session is still active
         next_step = None
         if session.status == "active" and session.current_step <= manual.total_steps:
-            step = await self.manual_service.get_step(manual.id, session.current_step)
+            step = manual.get_step(session.current_step)
             if step:
                 next_step = NextStepInfo(
                     step_number=step.step_number,
@@ -152,13 +221,7 @@ class ProgressService:
         else:
             message = f"Progress recorded for step {progress_data.current_step} (status: {progress_data.step_status.value})."
 
-        logger.info(
-            f"Progress update for session '{session_id}': "
-            f"step {previous_step} -> {session.current_step} "
-            f"(status: {progress_data.step_status.value}, incremented: {should_increment})"
-        )
-
-        return ProgressResponse(
+        response = ProgressResponse(
             session_id=session.session_id,
             user_id=session.user_id,
             previous_step=previous_step,
@@ -170,10 +233,43 @@ class ProgressService:
             message=message,
         )
 
+        # Stored with the update, so retries with the key get this response
+        pending = None
+        if progress_data.idempotency_key:
+            pending = idempotency_store.stage(
+                self.db, PROGRESS_SCOPE, session_id, progress_data.idempotency_key, 200, response
+            )
+
+        await idempotency_store.commit(self.db, pending)
+        analytics_counters.progress_recorded()
+        recent_writes.session_written(session.session_id, session.user_id)
+        analytics_counters.step_recorded(
+            manual.id,
+            progress_data.current_step,
+            completed=progress_data.step_status == StepStatus.DONE,
+            time_on_step=time_on_step,
+        )
+        if completed_duration is not None:
+            analytics_counters.session_status_changed("active", "completed", completed_duration)
+        if feedback_sent:
+            webhook_retry_service.notify()
+
+        logger.info(
+            f"Progress update for session '{session_id}': "
+            f"step {previous_step} -> {session.current_step} "
+            f"(status: {progress_data.step_status.value}, incremented: {should_increment})"
+        )
+
+        return response
+
     async def get_next_step(self, session_id: str) -> NextStepResponse:
         """Get the next recommended step for a session."""
-        session = await self.session_service.get_session(session_id)
-        manual = await self.manual_service.get_manual_by_uuid(session.manual_uuid)
+        session = await self.session_service.get_session(session_id, load_manual=False)
+        return await self.get_next_step_for(session)
+
+    async def get_next_step_for(self, session: Session) -> NextStepResponse:
+        """Get the next recommended step for an already loaded session."""
+        manual = await self.manual_service.get_cached_manual(session.manual_uuid)
 
         is_completed = (
             session.current_step > manual.total_steps or
@@ -182,7 +278,7 @@ class ProgressService:
 
         next_step = None
         if not is_completed and session.current_step <= manual.total_steps:
-            step = await self.manual_service.get_step(manual.id, session.current_step)
+            step = manual.get_step(session.current_step)
             if step:
                 next_step = NextStepInfo(
                     step_number=step.step_number,
@@ -0,0 +1,97 @@
+"""Recently written keys, for read-your-writes routing to the primary."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Key for the manual list, which has no narrower scope
+MANUALS_KEY = "manuals"
+
+
+def session_key(session_id: str) -> str:
+    """Key covering a session and its messages."""
+    return f"session:{session_id}"
+
+
+def user_key(user_id: str) -> str:
+    """Key covering a user's session list."""
+    return f"user:{user_id}"
+
+
+class RecentWrites:
+    """
+    Bounded record of keys written in the last `window_seconds`.
+
+    Reads that may go to a lagging replica check it first: a key written
+    recently is read from the primary instead, so a client sees its own
+    writes. The record is per process; a client whose requests are spread
+    across workers can still read stale data within the replica lag. When
+    more than `max_keys` keys are recent the oldest are dropped early.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 5.0,
+        max_keys: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._written: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def record(self, *keys: str) -> None:
+        """Record that keys were written just now (after the commit)."""
+        if self.window_seconds <= 0:
+            return
+        expires_at = self._clock() + self.window_seconds
+        with self._lock:
+            for key in keys:
+                self._written.pop(key, None)
+                self._written[key] = expires_at
+            while len(self._written) > self.max_keys:
+                self._written.popitem(last=False)
+
+    def session_written(self, session_id: str, user_id: Optional[str] = None) -> None:
+        """Record a write to a session, which also changes its user's list."""
+        if user_id is None:
+            self.record(session_key(session_id))
+        else:
+            self.record(session_key(session_id), user_key(user_id))
+
+    def is_recent(self, *keys: str) -> bool:
+        """Whether any of the keys was written within the window."""
+        now = self._clock()
+        with self._lock:
+            # Entries are in expiry order, so expired ones are at the front
+            while self._written:
+                key, expires_at = next(iter(self._written.items()))
+                if expires_at > now:
+                    break
+                del self._written[key]
+            return any(key in self._written for key in keys)
+
+    def clear(self) -> None:
+        """Forget all recorded writes."""
+        with self._lock:
+            self._written.clear()
+
+    def get_stats(self) -> dict:
+        """Get routing statistics."""
+        return {
+            "recent_keys": len(self._written),
+            "window_seconds": self.window_seconds,
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+        }
+
+
+# Global instance
+recent_writes = RecentWrites(window_seconds=settings.READ_YOUR_WRITES_SECONDS)
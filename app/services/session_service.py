@@ -2,19 +2,29 @@
 import logging
 from datetime import datetime, timezone
 from typing import List, Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models import Session, Manual
+from app.models import Session, Manual, ConversationMessage
 from app.schemas.session import SessionCreate, SessionUpdate, SessionResponse, SessionStatus
+from app.services.manual_cache import CachedManual
 from app.services.manual_service import ManualService
+from app.services.feedback_service import FeedbackService
+from app.services.webhook_retry_service import webhook_retry_service
+from app.services.analytics_counters import analytics_counters
+from app.services.recent_writes import recent_writes
+from app.services.idempotency import idempotency_store, SESSION_SCOPE
+from app.utils.queries import LOCK_TIMEOUT_SQLSTATE, UNIQUE_VIOLATION_SQLSTATE, count_rows, count_all_rows, has_sqlstate
+from app.utils.pagination import apply_keyset, split_page
 from app.utils.exceptions import (
     SessionNotFoundError,
     SessionAlreadyExistsError,
     SessionEndedError,
     ManualNotFoundError,
+    ConcurrentUpdateError,
 )
 
 logger = logging.getLogger(__name__)
@@ -26,9 +36,19 @@ class SessionService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.manual_service = ManualService(db)
+        self.feedback_service = FeedbackService(db)
 
-    async def create_session(self, session_data: SessionCreate) -> Session:
-        """Create a new session."""
+    async def create_session(
+        self,
+        session_data: SessionCreate,
+        idempotency_key: Optional[str] = None
+    ) -> SessionResponse:
+        """
+        Create a new session.
+
+        With an `idempotency_key` the response is stored with the session,
+        so a retry can be answered with it instead of a conflict.
+        """
         # Check if session_id already exists
         existing = await self.db.execute(
             select(Session).where(Session.session_id == session_data.session_id)
@@ -39,39 +59,60 @@ class SessionService:
         # Verify manual exists
         manual = await self.manual_service.get_manual_by_id(session_data.manual_id)
 
-        # Create session
+        # Create session; generated columns are set here so the response
+        # is known before the commit
+        now = datetime.now(timezone.utc)
         session = Session(
+            id=uuid4(),
             session_id=session_data.session_id,
             user_id=session_data.user_id,
             manual_uuid=manual.id,
             current_step=1,
             status="active",
+            started_at=now,
+            last_activity_at=now,
+            step_started_at=now,
+            version=1,
+            created_at=now,
+            updated_at=now,
         )
         self.db.add(session)
-        await self.db.commit()
-        await self.db.refresh(session)
 
-        # Eagerly load the manual relationship to avoid lazy loading issues
-        result = await self.db.execute(
-            select(Session)
-            .where(Session.id == session.id)
-            .options(selectinload(Session.manual))
-        )
-        session = result.scalar_one()
+        # Queue webhook notification in the same transaction
+        queued = self.feedback_service.queue_session_created(session, manual)
+
+        response = self.to_response(session, manual)
+        pending = None
+        if idempotency_key:
+            pending = idempotency_store.stage(
+                self.db, SESSION_SCOPE, session_data.session_id, idempotency_key, 201, response
+            )
+
+        try:
+            await idempotency_store.commit(self.db, pending)
+        except IntegrityError as e:
+            # A concurrent request created the same session_id after our check
+            if not has_sqlstate(e, UNIQUE_VIOLATION_SQLSTATE):
+                raise
+            await self.db.rollback()
+            raise SessionAlreadyExistsError(session_data.session_id) from e
+        analytics_counters.session_created()
+        recent_writes.session_written(session.session_id, session.user_id)
+        if queued:
+            webhook_retry_service.notify()
 
         logger.info(
             f"Created session '{session.session_id}' for user '{session.user_id}' "
             f"with manual '{manual.manual_id}'"
         )
-        return session
+        return response
 
-    async def get_session(self, session_id: str) -> Session:
+    async def get_session(self, session_id: str, load_manual: bool = True) -> Session:
         """Get a session by its external ID."""
-        result = await self.db.execute(
-            select(Session)
-            .where(Session.session_id == session_id)
-            .options(selectinload(Session.manual))
-        )
+        query = select(Session).where(Session.session_id == session_id)
+        if load_manual:
+            query = query.options(selectinload(Session.manual))
+        result = await self.db.execute(query)
         session = result.scalar_one_or_none()
 
         if not session:
@@ -80,13 +121,23 @@ class SessionService:
         return session
 
     async def get_session_with_lock(self, session_id: str) -> Session:
-        """Get a session with row-level lock for updates."""
-        result = await self.db.execute(
-            select(Session)
-            .where(Session.session_id == session_id)
-            .options(selectinload(Session.manual))
-            .with_for_update()
-        )
+        """
+        Get a session with row-level lock for updates.
+
+        The manual relationship is not loaded; callers needing the manual
+        should use `ManualService.get_cached_manual`.
+        """
+        try:
+            result = await self.db.execute(
+                select(Session)
+                .where(Session.session_id == session_id)
+                .with_for_update()
+            )
+        except DBAPIError as e:
+            # Another writer held the row past DATABASE_LOCK_TIMEOUT_MS
+            if has_sqlstate(e, LOCK_TIMEOUT_SQLSTATE):
+                raise ConcurrentUpdateError(session_id) from e
+            raise
         session = result.scalar_one_or_none()
 
         if not session:
@@ -99,32 +150,38 @@ class SessionService:
         user_id: Optional[str] = None,
         status: Optional[str] = None,
         skip: int = 0,
-        limit: int = 100
-    ) -> tuple[List[Session], int]:
-        """List sessions with optional filters."""
-        query = select(Session).options(selectinload(Session.manual))
-
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> tuple[List[Session], int, Optional[str]]:
+        """
+        List sessions with optional filters, newest first.
+
+        Pages are ordered by `(created_at, id)`. When a cursor is given the
+        page starts right after it and `skip` is ignored. Returns the page,
+        the total and the cursor for the next page (None on the last page).
+        """
+        criteria = []
         if user_id:
-            query = query.where(Session.user_id == user_id)
+            criteria.append(Session.user_id == user_id)
         if status:
-            query = query.where(Session.status == status)
+            criteria.append(Session.status == status)
+
+        query = select(Session).options(selectinload(Session.manual)).where(*criteria)
 
         # Get total count
-        count_query = select(Session)
-        if user_id:
-            count_query = count_query.where(Session.user_id == user_id)
-        if status:
-            count_query = count_query.where(Session.status == status)
-        count_result = await self.db.execute(count_query)
-        total = len(count_result.scalars().all())
+        if criteria:
+            total = await count_rows(self.db, Session, *criteria)
+        else:
+            total = await count_all_rows(self.db, Session)
 
         # Get paginated results
-        result = await self.db.execute(
-            query.offset(skip).limit(limit).order_by(Session.created_at.desc())
-        )
-        sessions = result.scalars().all()
+        query = apply_keyset(query, Session.created_at, Session.id, cursor, descending=True)
+        if not cursor:
+            query = query.offset(skip)
+        result = await self.db.execute(query.limit(limit + 1))
+        sessions, next_cursor = split_page(result.scalars().all(), limit)
 
-        return list(sessions), total
+        return sessions, total, next_cursor
 
     async def update_session(
         self,
@@ -133,6 +190,8 @@ class SessionService:
     ) -> Session:
         """Update a session."""
         session = await self.get_session(session_id)
+        previous_status = session.status
+        previous_duration = session.duration_seconds if previous_status == "completed" else None
 
         if update_data.status:
             # Check if trying to reactivate an ended session
@@ -143,10 +202,27 @@ class SessionService:
 
             # Set ended_at if completing or abandoning
             if update_data.status in [SessionStatus.COMPLETED, SessionStatus.ABANDONED]:
-                session.ended_at = datetime.now(timezone.utc).isoformat()
+                session.ended_at = datetime.now(timezone.utc)
+
+        session.updated_at = datetime.now(timezone.utc)
+        # Incremented in SQL so concurrent writes never share a version (and an ETag)
+        session.version = Session.version + 1
 
-        session.updated_at = datetime.now(timezone.utc).isoformat()
+        # Queue webhook notification if session ended
+        queued = False
+        if session.status in ["completed", "abandoned"]:
+            queued = self.feedback_service.queue_session_ended(session, session.manual)
+
+        duration = session.duration_seconds if session.status == "completed" else None
         await self.db.commit()
+        analytics_counters.session_status_changed(
+            previous_status, session.status, duration, previous_duration
+        )
+        recent_writes.session_written(session.session_id, session.user_id)
+        if previous_status == "active" and session.status == "abandoned":
+            analytics_counters.step_dropped(session.manual_uuid, session.current_step)
+        if queued:
+            webhook_retry_service.notify()
 
         # Reload with relationship to avoid lazy loading
         result = await self.db.execute(
@@ -162,36 +238,69 @@ class SessionService:
     async def delete_session(self, session_id: str) -> bool:
         """Delete a session."""
         session = await self.get_session(session_id)
+        status = session.status
+        user_id = session.user_id
+        duration = session.duration_seconds if status == "completed" else None
+        message_count = await count_rows(
+            self.db, ConversationMessage, ConversationMessage.session_uuid == session.id
+        )
+
         await self.db.delete(session)
         await self.db.commit()
+        analytics_counters.session_deleted(status, duration, message_count)
+        recent_writes.session_written(session_id, user_id)
         logger.info(f"Deleted session '{session_id}'")
         return True
 
-    async def update_activity(self, session: Session) -> None:
-        """Update last activity timestamp."""
-        session.last_activity_at = datetime.now(timezone.utc).isoformat()
-        session.updated_at = datetime.now(timezone.utc).isoformat()
-        await self.db.commit()
+    def update_activity(self, session: Session) -> None:
+        """
+        Update last activity timestamp; committed with the caller's transaction.
+
+        The version is incremented in SQL and expired by the flush; reload
+        the session before reading it.
+        """
+        session.last_activity_at = datetime.now(timezone.utc)
+        session.updated_at = datetime.now(timezone.utc)
+        session.version = Session.version + 1
 
     def validate_session_active(self, session: Session) -> None:
         """Validate that a session is still active."""
         if session.status != "active":
             raise SessionEndedError(session.session_id, session.status)
 
-    def to_response(self, session: Session) -> SessionResponse:
+    def to_response(
+        self,
+        session: Session,
+        manual: Optional[CachedManual] = None
+    ) -> SessionResponse:
         """Convert session model to response schema."""
-        return SessionResponse(
-            id=session.id,
-            session_id=session.session_id,
-            user_id=session.user_id,
-            manual_id=session.manual.manual_id,
-            current_step=session.current_step,
-            total_steps=session.manual.total_steps,
-            status=session.status,
-            started_at=session.started_at,
-            ended_at=session.ended_at,
-            last_activity_at=session.last_activity_at,
-            duration_seconds=session.duration_seconds,
-            created_at=session.created_at,
-            updated_at=session.updated_at,
-        )
+        return SessionResponse(**self.to_response_dict(session, manual))
+
+    def to_response_dict(
+        self,
+        session: Session,
+        manual: Optional[CachedManual] = None
+    ) -> dict:
+        """
+        Convert session model to the fields of `SessionResponse`.
+
+        List endpoints render these dicts directly with `FastJSONResponse`
+        instead of building a Pydantic model per row. Pass `manual` when
+        the session was loaded without its manual relationship.
+        """
+        manual = manual or session.manual
+        return {
+            "id": session.id,
+            "session_id": session.session_id,
+            "user_id": session.user_id,
+            "manual_id": manual.manual_id,
+            "current_step": session.current_step,
+            "total_steps": manual.total_steps,
+            "status": session.status,
+            "started_at": session.started_at,
+            "ended_at": session.ended_at,
+            "last_activity_at": session.last_activity_at,
+            "duration_seconds": session.duration_seconds,
+            "created_at": session.created_at,
+            "updated_at": session.updated_at,
+        }
@@ -1,15 +1,18 @@
-"""Webhook retry service with exponential backoff."""
+"""Webhook outbox dispatcher with retry and exponential backoff."""
 import json
 import logging
 import asyncio
+import time
 from datetime import datetime, timezone, timedelta
 from typing import Optional
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 import httpx
 
 from app.database import async_session_maker
 from app.models.webhook_queue import WebhookQueueItem
+from app.services.http_client import webhook_http_client
+from app.services.metrics import webhook_queue_depth, webhook_send_duration
 from app.config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -18,7 +21,16 @@ settings = get_settings()
 
 class WebhookRetryService:
     """
-    Service for managing webhook retries with exponential backoff.
+    Dispatcher for the `webhook_queue` outbox with exponential backoff.
+
+    Every webhook event is written to the queue in the same transaction as
+    the state change that produced it. The dispatcher delivers due items in
+    the background; request handlers call `notify()` after committing so new
+    events go out immediately instead of waiting for the next poll.
+
+    Workers claim batches with `FOR UPDATE SKIP LOCKED` and a lease, so any
+    number of processes can drain the queue in parallel without delivering
+    the same item twice.
 
     Retry schedule (base delay * 4^attempt):
     - Attempt 1: immediate
@@ -29,187 +41,272 @@ class WebhookRetryService:
 
     BASE_DELAY_SECONDS = 4
     MAX_ATTEMPTS = 3
-    RETRY_INTERVAL_SECONDS = 5  # How often to check for retries
+    RETRY_INTERVAL_SECONDS = 5  # How often to poll when not notified
 
-    def __init__(self):
+    def __init__(self, session_maker: async_sessionmaker = async_session_maker):
         self.is_running = False
+        self._wakeup = asyncio.Event()
+        self.session_maker = session_maker
+        self.batch_size = settings.WEBHOOK_DISPATCH_BATCH_SIZE
+        self.concurrency = settings.WEBHOOK_DISPATCH_CONCURRENCY
+        self.lease_seconds = settings.WEBHOOK_LEASE_SECONDS
         self.webhook_url = settings.WEBHOOK_URL
-        self.timeout = settings.WEBHOOK_TIMEOUT
         self.enabled = settings.WEBHOOK_ENABLED
 
-    async def queue_webhook(
+    def enqueue(
         self,
         db: AsyncSession,
         payload: dict,
         event_type: str,
         session_id: Optional[str] = None
     ) -> WebhookQueueItem:
-        """Add a webhook to the retry queue."""
+        """
+        Add a webhook to the outbox without committing.
+
+        The item is persisted with the caller's transaction, so the event
+        exists if and only if the state change that produced it commits.
+        """
         item = WebhookQueueItem(
             url=self.webhook_url,
             payload=json.dumps(payload),
             event_type=event_type,
             session_id=session_id,
             status="pending",
-            next_retry_at=datetime.now(timezone.utc).isoformat(),
+            next_retry_at=datetime.now(timezone.utc),
         )
         db.add(item)
-        await db.commit()
-        await db.refresh(item)
-
-        logger.info(f"Queued webhook: {event_type} for session {session_id}")
         return item
 
-    async def send_with_retry(
+    async def queue_webhook(
         self,
         db: AsyncSession,
         payload: dict,
         event_type: str,
         session_id: Optional[str] = None
-    ) -> bool:
-        """
-        Try to send webhook immediately, queue for retry if failed.
-
-        Returns True if sent successfully, False if queued for retry.
-        """
-        if not self.enabled:
-            logger.info("Webhooks disabled, skipping")
-            return True
-
-        # Try immediate send
-        success, error = await self._send_webhook(payload)
-
-        if success:
-            logger.info(f"Webhook sent successfully: {event_type}")
-            return True
-
-        # Queue for retry
-        item = WebhookQueueItem(
-            url=self.webhook_url,
-            payload=json.dumps(payload),
-            event_type=event_type,
-            session_id=session_id,
-            status="pending",
-            attempts=1,
-            last_attempt_at=datetime.now(timezone.utc).isoformat(),
-            last_error=error,
-            next_retry_at=self._calculate_next_retry(1),
-        )
-        db.add(item)
+    ) -> WebhookQueueItem:
+        """Add a webhook to the queue and commit it."""
+        item = self.enqueue(db, payload, event_type, session_id)
         await db.commit()
+        await db.refresh(item)
+        self.notify()
+
+        logger.info(f"Queued webhook: {event_type} for session {session_id}")
+        return item
 
-        logger.warning(f"Webhook failed, queued for retry: {event_type} - {error}")
-        return False
+    def notify(self) -> None:
+        """Wake the dispatcher after new events have been committed."""
+        self._wakeup.set()
 
     async def _send_webhook(self, payload: dict) -> tuple[bool, Optional[str]]:
         """Attempt to send a webhook. Returns (success, error_message)."""
+        start = time.perf_counter()
+        outcome = "error"
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    self.webhook_url,
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                )
-                response.raise_for_status()
+            response = await webhook_http_client.post(self.webhook_url, payload)
+            response.raise_for_status()
+            outcome = "success"
             return True, None
 
         except httpx.TimeoutException:
+            outcome = "timeout"
             return False, "Timeout"
         except httpx.HTTPStatusError as e:
+            outcome = "http_error"
             return False, f"HTTP {e.response.status_code}"
         except httpx.RequestError as e:
             return False, str(e)
         except Exception as e:
             return False, str(e)
+        finally:
+            webhook_send_duration.observe(time.perf_counter() - start, outcome)
 
-    def _calculate_next_retry(self, attempt: int) -> str:
+    def _calculate_next_retry(self, attempt: int) -> datetime:
         """Calculate next retry time using exponential backoff."""
         delay_seconds = self.BASE_DELAY_SECONDS * (4 ** (attempt - 1))
-        next_retry = datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
-        return next_retry.isoformat()
+        return datetime.now(timezone.utc) + timedelta(seconds=delay_seconds)
 
-    async def process_retry_queue(self):
-        """Process pending webhooks that are due for retry."""
-        async with async_session_maker() as db:
-            try:
-                now = datetime.now(timezone.utc).isoformat()
+    async def claim_batch(self) -> tuple[list[WebhookQueueItem], datetime]:
+        """
+        Claim a batch of due webhooks for this worker.
 
-                # Get pending items due for retry
-                result = await db.execute(
-                    select(WebhookQueueItem)
-                    .where(
-                        WebhookQueueItem.status == "pending",
-                        WebhookQueueItem.next_retry_at <= now
-                    )
-                    .limit(10)  # Process in batches
-                )
-                items = result.scalars().all()
+        Rows are selected with `FOR UPDATE SKIP LOCKED`, so concurrent workers
+        never claim the same row, and their `next_retry_at` is pushed forward
+        by the lease duration in the same statement. The lease acts as a
+        visibility timeout: if this worker dies mid-delivery the items become
+        due again once it expires. The lease timestamp doubles as the claim
+        token checked when results are written back.
 
-                for item in items:
-                    await self._process_single_retry(db, item)
+        Returns the claimed items and the lease token.
+        """
+        now = datetime.now(timezone.utc)
+        lease_until = now + timedelta(seconds=self.lease_seconds)
+
+        due_ids = (
+            select(WebhookQueueItem.id)
+            .where(
+                WebhookQueueItem.status == "pending",
+                WebhookQueueItem.next_retry_at <= now
+            )
+            .order_by(WebhookQueueItem.next_retry_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
 
-            except Exception as e:
-                logger.error(f"Error processing retry queue: {e}")
+        async with self.session_maker() as db:
+            result = await db.execute(
+                update(WebhookQueueItem)
+                .where(WebhookQueueItem.id.in_(due_ids))
+                .values(next_retry_at=lease_until)
+                .returning(WebhookQueueItem)
+                .execution_options(synchronize_session=False)
+            )
+            items = list(result.scalars().all())
+            await db.commit()
+
+        return items, lease_until
+
+    async def process_retry_queue(self) -> int:
+        """
+        Claim and deliver one batch of due webhooks.
+
+        Deliveries run concurrently, bounded by the dispatch concurrency
+        setting, and all outcomes are written back in a single transaction.
+
+        Returns the number of items claimed.
+        """
+        if not self.enabled:
+            return 0
 
-    async def _process_single_retry(self, db: AsyncSession, item: WebhookQueueItem):
-        """Process a single retry item."""
         try:
-            payload = json.loads(item.payload)
-            success, error = await self._send_webhook(payload)
+            items, lease_until = await self.claim_batch()
+        except Exception as e:
+            logger.error(f"Error claiming webhook batch: {e}")
+            return 0
 
-            item.attempts += 1
-            item.last_attempt_at = datetime.now(timezone.utc).isoformat()
+        if not items:
+            return 0
 
-            if success:
-                item.status = "success"
-                logger.info(
-                    f"Webhook retry successful: {item.event_type} "
-                    f"(attempt {item.attempts})"
-                )
-            elif item.attempts >= self.MAX_ATTEMPTS:
-                item.status = "failed"
-                item.last_error = error
-                logger.error(
-                    f"Webhook permanently failed after {item.attempts} attempts: "
-                    f"{item.event_type} - {error}"
-                )
-            else:
-                item.last_error = error
-                item.next_retry_at = self._calculate_next_retry(item.attempts)
-                logger.warning(
-                    f"Webhook retry failed, scheduling next attempt: "
-                    f"{item.event_type} (attempt {item.attempts}/{self.MAX_ATTEMPTS})"
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def deliver(item: WebhookQueueItem) -> dict:
+            async with semaphore:
+                return await self._deliver(item, lease_until)
+
+        outcomes = await asyncio.gather(*(deliver(item) for item in items))
+
+        table = WebhookQueueItem.__table__
+        try:
+            async with self.session_maker() as db:
+                # Only write back rows still holding our lease; an expired
+                # lease may already have been claimed by another worker.
+                await db.execute(
+                    update(table)
+                    .where(
+                        table.c.id == bindparam("b_id"),
+                        table.c.next_retry_at == bindparam("b_lease"),
+                        table.c.status == "pending",
+                    )
+                    .values(
+                        status=bindparam("b_status"),
+                        attempts=bindparam("b_attempts"),
+                        last_attempt_at=bindparam("b_last_attempt_at"),
+                        last_error=bindparam("b_last_error"),
+                        next_retry_at=bindparam("b_next_retry_at"),
+                    ),
+                    outcomes,
                 )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error recording webhook outcomes: {e}")
 
-            await db.commit()
+        return len(items)
 
+    async def _deliver(self, item: WebhookQueueItem, lease_until: datetime) -> dict:
+        """Deliver a single claimed item and return its new state."""
+        try:
+            payload = json.loads(item.payload)
+            success, error = await self._send_webhook(payload)
         except Exception as e:
-            logger.error(f"Error processing retry item: {e}")
-            await db.rollback()
+            success, error = False, str(e)
+
+        attempts = item.attempts + 1
+        now = datetime.now(timezone.utc)
+        outcome = {
+            "b_id": item.id,
+            "b_lease": lease_until,
+            "b_status": "pending",
+            "b_attempts": attempts,
+            "b_last_attempt_at": now,
+            "b_last_error": error,
+            "b_next_retry_at": now,
+        }
+
+        if success:
+            outcome["b_status"] = "success"
+            outcome["b_last_error"] = item.last_error
+            logger.info(
+                f"Webhook delivered: {item.event_type} "
+                f"(attempt {attempts})"
+            )
+        elif attempts >= self.MAX_ATTEMPTS:
+            outcome["b_status"] = "failed"
+            logger.error(
+                f"Webhook permanently failed after {attempts} attempts: "
+                f"{item.event_type} - {error}"
+            )
+        else:
+            outcome["b_next_retry_at"] = self._calculate_next_retry(attempts)
+            logger.warning(
+                f"Webhook delivery failed, scheduling next attempt: "
+                f"{item.event_type} (attempt {attempts}/{self.MAX_ATTEMPTS})"
+            )
+
+        return outcome
 
     async def start_retry_worker(self):
-        """Start the background retry worker."""
+        """Start the background dispatcher loop."""
         self.is_running = True
-        logger.info("Starting webhook retry worker...")
+        logger.info("Starting webhook dispatcher...")
 
         while self.is_running:
+            self._wakeup.clear()
+            claimed = 0
             try:
-                await self.process_retry_queue()
+                claimed = await self.process_retry_queue()
             except Exception as e:
-                logger.error(f"Retry worker error: {e}")
+                logger.error(f"Webhook dispatcher error: {e}")
 
-            await asyncio.sleep(self.RETRY_INTERVAL_SECONDS)
+            # A full batch means there is more backlog; keep draining
+            if claimed >= self.batch_size:
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    timeout=self.RETRY_INTERVAL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
 
     def stop_retry_worker(self):
         """Stop the background retry worker."""
         self.is_running = False
-        logger.info("Stopping webhook retry worker...")
+        self._wakeup.set()
+        logger.info("Stopping webhook dispatcher...")
+
+    async def count_pending(self, db: AsyncSession) -> int:
+        """Count items waiting for delivery or retry and update the queue depth gauge."""
+        result = await db.execute(
+            select(func.count(WebhookQueueItem.id))
+            .where(WebhookQueueItem.status == "pending")
+        )
+        pending = result.scalar() or 0
+        webhook_queue_depth.set(pending)
+        return pending
 
     async def get_queue_stats(self) -> dict:
         """Get statistics about the webhook queue."""
-        async with async_session_maker() as db:
-            from sqlalchemy import func
-
+        async with self.session_maker() as db:
             # Count by status
             result = await db.execute(
                 select(
@@ -226,7 +323,11 @@ class WebhookRetryService:
                 "success": stats.get("success", 0),
                 "failed": stats.get("failed", 0),
                 "retry_interval_seconds": self.RETRY_INTERVAL_SECONDS,
+                "batch_size": self.batch_size,
+                "concurrency": self.concurrency,
+                "lease_seconds": self.lease_seconds,
                 "max_attempts": self.MAX_ATTEMPTS,
+                "http_client": webhook_http_client.get_stats(),
             }
 
 
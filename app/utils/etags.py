@@ -0,0 +1,45 @@
+"""Entity tags for conditional GET requests."""
+from typing import Any, Optional
+from fastapi import Response, status
+
+from app.models import Session
+
+
+def session_etag(session: Session) -> str:
+    """
+    Strong ETag for a session's representations.
+
+    `Session.version` is bumped on every mutation, and the manual a session
+    points at never changes, so the row ID and version identify the state.
+    `duration_seconds` of an active session is computed at request time and
+    is not covered.
+    """
+    return f'"{session.id.hex}-{session.version}"'
+
+
+def manual_etag(manual: Any) -> str:
+    """Strong ETag for a `Manual` or `CachedManual`, from its ID and `updated_at`."""
+    return f'"{manual.id.hex}-{int(manual.updated_at.timestamp() * 1_000_000)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an `If-None-Match` header against an ETag.
+
+    Uses the weak comparison RFC 9110 requires for `If-None-Match`, so the
+    `W/` form sent back for compressed responses still matches.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 response carrying the current ETag."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
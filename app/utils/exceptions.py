@@ -25,13 +25,19 @@ class ErrorCode(str, Enum):
     # Validation errors (4xxx)
     VALIDATION_ERROR = "VALIDATION_ERROR"
     INVALID_REQUEST = "INVALID_REQUEST"
+    DUPLICATE_REQUEST = "DUPLICATE_REQUEST"
 
     # Rate limiting (5xxx)
     RATE_LIMIT_EXCEEDED = "RATE_LIMIT_EXCEEDED"
 
+    # Admin (6xxx)
+    ADMIN_DISABLED = "ADMIN_DISABLED"
+    ADMIN_FORBIDDEN = "ADMIN_FORBIDDEN"
+
     # Server errors (9xxx)
     INTERNAL_ERROR = "INTERNAL_ERROR"
     DATABASE_ERROR = "DATABASE_ERROR"
+    QUERY_TIMEOUT = "QUERY_TIMEOUT"
 
 
 class SessionServiceException(Exception):
@@ -153,6 +159,18 @@ class DuplicateProgressUpdateError(SessionServiceException):
         )
 
 
+class DuplicateRequestError(SessionServiceException):
+    """Raised when a request reuses an idempotency key another request is committing."""
+
+    def __init__(self, idempotency_key: str):
+        super().__init__(
+            message=f"Request with idempotency key '{idempotency_key}' already processed",
+            status_code=status.HTTP_409_CONFLICT,
+            error_code=ErrorCode.DUPLICATE_REQUEST,
+            details={"idempotency_key": idempotency_key},
+        )
+
+
 class ConcurrentUpdateError(SessionServiceException):
     """Raised when a concurrent update conflict is detected."""
 
@@ -177,6 +195,52 @@ class OutOfOrderUpdateError(SessionServiceException):
         )
 
 
+class InvalidCursorError(SessionServiceException):
+    """Raised when a pagination cursor cannot be decoded."""
+
+    def __init__(self, cursor: str):
+        super().__init__(
+            message="Invalid pagination cursor",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            error_code=ErrorCode.INVALID_REQUEST,
+            details={"cursor": cursor},
+        )
+
+
+class AdminDisabledError(SessionServiceException):
+    """Raised when an admin endpoint is called but no admin token is configured."""
+
+    def __init__(self):
+        super().__init__(
+            message="Admin endpoints are disabled. Set ADMIN_TOKEN to enable them.",
+            status_code=status.HTTP_404_NOT_FOUND,
+            error_code=ErrorCode.ADMIN_DISABLED,
+        )
+
+
+class AdminForbiddenError(SessionServiceException):
+    """Raised when an admin endpoint is called without a valid admin token."""
+
+    def __init__(self):
+        super().__init__(
+            message="Missing or invalid X-Admin-Token header",
+            status_code=status.HTTP_403_FORBIDDEN,
+            error_code=ErrorCode.ADMIN_FORBIDDEN,
+        )
+
+
+class QueryTimeoutError(SessionServiceException):
+    """Raised when the database cancels a statement for exceeding its timeout."""
+
+    def __init__(self, timeout_ms: int):
+        super().__init__(
+            message=f"Query exceeded the {timeout_ms} ms statement timeout. Please retry later.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            error_code=ErrorCode.QUERY_TIMEOUT,
+            details={"timeout_ms": timeout_ms},
+        )
+
+
 def handle_service_exception(exc: SessionServiceException) -> HTTPException:
     """Convert service exception to HTTP exception."""
     return HTTPException(
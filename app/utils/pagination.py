@@ -0,0 +1,69 @@
+"""Keyset (cursor) pagination helpers."""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Sequence
+from uuid import UUID
+from sqlalchemy import Select, tuple_
+
+from app.utils.exceptions import InvalidCursorError
+
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Encode a row position as an opaque, URL-safe cursor."""
+    raw = json.dumps([created_at.isoformat(), str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """Decode a cursor produced by `encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise InvalidCursorError(cursor)
+
+
+def apply_keyset(
+    query: Select,
+    created_col: Any,
+    id_col: Any,
+    cursor: Optional[str],
+    descending: bool = False,
+) -> Select:
+    """
+    Order a query by `(created_at, id)` and start it after the cursor.
+
+    The `(created_at, id)` row comparison matches the composite indexes on
+    the listed tables, so each page is an index range scan regardless of
+    how deep it is.
+    """
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        position = tuple_(created_col, id_col)
+        if descending:
+            query = query.where(position < (created_at, row_id))
+        else:
+            query = query.where(position > (created_at, row_id))
+
+    return query
+
+
+def split_page(rows: Sequence[Any], limit: int) -> tuple[list[Any], Optional[str]]:
+    """
+    Split `limit + 1` fetched rows into a page and the cursor for the next one.
+
+    Returns None as the cursor on the last page.
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
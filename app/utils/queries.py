@@ -0,0 +1,87 @@
+"""Query helpers shared by the service layer."""
+from typing import Any, Optional
+from sqlalchemy import select, func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# PostgreSQL error codes the services and rate limiter handle
+STATEMENT_TIMEOUT_SQLSTATE = "57014"  # query_canceled
+LOCK_TIMEOUT_SQLSTATE = "55P03"  # lock_not_available
+UNIQUE_VIOLATION_SQLSTATE = "23505"  # unique_violation
+DATA_EXCEPTION_SQLSTATE_CLASS = "22"  # data_exception: a value does not fit its column or type
+
+
+async def count_rows(db: AsyncSession, model: Any, *criteria: Any) -> int:
+    """Count rows matching the criteria with a single aggregate query."""
+    query = select(func.count()).select_from(model)
+    if criteria:
+        query = query.where(*criteria)
+    result = await db.execute(query)
+    return result.scalar() or 0
+
+
+async def estimate_rows(db: AsyncSession, table_name: str) -> Optional[int]:
+    """
+    Get the planner's row estimate for a table from `pg_class.reltuples`.
+
+    Returns None if the table has never been analyzed.
+    """
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name},
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+async def count_all_rows(db: AsyncSession, model: Any) -> int:
+    """
+    Count every row of a table for an unfiltered listing.
+
+    When `ESTIMATED_COUNTS_ENABLED` is set and the planner estimates at
+    least `ESTIMATED_COUNT_THRESHOLD` rows, the estimate is returned instead
+    of scanning the table. Smaller tables are always counted exactly.
+    """
+    if settings.ESTIMATED_COUNTS_ENABLED:
+        estimate = await estimate_rows(db, model.__tablename__)
+        if estimate is not None and estimate >= settings.ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+
+    return await count_rows(db, model)
+
+
+async def set_statement_timeout(db: AsyncSession, timeout_ms: int) -> None:
+    """
+    Limit statements for the rest of the current transaction.
+
+    Overrides the connection's `DATABASE_STATEMENT_TIMEOUT_MS`; the setting
+    reverts when the transaction ends, so pooled connections are unaffected.
+    """
+    await db.execute(select(func.set_config("statement_timeout", str(timeout_ms), True)))
+
+
+def has_sqlstate(error: DBAPIError, sqlstate: str) -> bool:
+    """Check whether a database error carries the given PostgreSQL error code."""
+    return getattr(error.orig, "sqlstate", None) == sqlstate
+
+
+def violated_constraint(error: DBAPIError) -> Optional[str]:
+    """Get the name of the constraint a database error reports, if any."""
+    # SQLAlchemy's asyncpg adapter copies the SQLSTATE but not the constraint
+    # name; that stays on the asyncpg error it was raised from
+    for cause in (error.orig, getattr(error.orig, "__cause__", None)):
+        name = getattr(cause, "constraint_name", None)
+        if name:
+            return name
+    return None
+
+
+def has_sqlstate_class(error: DBAPIError, sqlstate_class: str) -> bool:
+    """Check whether a database error's PostgreSQL error code is in the given class."""
+    return (getattr(error.orig, "sqlstate", None) or "").startswith(sqlstate_class)
@@ -0,0 +1,87 @@
+"""Per-request SQL statement counts and database time."""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    """
+    Statements executed and time spent in the database within one scope.
+
+    Scopes nest: a statement is counted in the current scope and in every
+    enclosing one, so a test can track queries across requests that each
+    open their own scope. Statement text is only kept when `keep_statements`
+    is set, to keep per-request tracking allocation-free.
+    """
+
+    def __init__(self, parent: Optional["QueryStats"] = None, keep_statements: bool = False):
+        self.parent = parent
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Optional[list[str]] = [] if keep_statements else None
+
+    def record(self, statement: str, seconds: float) -> None:
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            if stats.statements is not None:
+                stats.statements.append(statement)
+            stats = stats.parent
+
+    @property
+    def milliseconds(self) -> float:
+        return self.seconds * 1000
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Get the innermost active scope, if any."""
+    return _current.get()
+
+
+@contextmanager
+def track_queries(keep_statements: bool = False) -> Iterator[QueryStats]:
+    """
+    Count the statements executed inside the block.
+
+    SQLAlchemy runs the hooks in a greenlet that inherits the caller's
+    context, so statements issued by `AsyncSession` are attributed to the
+    awaiting task's scope.
+    """
+    stats = QueryStats(parent=_current.get(), keep_statements=keep_statements)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context.query_start_time = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record(context, statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement (e.g. a timeout) never reaches after_cursor_execute
+    _record(exception_context.execution_context, exception_context.statement or "")
+
+
+def _record(context, statement: str) -> None:
+    stats = _current.get()
+    start = getattr(context, "query_start_time", None)
+    if stats is not None and start is not None:
+        stats.record(statement, time.perf_counter() - start)
+        context.query_start_time = None
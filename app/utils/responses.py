@@ -0,0 +1,69 @@
+"""Fast JSON response rendering."""
+import json
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Any
+from uuid import UUID
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """
+    Encode values the JSON encoders do not handle themselves.
+
+    The stdlib fallback needs all of these; orjson only needs it for UUID
+    subclasses such as asyncpg's, as it accepts exact `uuid.UUID` only.
+    """
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        if value.utcoffset() == timezone.utc.utcoffset(None):
+            # Match orjson's OPT_UTC_Z and Pydantic's UTC format
+            text = text[:-6] + "Z"
+        return text
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON.
+
+    datetimes (UTC as `Z`), dates, UUIDs and enums are encoded directly, so
+    rows can be rendered without building Pydantic models first.
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when it is installed.
+
+    Used as the application's default response class. Output matches
+    Starlette's `JSONResponse`; without orjson it falls back to the
+    standard library encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Middleware Stack Benchmark
+
+Measures requests/sec on `GET /api/v1/sessions/{id}` with the request ID
+and rate limit middleware written as plain ASGI middleware, against the
+previous `BaseHTTPMiddleware` versions and against no middleware at all.
+Requests go through httpx's in-process ASGI transport, so the numbers
+exclude network and server overhead and the differences are the
+middleware's own cost.
+
+Needs a database at DATABASE_URL; a benchmark manual and session are
+created there and deleted afterwards.
+
+Run: python benchmarks/bench_middleware.py [--requests 5000] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI, Request, Response  # noqa: E402
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+
+from app.api.routes import api_router  # noqa: E402
+from app.database import init_db, close_db  # noqa: E402
+from app.middleware.rate_limiter import (  # noqa: E402
+    InMemoryRateLimiter,
+    RateLimitExceeded,
+    RateLimitMiddleware,
+)
+from app.middleware.request_id import RequestIDMiddleware  # noqa: E402
+
+# The package re-exports the `rate_limiter` instance under the module's name
+rate_limiter_module = sys.modules["app.middleware.rate_limiter"]
+
+
+class LegacyRequestIDMiddleware(BaseHTTPMiddleware):
+    """The previous request ID middleware."""
+
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("X-Request-ID", str(uuid4()))
+        request.state.request_id = request_id
+
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """The previous rate limit middleware."""
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        client_id = request.client.host if request.client else "unknown"
+        is_allowed, retry_after = rate_limiter_module.rate_limiter.is_allowed(client_id)
+        if not is_allowed:
+            raise RateLimitExceeded(retry_after=retry_after)
+
+        remaining = rate_limiter_module.rate_limiter.get_remaining(client_id)
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit-Minute"] = str(remaining["minute"]["limit"])
+        response.headers["X-RateLimit-Remaining-Minute"] = str(remaining["minute"]["remaining"])
+        response.headers["X-RateLimit-Limit-Hour"] = str(remaining["hour"]["limit"])
+        response.headers["X-RateLimit-Remaining-Hour"] = str(remaining["hour"]["remaining"])
+        return response
+
+
+def make_app(rate_limit_middleware=None, request_id_middleware=None) -> FastAPI:
+    """Build the API with the given middleware, in the order used by app.main."""
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api/v1")
+    if rate_limit_middleware:
+        app.add_middleware(rate_limit_middleware)
+    if request_id_middleware:
+        app.add_middleware(request_id_middleware)
+    return app
+
+
+async def run(app: FastAPI, path: str, requests: int, concurrency: int) -> float:
+    """Issue `requests` GETs from `concurrency` workers; return requests/sec."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up connections and caches
+        for _ in range(50):
+            response = await client.get(path)
+            response.raise_for_status()
+
+        remaining = requests
+
+        async def worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                response = await client.get(path)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return requests / elapsed
+
+
+async def main(requests: int, concurrency: int, rounds: int):
+    await init_db()
+
+    # Limits high enough that the benchmark is never throttled
+    rate_limiter_module.rate_limiter = InMemoryRateLimiter(10**9, 10**9)
+    rate_limiter_module.RATE_LIMIT_DISABLED = False
+
+    apps = (
+        ("no middleware", make_app()),
+        ("BaseHTTPMiddleware", make_app(LegacyRateLimitMiddleware, LegacyRequestIDMiddleware)),
+        ("pure ASGI", make_app(RateLimitMiddleware, RequestIDMiddleware)),
+    )
+
+    suffix = uuid4().hex[:8]
+    manual_id = f"bench-manual-{suffix}"
+    session_id = f"bench-session-{suffix}"
+    setup_app = apps[0][1]
+    async with AsyncClient(transport=ASGITransport(app=setup_app), base_url="http://bench") as client:
+        response = await client.post("/api/v1/manuals", json={
+            "manual_id": manual_id,
+            "title": "Benchmark Manual",
+            "steps": [
+                {"step_number": i, "title": f"Step {i}", "content": f"Content for step {i}"}
+                for i in range(1, 6)
+            ],
+        })
+        response.raise_for_status()
+        response = await client.post("/api/v1/sessions", json={
+            "session_id": session_id,
+            "user_id": "bench-user",
+            "manual_id": manual_id,
+        })
+        response.raise_for_status()
+
+    path = f"/api/v1/sessions/{session_id}"
+    print(f"GET {path}: {requests:,} requests x {rounds} rounds, concurrency {concurrency}\n")
+    print(f"{'middleware':<22}{'req/s':>10}")
+
+    try:
+        # Interleave rounds so drift in database latency affects every stack alike
+        results = {name: [] for name, _ in apps}
+        for _ in range(rounds):
+            for name, app in apps:
+                results[name].append(await run(app, path, requests, concurrency))
+
+        for name, _ in apps:
+            print(f"{name:<22}{max(results[name]):>10,.0f}")
+    finally:
+        async with AsyncClient(transport=ASGITransport(app=setup_app), base_url="http://bench") as client:
+            await client.delete(f"/api/v1/sessions/{session_id}")
+            await client.delete(f"/api/v1/manuals/{manual_id}")
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Middleware stack benchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3, help="Best of this many runs per stack")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.rounds))
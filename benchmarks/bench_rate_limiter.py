@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Microbenchmark
+
+Measures per-request cost and memory of the rate limiter with 100k
+distinct clients, against the previous list-of-timestamps implementation.
+
+Run: python benchmarks/bench_rate_limiter.py [--clients 100000] [--requests 500000]
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.middleware.rate_limiter import InMemoryRateLimiter  # noqa: E402
+
+
+class ListRateLimiter:
+    """The previous implementation: per-client timestamp lists rebuilt on every check."""
+
+    def __init__(self, requests_per_minute: int, requests_per_hour: int):
+        self.requests_per_minute = requests_per_minute
+        self.requests_per_hour = requests_per_hour
+        self.minute_requests = defaultdict(list)
+        self.hour_requests = defaultdict(list)
+
+    def _cleanup(self, requests, window_seconds):
+        cutoff = time.time() - window_seconds
+        return [req for req in requests if req > cutoff]
+
+    def is_allowed(self, client_id):
+        current_time = time.time()
+        self.minute_requests[client_id] = self._cleanup(self.minute_requests[client_id], 60)
+        self.hour_requests[client_id] = self._cleanup(self.hour_requests[client_id], 3600)
+        if len(self.minute_requests[client_id]) >= self.requests_per_minute:
+            oldest = min(self.minute_requests[client_id])
+            return False, int(60 - (current_time - oldest)) + 1
+        if len(self.hour_requests[client_id]) >= self.requests_per_hour:
+            oldest = min(self.hour_requests[client_id])
+            return False, int(3600 - (current_time - oldest)) + 1
+        self.minute_requests[client_id].append(current_time)
+        self.hour_requests[client_id].append(current_time)
+        return True, 0
+
+    def get_remaining(self, client_id):
+        self.minute_requests[client_id] = self._cleanup(self.minute_requests[client_id], 60)
+        self.hour_requests[client_id] = self._cleanup(self.hour_requests[client_id], 3600)
+        return len(self.minute_requests[client_id]), len(self.hour_requests[client_id])
+
+
+def run(make_limiter, client_ids: list[str]) -> tuple[float, int]:
+    """Run a check plus remaining lookup per request; return ns/request and bytes held."""
+    limiter = make_limiter()
+    start = time.perf_counter_ns()
+    for client_id in client_ids:
+        limiter.is_allowed(client_id)
+        limiter.get_remaining(client_id)
+    elapsed = time.perf_counter_ns() - start
+
+    # Memory is measured on a separate run; tracing slows every allocation
+    tracemalloc.start()
+    limiter = make_limiter()
+    for client_id in client_ids:
+        limiter.is_allowed(client_id)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed / len(client_ids), memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate limiter microbenchmark")
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=500_000)
+    parser.add_argument("--hot-clients", type=int, default=100,
+                        help="Clients receiving half of all traffic")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    clients = [f"10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(args.clients)]
+    hot = clients[:args.hot_clients]
+    client_ids = [
+        rng.choice(hot) if rng.random() < 0.5 else rng.choice(clients)
+        for _ in range(args.requests)
+    ]
+
+    print(f"{args.requests:,} requests across {args.clients:,} clients "
+          f"({args.hot_clients} hot clients get half the traffic)\n")
+    print(f"{'implementation':<24}{'ns/request':>12}{'memory (MB)':>14}")
+
+    for name, make_limiter in (
+        ("list (previous)", lambda: ListRateLimiter(100, 2000)),
+        ("sliding window counter", lambda: InMemoryRateLimiter(100, 2000, max_clients=args.clients)),
+    ):
+        ns_per_request, memory = run(make_limiter, client_ids)
+        print(f"{name:<24}{ns_per_request:>12,.0f}{memory / 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Response Serialization Benchmark
+
+Measures `GET /sessions?limit=1000` and `GET /sessions/{id}/messages?limit=1000`
+with list responses rendered from rows by `FastJSONResponse`, against the
+previous path: a Pydantic model per row, FastAPI's response_model
+validation and `json.dumps`. Requests go through httpx's in-process ASGI
+transport, so both variants pay the same query cost.
+
+Needs a database at DATABASE_URL; a benchmark manual, 1000 sessions and
+1000 messages are created there and deleted afterwards. The session list is
+filtered by the benchmark user so other rows do not change the page.
+
+Run: python benchmarks/bench_serialization.py [--requests 50]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import APIRouter, Depends, FastAPI, Query  # noqa: E402
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from sqlalchemy import delete, insert  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+
+from app.api.deps import get_db  # noqa: E402
+from app.api.routes import api_router  # noqa: E402
+from app.database import async_session_maker, init_db, close_db  # noqa: E402
+from app.models.manual import Manual  # noqa: E402
+from app.models.message import ConversationMessage  # noqa: E402
+from app.models.session import Session  # noqa: E402
+from app.schemas.message import MessageListResponse  # noqa: E402
+from app.schemas.session import SessionListResponse  # noqa: E402
+from app.services.message_service import MessageService  # noqa: E402
+from app.services.session_service import SessionService  # noqa: E402
+from app.utils.responses import FastJSONResponse  # noqa: E402
+
+ROWS = 1000
+
+legacy_router = APIRouter()
+
+
+@legacy_router.get("/sessions", response_model=SessionListResponse)
+async def legacy_list_sessions(
+    user_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """The previous list endpoint: one Pydantic model per row."""
+    service = SessionService(db)
+    sessions, total, next_cursor = await service.list_sessions(user_id=user_id, limit=limit)
+    return SessionListResponse(
+        sessions=[service.to_response(s) for s in sessions],
+        total=total,
+        next_cursor=next_cursor,
+    )
+
+
+@legacy_router.get("/sessions/{session_id}/messages", response_model=MessageListResponse)
+async def legacy_get_messages(
+    session_id: str,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+):
+    """The previous history endpoint: one Pydantic model per row."""
+    service = MessageService(db)
+    messages, total, session_id, next_cursor = await service.get_messages(session_id, limit=limit)
+    return MessageListResponse(
+        messages=[service.to_response(m, session_id) for m in messages],
+        total=total,
+        session_id=session_id,
+        next_cursor=next_cursor,
+    )
+
+
+def make_legacy_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(legacy_router, prefix="/api/v1")
+    return app
+
+
+def make_app() -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.include_router(api_router, prefix="/api/v1")
+    return app
+
+
+async def seed(suffix: str) -> tuple[str, str]:
+    """Create a manual, ROWS sessions and ROWS messages on the first session."""
+    manual_uuid = uuid4()
+    user_id = f"bench-user-{suffix}"
+    now = datetime.now(timezone.utc)
+    sessions = [
+        {
+            "id": uuid4(),
+            "session_id": f"bench-session-{suffix}-{i}",
+            "user_id": user_id,
+            "manual_uuid": manual_uuid,
+            "current_step": 1 + i % 5,
+            "status": "completed" if i % 3 == 0 else "active",
+            "started_at": now - timedelta(minutes=i),
+            "ended_at": now if i % 3 == 0 else None,
+            "last_activity_at": now,
+            "created_at": now - timedelta(seconds=i),
+            "updated_at": now,
+        }
+        for i in range(ROWS)
+    ]
+    messages = [
+        {
+            "id": uuid4(),
+            "session_uuid": sessions[0]["id"],
+            "message_text": f"Message {i}: I have completed this step and moved on to the next one.",
+            "sender": ("user", "agent", "system")[i % 3],
+            "step_at_time": 1 + i % 5,
+            "created_at": now + timedelta(milliseconds=i),
+        }
+        for i in range(ROWS)
+    ]
+
+    async with async_session_maker() as db:
+        await db.execute(insert(Manual).values(
+            id=manual_uuid, manual_id=f"bench-manual-{suffix}", title="Benchmark Manual", total_steps=5,
+        ))
+        await db.execute(insert(Session), sessions)
+        await db.execute(insert(ConversationMessage), messages)
+        await db.commit()
+
+    return user_id, sessions[0]["session_id"]
+
+
+async def cleanup(user_id: str, suffix: str) -> None:
+    async with async_session_maker() as db:
+        await db.execute(delete(Session).where(Session.user_id == user_id))
+        await db.execute(delete(Manual).where(Manual.manual_id == f"bench-manual-{suffix}"))
+        await db.commit()
+
+
+async def measure(app: FastAPI, path: str, requests: int) -> tuple[float, int]:
+    """Return the median milliseconds per request and the response size."""
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.get(path)
+        response.raise_for_status()
+        size = len(response.content)
+
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = await client.get(path)
+            timings.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, size
+
+
+async def main(requests: int):
+    await init_db()
+    suffix = uuid4().hex[:8]
+    user_id, session_id = await seed(suffix)
+
+    endpoints = (
+        ("GET /sessions?limit=1000", f"/api/v1/sessions?user_id={user_id}&limit={ROWS}"),
+        ("GET /sessions/{id}/messages?limit=1000", f"/api/v1/sessions/{session_id}/messages?limit={ROWS}"),
+    )
+    variants = (("pydantic + json (previous)", make_legacy_app()), ("rows + FastJSONResponse", make_app()))
+
+    try:
+        for label, path in endpoints:
+            print(f"\n{label} ({requests} requests, median)")
+            print(f"{'response path':<30}{'ms/request':>12}{'req/s':>10}{'KB':>8}")
+            for name, app in variants:
+                ms, size = await measure(app, path, requests)
+                print(f"{name:<30}{ms:>12.1f}{1000 / ms:>10.0f}{size / 1024:>8.0f}")
+    finally:
+        await cleanup(user_id, suffix)
+        await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response serialization benchmark")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
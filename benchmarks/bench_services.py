@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Service Benchmark Suite
+
+Times the service layer (`SessionService`, `ProgressService`,
+`MessageService`, `ManualService`, `AnalyticsService`) directly against a
+local database, and `InMemoryRateLimiter` in process, at several data
+sizes. At size N the sessions, conversation_messages and progress_events
+tables each hold N rows (the rate limiter tracks N clients). Every call
+runs in its own database session, as a request would.
+
+Results can be saved as a baseline (`--save-baseline`); later runs are
+compared against it and the script exits with status 1 when a benchmark's
+median regresses by more than `--threshold`. Benchmarks missing from the
+baseline are reported but not gated. Baselines only compare on the same
+machine, so record one where the comparison runs (e.g. the CI runner).
+
+The data is loaded into a dedicated database, BENCH_DATABASE_URL (by
+default DATABASE_URL's database with a `_bench` suffix), which is created
+if missing and emptied for each size. Webhooks are disabled.
+
+Run: python benchmarks/bench_services.py [--sizes 1k,100k,1M] [--iterations 100]
+     python benchmarks/bench_services.py --sizes 1k,100k --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Progress updates and session changes would otherwise queue webhooks
+os.environ["WEBHOOK_ENABLED"] = "false"
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.config import get_settings  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.middleware.rate_limiter import InMemoryRateLimiter  # noqa: E402
+from app.schemas.message import MessageCreate  # noqa: E402
+from app.schemas.progress import ProgressUpdate  # noqa: E402
+from app.schemas.session import SessionCreate  # noqa: E402
+from app.services.analytics_counters import analytics_counters  # noqa: E402
+from app.services.analytics_service import AnalyticsService  # noqa: E402
+from app.services.manual_cache import manual_cache  # noqa: E402
+from app.services.manual_service import ManualService  # noqa: E402
+from app.services.message_service import MessageService  # noqa: E402
+from app.services.progress_service import ProgressService  # noqa: E402
+from app.services.session_service import SessionService  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+MANUALS = 10
+STEPS_PER_MANUAL = 12
+SESSIONS_PER_USER = 100
+# Messages and progress events belong to the first tenth of the sessions
+HISTORY_FRACTION = 10
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def size_label(size: int) -> str:
+    if size >= 1_000_000 and size % 1_000_000 == 0:
+        return f"{size // 1_000_000}M"
+    if size >= 1_000 and size % 1_000 == 0:
+        return f"{size // 1_000}k"
+    return str(size)
+
+
+def bench_database_url() -> str:
+    url = os.getenv("BENCH_DATABASE_URL")
+    if url:
+        return url
+    base = make_url(get_settings().DATABASE_URL)
+    return base.set(database=f"{base.database}_bench").render_as_string(hide_password=False)
+
+
+async def prepare_database(url: str) -> None:
+    """Create the benchmark database if needed, and its tables."""
+    target = make_url(url)
+    admin = create_async_engine(target.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        async with admin.connect() as conn:
+            exists = (await conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": target.database}
+            )).scalar()
+            if not exists:
+                await conn.execute(text(f'CREATE DATABASE "{target.database}"'))
+    finally:
+        await admin.dispose()
+
+    engine = create_async_engine(target)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+async def load_data(session_maker: async_sessionmaker, size: int) -> None:
+    """Replace the benchmark data with `size` sessions, messages and progress events."""
+    users = max(size // SESSIONS_PER_USER, 10)
+    with_history = max(size // HISTORY_FRACTION, 1)
+    params = {
+        "size": size,
+        "users": users,
+        "with_history": with_history,
+        "manuals": MANUALS,
+        "steps": STEPS_PER_MANUAL,
+        "now": datetime.now(timezone.utc),
+        # Sessions are spread over the last week, newest first
+        "spacing": timedelta(days=7) / size,
+    }
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+
+    async with session_maker() as db:
+        await db.execute(text(f"TRUNCATE {tables} CASCADE"))
+        await db.execute(text("""
+            INSERT INTO manuals (id, manual_id, title, total_steps, created_at, updated_at)
+            SELECT gen_random_uuid(), 'bench-manual-' || m, 'Benchmark Manual ' || m, :steps, CAST(:now AS timestamptz), CAST(:now AS timestamptz)
+            FROM generate_series(0, :manuals - 1) AS m
+        """), params)
+        await db.execute(text("""
+            INSERT INTO manual_steps (id, manual_uuid, step_number, title, content, created_at)
+            SELECT gen_random_uuid(), m.id, s, 'Step ' || s, 'Content for step ' || s, CAST(:now AS timestamptz)
+            FROM manuals m CROSS JOIN generate_series(1, :steps) AS s
+        """), params)
+        # Seven in ten sessions are active on step 1, two completed, one abandoned
+        await db.execute(text("""
+            INSERT INTO sessions (
+                id, session_id, user_id, manual_uuid, current_step, status, started_at, ended_at,
+                last_activity_at, step_started_at, version, created_at, updated_at
+            )
+            SELECT
+                gen_random_uuid(), 'bench-' || g, 'user-' || (g % :users), m.id,
+                CASE WHEN g % 10 < 7 THEN 1 WHEN g % 10 < 9 THEN :steps + 1 ELSE 3 END,
+                CASE WHEN g % 10 < 7 THEN 'active' WHEN g % 10 < 9 THEN 'completed' ELSE 'abandoned' END,
+                t, CASE WHEN g % 10 < 7 THEN NULL ELSE t + interval '20 minutes' END, t, t, 1, t, t
+            FROM (
+                SELECT g, CAST(:now AS timestamptz) - g * CAST(:spacing AS interval) AS t
+                FROM generate_series(0, :size - 1) AS g
+            ) AS series
+            JOIN manuals m ON m.manual_id = 'bench-manual-' || (g % :manuals)
+        """), params)
+        await db.execute(text("""
+            INSERT INTO conversation_messages (id, session_uuid, message_text, sender, step_at_time, created_at)
+            SELECT
+                gen_random_uuid(), s.id, 'Benchmark message ' || g,
+                (ARRAY['user', 'agent'])[g % 2 + 1], 1, s.created_at + g / :with_history * interval '1 second'
+            FROM generate_series(0, :size - 1) AS g
+            JOIN sessions s ON s.session_id = 'bench-' || (g % :with_history)
+        """), params)
+        await db.execute(text("""
+            INSERT INTO progress_events (
+                id, session_uuid, step_number, step_status, previous_step, processed, created_at
+            )
+            SELECT
+                gen_random_uuid(), s.id, g / :with_history % :steps + 1, 'DONE',
+                g / :with_history % :steps + 1, true, s.created_at + g / :with_history * interval '1 second'
+            FROM generate_series(0, :size - 1) AS g
+            JOIN sessions s ON s.session_id = 'bench-' || (g % :with_history)
+        """), params)
+        await db.commit()
+    # Cached manuals point at the previous size's rows
+    manual_cache.clear()
+
+    async with session_maker() as db:
+        await db.execute(text("ANALYZE"))
+        await analytics_counters.reconcile(db)
+        await analytics_counters.backfill_activity(db, params["now"] - timedelta(days=8))
+        await analytics_counters.rebuild_step_funnel(db)
+        await db.commit()
+
+
+class Workload:
+    """IDs the benchmarks draw from at one data size."""
+
+    def __init__(self, size: int, seed: int = 42):
+        self.size = size
+        self.rng = random.Random(seed)
+        self.users = max(size // SESSIONS_PER_USER, 10)
+        self.with_history = max(size // HISTORY_FRACTION, 1)
+        # Active sessions still on step 1, handed out once each to writers
+        self._fresh = (i for i in range(size - 1, -1, -1) if i % 10 < 7)
+        self._created = 0
+
+    def any_session(self) -> str:
+        return f"bench-{self.rng.randrange(self.size)}"
+
+    def session_with_history(self) -> str:
+        return f"bench-{self.rng.randrange(self.with_history)}"
+
+    def active_session(self) -> str:
+        index = self.rng.randrange(self.size)
+        return f"bench-{index - index % 10}"
+
+    def fresh_session(self) -> str:
+        return f"bench-{next(self._fresh)}"
+
+    def any_user(self) -> str:
+        return f"user-{self.rng.randrange(self.users)}"
+
+    def any_manual(self) -> str:
+        return f"bench-manual-{self.rng.randrange(MANUALS)}"
+
+    def new_session_id(self) -> str:
+        self._created += 1
+        return f"bench-new-{self._created}"
+
+
+DbBenchmark = Callable[[AsyncSession, Workload], Awaitable[object]]
+
+
+async def _create_session(db: AsyncSession, w: Workload):
+    return await SessionService(db).create_session(SessionCreate(
+        session_id=w.new_session_id(), user_id=w.any_user(), manual_id=w.any_manual(),
+    ))
+
+
+async def _update_progress(db: AsyncSession, w: Workload):
+    return await ProgressService(db).update_progress(w.fresh_session(), ProgressUpdate(
+        user_id="bench", current_step=1, step_status="DONE",
+    ))
+
+
+async def _add_message(db: AsyncSession, w: Workload):
+    return await MessageService(db).add_message(w.active_session(), MessageCreate(
+        user_id="bench", message="Benchmark message", sender="user",
+    ))
+
+
+DB_BENCHMARKS: dict[str, DbBenchmark] = {
+    "session.get": lambda db, w: SessionService(db).get_session(w.any_session()),
+    "session.list_user": lambda db, w: SessionService(db).list_sessions(user_id=w.any_user(), limit=20),
+    "session.list_first_page": lambda db, w: SessionService(db).list_sessions(limit=100),
+    "session.create": _create_session,
+    "progress.update": _update_progress,
+    "progress.next_step": lambda db, w: ProgressService(db).get_next_step(w.any_session()),
+    "message.add": _add_message,
+    "message.list": lambda db, w: MessageService(db).get_messages(w.session_with_history(), limit=100),
+    "manual.get_cached": lambda db, w: ManualService(db).get_cached_manual_by_id(w.any_manual()),
+    "manual.list": lambda db, w: ManualService(db).list_manuals(),
+    "analytics.overview": lambda db, w: AnalyticsService(db).get_overview_stats(),
+    "analytics.popular_manuals": lambda db, w: AnalyticsService(db).get_popular_manuals(),
+    "analytics.recent_activity": lambda db, w: AnalyticsService(db).get_recent_activity(hours=24),
+    "analytics.trends": lambda db, w: AnalyticsService(db).get_activity_trends(hours=24),
+    "analytics.user_stats": lambda db, w: AnalyticsService(db).get_user_stats(w.any_user()),
+    "analytics.step_analytics": lambda db, w: AnalyticsService(db).get_step_analytics(w.any_manual()),
+}
+
+# Calls per timed sample for the in-process benchmark, so timer overhead does not dominate
+RATE_LIMITER_BATCH = 1000
+
+
+def summarize(samples_us: list[float]) -> dict:
+    samples_us.sort()
+    return {
+        "median_us": round(samples_us[len(samples_us) // 2], 2),
+        "p95_us": round(samples_us[min(int(len(samples_us) * 0.95), len(samples_us) - 1)], 2),
+        "samples": len(samples_us),
+    }
+
+
+async def run_db_benchmark(
+    session_maker: async_sessionmaker, fn: DbBenchmark, workload: Workload, iterations: int, warmup: int
+) -> dict:
+    samples = []
+    for i in range(warmup + iterations):
+        async with session_maker() as db:
+            start = time.perf_counter()
+            await fn(db, workload)
+            elapsed = time.perf_counter() - start
+        if i >= warmup:
+            samples.append(elapsed * 1e6)
+    return summarize(samples)
+
+
+def run_rate_limiter_benchmark(size: int, iterations: int) -> dict:
+    """`is_allowed` plus `get_remaining` per request with `size` tracked clients."""
+    rng = random.Random(42)
+    limiter = InMemoryRateLimiter(10**9, 10**9, max_clients=size)
+    clients = [f"client-{i}" for i in range(size)]
+    for client_id in clients:
+        limiter.is_allowed(client_id)
+
+    samples = []
+    for _ in range(iterations):
+        batch = [rng.choice(clients) for _ in range(RATE_LIMITER_BATCH)]
+        start = time.perf_counter()
+        for client_id in batch:
+            limiter.is_allowed(client_id)
+            limiter.get_remaining(client_id)
+        samples.append((time.perf_counter() - start) / RATE_LIMITER_BATCH * 1e6)
+    return summarize(samples)
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print results against the baseline; return the regressed benchmark keys."""
+    regressions = []
+    print(f"\n{'benchmark':<40}{'median µs':>12}{'p95 µs':>12}{'baseline':>12}{'change':>9}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        line = f"{key:<40}{result['median_us']:>12,.1f}{result['p95_us']:>12,.1f}"
+        if base is None:
+            print(f"{line}{'-':>12}{'new':>9}")
+            continue
+        change = result["median_us"] / base["median_us"] - 1 if base["median_us"] else 0
+        regressed = change > threshold
+        if regressed:
+            regressions.append(key)
+        marker = "  REGRESSED" if regressed else ""
+        print(f"{line}{base['median_us']:>12,.1f}{change:>+9.0%}{marker}")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    # Services log every write at INFO
+    logging.getLogger("app").setLevel(logging.WARNING)
+    url = bench_database_url()
+    await prepare_database(url)
+    engine = create_async_engine(url, pool_size=5)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    selected = [name for name in DB_BENCHMARKS if not args.only or any(name.startswith(p) for p in args.only)]
+    run_rate_limiter = not args.only or any("rate_limiter".startswith(p) for p in args.only)
+
+    results: dict[str, dict] = {}
+    try:
+        for size in args.sizes:
+            label = size_label(size)
+            start = time.perf_counter()
+            await load_data(session_maker, size)
+            print(f"Loaded {label} rows per table in {time.perf_counter() - start:.1f}s")
+
+            workload = Workload(size)
+            for name in selected:
+                results[f"{name}@{label}"] = await run_db_benchmark(
+                    session_maker, DB_BENCHMARKS[name], workload, args.iterations, args.warmup
+                )
+            if run_rate_limiter:
+                results[f"rate_limiter.check@{label}"] = run_rate_limiter_benchmark(size, args.iterations)
+    finally:
+        await engine.dispose()
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {"results": {}}
+    regressions = compare(results, baseline["results"], args.threshold)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"results": results}, indent=2) + "\n")
+    if args.save_baseline:
+        baseline = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "machine": f"{platform.node()} {platform.machine()} Python {platform.python_version()}",
+            "iterations": args.iterations,
+            "results": {**baseline["results"], **results},
+        }
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline saved to {baseline_path}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service benchmark suite with baseline comparison")
+    parser.add_argument("--sizes", type=lambda v: [parse_size(s) for s in v.split(",")],
+                        default=[1_000, 100_000, 1_000_000], help="Rows per table, e.g. 1k,100k,1M")
+    parser.add_argument("--iterations", type=int, default=100, help="Timed calls per benchmark")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed calls before each benchmark")
+    parser.add_argument("--only", type=lambda v: v.split(","), help="Benchmark name prefixes, e.g. session.,analytics.")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results in the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed median slowdown (0.25 = 25%%)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Activity Rollup Backfill Script
+
+Rebuilds the minute and hour buckets in `activity_rollups` from the
+sessions, progress_events and conversation_messages tables. Use it after
+deploying the rollup table or to repair buckets after an outage.
+
+Run: python scripts/backfill_activity.py --hours 168
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database import async_session_maker, close_db  # noqa: E402
+from app.services.analytics_counters import analytics_counters  # noqa: E402
+
+
+async def main(hours: int):
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    async with async_session_maker() as db:
+        written = await analytics_counters.backfill_activity(db, since)
+    await close_db()
+    print(f"Backfilled {written} activity buckets covering the last {hours} hours")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=int, default=168, help="Hours of history to rebuild")
+    args = parser.parse_args()
+    asyncio.run(main(args.hours))
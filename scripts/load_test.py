@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Load Test Harness
+
+Replays the session lifecycle from `seed_demo_data.py` (create session,
+messages, progress, end) for many concurrent simulated users against a
+running server. Sessions arrive as a Poisson process at `--rate` per
+second for `--duration` seconds; each is a seed flow (full, partial,
+active, abandoned) or a reader polling an existing session, drawn from
+`--mix`. Latency is recorded per endpoint (method and route template)
+and written as a JSON report with throughput and p50/p95/p99.
+
+Start the stack with `docker-compose up` (which includes the mock webhook
+and disables rate limiting), or run the server locally with
+DISABLE_RATE_LIMIT=true, then:
+
+Run: python scripts/load_test.py --rate 100 --duration 60 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import seed_demo_data as flows  # noqa: E402
+
+DEFAULT_MIX = "full=0.3,partial=0.2,active=0.2,abandoned=0.1,reader=0.2"
+FLOWS = ("full", "partial", "active", "abandoned", "reader")
+
+# Path segments holding IDs, replaced so requests aggregate per route
+_PATH_TEMPLATES = (
+    (re.compile(r"/sessions/[^/]+"), "/sessions/{session_id}"),
+    (re.compile(r"/manuals/[^/]+"), "/manuals/{manual_id}"),
+)
+
+
+def endpoint_label(method: str, path: str, prefix: str) -> str:
+    """`METHOD /route/{template}` for a request path."""
+    if path.startswith(prefix):
+        path = path[len(prefix):]
+    for pattern, template in _PATH_TEMPLATES:
+        path = pattern.sub(template, path)
+    return f"{method} {path}"
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """Parse `flow=weight,...` into normalised weights."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in FLOWS:
+            raise argparse.ArgumentTypeError(f"Unknown flow '{name}', expected one of {', '.join(FLOWS)}")
+        mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("Mix weights must add up to more than 0")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(fraction * len(sorted_values) + 0.999999) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class EndpointStats:
+    """Latencies and outcomes of every request, grouped by endpoint."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, method: str, path: str, seconds: float, status: str) -> None:
+        label = endpoint_label(method, path, self.prefix)
+        self.latencies[label].append(seconds)
+        self.statuses[label][status] += 1
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label in sorted(self.latencies):
+            values = sorted(self.latencies[label])
+            statuses = self.statuses[label]
+            errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": errors,
+                "status_codes": dict(sorted(statuses.items())),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        return endpoints
+
+
+class TimingTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that times every request, including failed ones."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: EndpointStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+            # Include the body so latency covers the whole response
+            await response.aread()
+        except Exception as e:
+            self.stats.record(request.method, request.url.path, time.perf_counter() - start, type(e).__name__)
+            raise
+        self.stats.record(request.method, request.url.path, time.perf_counter() - start, str(response.status_code))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class LoadTest:
+    """Open-loop session arrivals with a bounded number in flight."""
+
+    def __init__(self, client: httpx.AsyncClient, manuals: list[dict], mix: dict[str, float], max_sessions: int):
+        self.client = client
+        self.manuals = manuals
+        self.flow_names = list(mix)
+        self.flow_weights = list(mix.values())
+        self.max_sessions = max_sessions
+        self.in_flight = 0
+        self.started: Counter = Counter()
+        self.completed: Counter = Counter()
+        self.failed: Counter = Counter()
+        self.skipped = 0
+        self.peak_in_flight = 0
+        # Sessions created so far, polled by readers
+        self.session_ids: list[str] = []
+        self._user_counter = 0
+
+    async def run_session(self, flow: str) -> None:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.started[flow] += 1
+        try:
+            if flow == "reader":
+                ok = await self.read_session()
+            else:
+                self._user_counter += 1
+                user_id = f"{random.choice(flows.USERS)}-{self._user_counter}"
+                session_id = await flows.simulate_session(self.client, random.choice(self.manuals), user_id, flow)
+                ok = session_id is not None
+                if ok:
+                    self.session_ids.append(session_id)
+            (self.completed if ok else self.failed)[flow] += 1
+        except Exception:
+            self.failed[flow] += 1
+        finally:
+            self.in_flight -= 1
+
+    async def read_session(self) -> bool:
+        """Poll a session the way the dashboard does."""
+        if not self.session_ids:
+            response = await self.client.get(f"{flows.API_BASE}/sessions", params={"limit": 20})
+            return response.status_code == 200
+        session_id = random.choice(self.session_ids)
+        session = await self.client.get(f"{flows.API_BASE}/sessions/{session_id}")
+        if session.status_code != 200:
+            return False
+        user_id = session.json()["user_id"]
+        await self.client.get(f"{flows.API_BASE}/sessions/{session_id}/next-step")
+        await self.client.get(f"{flows.API_BASE}/sessions/{session_id}/messages")
+        await self.client.get(f"{flows.API_BASE}/sessions", params={"user_id": user_id})
+        if random.random() < 0.1:
+            await self.client.get(f"{flows.API_BASE}/analytics/overview")
+        return True
+
+    async def run(self, rate: float, duration: float, drain_seconds: float) -> float:
+        """Start sessions for `duration` seconds, then wait for them; return elapsed seconds."""
+        tasks: set[asyncio.Task] = set()
+        start = time.perf_counter()
+        deadline = start + duration
+        next_arrival = start
+        while True:
+            next_arrival += random.expovariate(rate)
+            if next_arrival >= deadline:
+                break
+            await asyncio.sleep(max(next_arrival - time.perf_counter(), 0))
+            if self.in_flight >= self.max_sessions:
+                self.skipped += 1
+                continue
+            flow = random.choices(self.flow_names, self.flow_weights)[0]
+            task = asyncio.create_task(self.run_session(flow))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=drain_seconds)
+            for task in pending:
+                task.cancel()
+        return time.perf_counter() - start
+
+
+async def main(args: argparse.Namespace) -> Optional[dict]:
+    if args.seed is not None:
+        random.seed(args.seed)
+    base_url = args.base_url.rstrip("/")
+    flows.API_BASE = f"{base_url}/api/v1"
+    stats = EndpointStats(prefix="/api/v1")
+
+    transport = TimingTransport(
+        httpx.AsyncHTTPTransport(limits=httpx.Limits(
+            max_connections=args.connections,
+            max_keepalive_connections=args.connections,
+        )),
+        stats,
+    )
+    async with httpx.AsyncClient(transport=transport, timeout=args.timeout) as client:
+        try:
+            health = await client.get(f"{base_url}/health")
+            health.raise_for_status()
+        except Exception as e:
+            print(f"Cannot reach {base_url}/health: {e}")
+            return None
+
+        manuals = []
+        for manual_data in flows.SAMPLE_MANUALS:
+            manual = await flows.create_manual(client, manual_data)
+            if manual:
+                manuals.append(manual)
+        if not manuals:
+            print("No manuals available. Cannot proceed.")
+            return None
+
+        # Setup requests are not part of the measurement
+        stats.latencies.clear()
+        stats.statuses.clear()
+
+        print(
+            f"\nLoad test: {args.rate}/s arrivals for {args.duration}s, "
+            f"at most {args.max_sessions} sessions in flight, {args.connections} connections"
+        )
+        test = LoadTest(client, manuals, args.mix, args.max_sessions)
+        started_at = datetime.now(timezone.utc)
+        elapsed = await test.run(args.rate, args.duration, args.drain)
+
+    endpoints = stats.report(elapsed)
+    total_requests = sum(endpoint["requests"] for endpoint in endpoints.values())
+    all_latencies = sorted(value for values in stats.latencies.values() for value in values)
+    report = {
+        "started_at": started_at.isoformat(),
+        "config": {
+            "base_url": base_url,
+            "rate_per_second": args.rate,
+            "duration_seconds": args.duration,
+            "max_sessions": args.max_sessions,
+            "connections": args.connections,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "sessions": {
+            "started": sum(test.started.values()),
+            "completed": sum(test.completed.values()),
+            "failed": sum(test.failed.values()),
+            "skipped": test.skipped,
+            "peak_in_flight": test.peak_in_flight,
+            "by_flow": {
+                flow: {"started": test.started[flow], "completed": test.completed[flow], "failed": test.failed[flow]}
+                for flow in args.mix
+            },
+        },
+        "requests": {
+            "total": total_requests,
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+            "throughput_rps": round(total_requests / elapsed, 2),
+            "p50_ms": round(percentile(all_latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(all_latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(all_latencies, 0.99) * 1000, 2),
+        },
+        "endpoints": endpoints,
+    }
+    print_summary(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nReport written to {args.output}")
+    return report
+
+
+def print_summary(report: dict) -> None:
+    sessions = report["sessions"]
+    requests = report["requests"]
+    print(
+        f"\n{sessions['started']} sessions ({sessions['failed']} failed, {sessions['skipped']} skipped, "
+        f"peak {sessions['peak_in_flight']} in flight), {requests['total']} requests "
+        f"({requests['errors']} errors) in {report['elapsed_seconds']}s = {requests['throughput_rps']} req/s\n"
+    )
+    print(f"{'endpoint':<48}{'req':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for label, endpoint in report["endpoints"].items():
+        print(
+            f"{label:<48}{endpoint['requests']:>8}{endpoint['errors']:>6}{endpoint['throughput_rps']:>9}"
+            f"{endpoint['p50_ms']:>9}{endpoint['p95_ms']:>9}{endpoint['p99_ms']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test harness built on the seed data flows")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Server to test")
+    parser.add_argument("--rate", type=float, default=50, help="New sessions per second")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds during which sessions arrive")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Flow weights (default {DEFAULT_MIX})")
+    parser.add_argument("--max-sessions", type=int, default=5000, help="Sessions in flight before arrivals are skipped")
+    parser.add_argument("--connections", type=int, default=100, help="HTTP connection pool size")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--drain", type=float, default=120, help="Seconds to wait for sessions still running at the end")
+    parser.add_argument("--seed", type=int, help="Random seed for a reproducible arrival schedule and mix")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    asyncio.run(main(parser.parse_args()))
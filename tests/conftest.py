@@ -1,6 +1,7 @@
 """Test fixtures and configuration."""
 import asyncio
 import os
+from contextlib import contextmanager
 import pytest
 import pytest_asyncio
 from typing import AsyncGenerator
@@ -9,7 +10,13 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 
 from app.main import app
 from app.database import Base, get_db
-from app.api.deps import get_db as api_get_db
+from app.api.deps import get_db as api_get_db, get_read_db
+from app.services.manual_cache import manual_cache
+from app.services.analytics_counters import analytics_counters
+from app.services.recent_writes import recent_writes
+from app.services.idempotency import idempotency_store
+from app.middleware.rate_limiter import rate_limiter
+from app.utils.query_stats import track_queries
 
 # Use PostgreSQL for testing (same as the running container)
 # Falls back to container's default if not set
@@ -27,6 +34,65 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture(autouse=True)
+def clear_manual_cache():
+    """Drop cached manuals so rows deleted between tests are not served."""
+    manual_cache.clear()
+    yield
+    manual_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_analytics_counters():
+    """Drop pending analytics deltas recorded by other tests."""
+    analytics_counters.clear()
+    yield
+    analytics_counters.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_recent_writes():
+    """Forget writes recorded by other tests."""
+    recent_writes.clear()
+    yield
+    recent_writes.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limiter():
+    """Forget requests counted against the test client by other tests."""
+    rate_limiter.clear()
+    yield
+    rate_limiter.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_idempotency_store():
+    """Forget responses stored by other tests."""
+    idempotency_store.clear()
+    yield
+    idempotency_store.clear()
+
+
+@pytest.fixture
+def max_queries():
+    """
+    Assert a block executes at most `limit` SQL statements.
+
+    Usage: `with max_queries(3): await client.get(...)`. The failure message
+    lists the statements, so an N+1 regression shows the repeated query.
+    """
+    @contextmanager
+    def assert_max_queries(limit: int):
+        with track_queries(keep_statements=True) as stats:
+            yield stats
+        assert stats.count <= limit, (
+            f"Expected at most {limit} queries, got {stats.count}:\n" + "\n".join(stats.statements)
+        )
+
+    return assert_max_queries
+
+
 @pytest_asyncio.fixture(scope="function")
 async def test_engine():
     """Create a test database engine."""
@@ -72,6 +138,7 @@ async def client(test_session) -> AsyncGenerator[AsyncClient, None]:
         yield test_session
 
     app.dependency_overrides[api_get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
 
     async with AsyncClient(
         transport=ASGITransport(app=app),
@@ -0,0 +1,78 @@
+"""Tests for time-bucketed activity rollups."""
+from datetime import datetime, timezone, timedelta
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models import ActivityRollup
+from app.services.analytics_counters import analytics_counters
+
+
+async def create_activity(client: AsyncClient, sample_manual, sample_session, sample_message):
+    """Create a session with a message and one progress update."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    await client.post(f"/api/v1/sessions/{sample_session['session_id']}/messages", json=sample_message)
+    await client.post(f"/api/v1/sessions/{sample_session['session_id']}/progress", json={
+        "user_id": sample_session["user_id"],
+        "current_step": 1,
+        "step_status": "DONE",
+    })
+
+
+@pytest.mark.asyncio
+async def test_recent_activity_from_buckets(
+    client: AsyncClient, test_session, sample_manual, sample_session, sample_message
+):
+    """Test recent activity counts events before and after a flush."""
+    await create_activity(client, sample_manual, sample_session, sample_message)
+
+    expected = {
+        "time_period_hours": 1,
+        "new_sessions": 1,
+        "completed_sessions": 0,
+        "progress_updates": 1,
+        "messages": 1,
+    }
+    response = await client.get("/api/v1/analytics/recent-activity?hours=1")
+    assert response.json() == expected
+
+    await analytics_counters.flush(test_session)
+    rows = (await test_session.execute(select(ActivityRollup))).scalars().all()
+    assert {row.granularity for row in rows} == {"minute", "hour"}
+
+    response = await client.get("/api/v1/analytics/recent-activity?hours=1")
+    assert response.json() == expected
+
+
+@pytest.mark.asyncio
+async def test_trends_series(client: AsyncClient, sample_manual, sample_session, sample_message):
+    """Test trends return a continuous, zero-filled series per bucket."""
+    await create_activity(client, sample_manual, sample_session, sample_message)
+
+    response = await client.get("/api/v1/analytics/trends?hours=3&bucket=hour")
+    assert response.status_code == 200
+    series = response.json()["series"]
+    assert len(series) == 4
+    assert series[-1]["new_sessions"] == 1
+    assert sum(point["messages"] for point in series) == 1
+
+    response = await client.get("/api/v1/analytics/trends?hours=48&bucket=minute")
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_backfill_matches_live_counts(
+    client: AsyncClient, test_session, sample_manual, sample_session, sample_message
+):
+    """Test a backfill rebuilds the same buckets live recording produced."""
+    await create_activity(client, sample_manual, sample_session, sample_message)
+    live = (await client.get("/api/v1/analytics/recent-activity?hours=2")).json()
+
+    analytics_counters.clear()
+    written = await analytics_counters.backfill_activity(
+        test_session, datetime.now(timezone.utc) - timedelta(hours=2)
+    )
+    assert written >= 2
+
+    assert (await client.get("/api/v1/analytics/recent-activity?hours=2")).json() == live
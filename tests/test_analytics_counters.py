@@ -0,0 +1,82 @@
+"""Tests for the incremental analytics rollup."""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models import AnalyticsTotals
+from app.services.analytics_counters import analytics_counters
+
+
+async def complete_session(client: AsyncClient, session_id: str, total_steps: int = 3):
+    """Mark every step of a session as done."""
+    for step in range(1, total_steps + 1):
+        await client.post(f"/api/v1/sessions/{session_id}/progress", json={
+            "user_id": "test-user-001",
+            "current_step": step,
+            "step_status": "DONE",
+        })
+
+
+async def get_overview(client: AsyncClient) -> dict:
+    """Fetch the analytics overview."""
+    response = await client.get("/api/v1/analytics/overview")
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_overview_tracks_writes(client: AsyncClient, sample_manual, sample_session, sample_message):
+    """Test overview reflects writes before and after a flush."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    overview = await get_overview(client)
+    assert overview["sessions"]["total"] == 0
+    assert overview["manuals"]["total"] == 1
+
+    await client.post("/api/v1/sessions", json=sample_session)
+    await client.post("/api/v1/sessions", json={**sample_session, "session_id": "second"})
+    await client.post(f"/api/v1/sessions/{sample_session['session_id']}/messages", json=sample_message)
+    await complete_session(client, sample_session["session_id"])
+    await client.patch("/api/v1/sessions/second", json={"status": "abandoned"})
+
+    overview = await get_overview(client)
+    assert overview["sessions"] == {"total": 2, "active": 0, "completed": 1, "abandoned": 1}
+    assert overview["messages"]["total"] == 1
+    assert overview["metrics"]["completion_rate_percent"] == 50.0
+
+    await client.delete("/api/v1/sessions/second")
+    assert (await get_overview(client))["sessions"]["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_flush_applies_deltas(client: AsyncClient, test_session, sample_manual, sample_session):
+    """Test flushing moves pending deltas into the rollup row."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await analytics_counters.reconcile(test_session)
+
+    await client.post("/api/v1/sessions", json=sample_session)
+    assert await analytics_counters.flush(test_session) > 0
+    assert await analytics_counters.flush(test_session) == 0
+
+    row = (await test_session.execute(select(AnalyticsTotals))).scalar_one()
+    await test_session.refresh(row)
+    assert row.sessions_total == 1
+    assert row.sessions_active == 1
+    assert row.manuals_total == 1
+
+
+@pytest.mark.asyncio
+async def test_reconcile_corrects_drift(client: AsyncClient, test_session, sample_manual, sample_session):
+    """Test reconcile overwrites drifted counters from the source tables."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    await analytics_counters.reconcile(test_session)
+
+    # Simulate deltas lost or double counted
+    analytics_counters.add(sessions_total=5, messages_total=-3)
+    await analytics_counters.flush(test_session)
+    assert (await get_overview(client))["sessions"]["total"] == 6
+
+    totals = await analytics_counters.reconcile(test_session)
+    assert totals["sessions_total"] == 1
+    assert totals["messages_total"] == 0
+    assert (await get_overview(client))["sessions"]["total"] == 1
@@ -0,0 +1,164 @@
+"""Tests for response compression."""
+import gzip
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from httpx import AsyncClient, ASGITransport
+
+from app.middleware.compression import CompressionMiddleware, parse_accept_encoding
+
+LARGE = {"items": [{"step_number": i, "content": "Tighten the bolt."} for i in range(200)]}
+
+
+def make_app(**options) -> FastAPI:
+    """Create a small app behind the compression middleware."""
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return LARGE
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/tagged")
+    async def tagged():
+        return PlainTextResponse("x" * 2000, headers={"ETag": '"v1"'})
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(b"y" * 2000), media_type="text/plain",
+                        headers={"Content-Encoding": "gzip"})
+
+    @app.get("/binary")
+    async def binary():
+        return Response(b"\x00" * 2000, media_type="application/octet-stream")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(50):
+                yield f"line {i}: some transcript text\n".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware, **options)
+    return app
+
+
+@pytest_asyncio.fixture
+async def raw_client():
+    """Client that neither advertises nor decodes encodings by itself."""
+    transport = ASGITransport(app=make_app(minimum_size=500, encodings=("zstd", "br", "gzip")))
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def get_raw(client: AsyncClient, path: str, accept_encoding: str):
+    """GET returning (response, undecoded body)."""
+    async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        body = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response, body
+
+
+def test_parse_accept_encoding():
+    """Test q-values and wildcards are parsed."""
+    assert parse_accept_encoding("gzip, br;q=0.5, zstd;q=0, *;q=0.1") == {
+        "gzip": 1.0, "br": 0.5, "zstd": 0.0, "*": 0.1,
+    }
+    assert parse_accept_encoding("") == {}
+
+
+def test_select_encoding():
+    """Test negotiation honours q-values, then the configured preference."""
+    middleware = CompressionMiddleware(None, encodings=("gzip",))
+
+    assert middleware.select_encoding("gzip, deflate") == "gzip"
+    assert middleware.select_encoding("deflate, *;q=0.5") == "gzip"
+    assert middleware.select_encoding("gzip;q=0") is None
+    assert middleware.select_encoding("identity") is None
+    assert middleware.select_encoding("") is None
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped(raw_client):
+    """Test large bodies are compressed with a correct Content-Length."""
+    response, body = await get_raw(raw_client, "/large", "gzip, deflate")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) == len(body)
+    uncompressed = gzip.decompress(body)
+    assert len(body) < len(uncompressed)
+    assert uncompressed.startswith(b'{"items":[{"step_number":0')
+
+
+@pytest.mark.asyncio
+async def test_unavailable_encoding_falls_back(raw_client):
+    """Test encodings without an installed library are never chosen."""
+    response, body = await get_raw(raw_client, "/large", "zstd, br, gzip;q=0.1")
+
+    if response.headers["Content-Encoding"] == "gzip":
+        assert gzip.decompress(body).startswith(b'{"items"')
+    else:
+        assert response.headers["Content-Encoding"] in {"zstd", "br"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path,accept_encoding", [
+    ("/small", "gzip"),
+    ("/large", "identity"),
+    ("/large", "gzip;q=0"),
+    ("/binary", "gzip"),
+])
+async def test_uncompressed_responses(raw_client, path, accept_encoding):
+    """Test small, refused and non-text responses are sent as-is."""
+    response, body = await get_raw(raw_client, path, accept_encoding)
+
+    assert "Content-Encoding" not in response.headers
+    assert int(response.headers["Content-Length"]) == len(body)
+
+
+@pytest.mark.asyncio
+async def test_already_encoded_response_is_untouched(raw_client):
+    """Test bodies the app encoded itself are not compressed twice."""
+    response, body = await get_raw(raw_client, "/encoded", "gzip")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == b"y" * 2000
+
+
+@pytest.mark.asyncio
+async def test_compressed_etag_is_weak(raw_client):
+    """Test strong ETags are weakened when the body is re-encoded."""
+    response, _ = await get_raw(raw_client, "/tagged", "gzip")
+
+    assert response.headers["ETag"] == 'W/"v1"'
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_is_compressed(raw_client):
+    """Test streamed bodies are compressed chunk by chunk."""
+    response, body = await get_raw(raw_client, "/stream", "gzip")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    expected = "".join(f"line {i}: some transcript text\n" for i in range(50))
+    assert gzip.decompress(body).decode() == expected
+
+
+@pytest.mark.asyncio
+async def test_api_responses_are_compressed(client, sample_manual):
+    """Test the application negotiates compression for large payloads."""
+    sample_manual["steps"] = [
+        {"step_number": i, "title": f"Step {i}", "content": "Detailed instructions. " * 20}
+        for i in range(1, 11)
+    ]
+    await client.post("/api/v1/manuals", json=sample_manual)
+
+    response = await client.get("/api/v1/manuals", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json()["manuals"][0]["manual_id"] == sample_manual["manual_id"]
@@ -0,0 +1,86 @@
+"""Tests for connection pool statistics and server-side timeouts."""
+import asyncio
+import pytest
+from sqlalchemy import text
+
+from app.api import deps
+from app.database import PoolStats, get_pool_stats
+from app.services.analytics_service import AnalyticsService
+
+
+def test_pool_stats_record_checkouts():
+    """Test checkout waits are aggregated."""
+    stats = PoolStats()
+    stats.record_checkout(0.002)
+    stats.record_checkout(0.004)
+
+    assert stats.checkouts == 2
+    assert stats.wait_seconds_max == 0.004
+    assert stats.wait_seconds_total == pytest.approx(0.006)
+
+
+def test_get_pool_stats_reports_pool_configuration():
+    """Test the application pool reports its size and occupancy."""
+    stats = get_pool_stats()
+
+    assert stats["size"] == deps.settings.DATABASE_POOL_SIZE
+    assert stats["checked_out"] >= 0
+    assert stats["overflow"] >= 0
+    assert {"checkouts", "timeouts", "avg_wait_ms", "max_wait_ms"} <= stats.keys()
+
+
+@pytest.mark.asyncio
+async def test_analytics_statement_timeout_returns_503(client, monkeypatch):
+    """Test a slow analytics query is cancelled and reported as a 503."""
+    async def slow_overview(self):
+        await self.db.execute(text("SELECT pg_sleep(1)"))
+
+    monkeypatch.setattr(deps.settings, "ANALYTICS_STATEMENT_TIMEOUT_MS", 50)
+    monkeypatch.setattr(AnalyticsService, "get_overview_stats", slow_overview)
+
+    response = await client.get("/api/v1/analytics/overview")
+
+    assert response.status_code == 503
+    error = response.json()["error"]
+    assert error["code"] == "QUERY_TIMEOUT"
+    assert error["details"] == {"timeout_ms": 50}
+
+
+@pytest.mark.asyncio
+async def test_analytics_timeout_is_local_to_the_transaction(client, test_session):
+    """Test the analytics timeout does not outlive the request's transaction."""
+    before = (await test_session.execute(text("SHOW statement_timeout"))).scalar()
+    await test_session.commit()
+
+    response = await client.get("/api/v1/analytics/overview")
+    assert response.status_code == 200
+    await test_session.commit()
+
+    assert (await test_session.execute(text("SHOW statement_timeout"))).scalar() == before
+
+
+@pytest.mark.asyncio
+async def test_progress_lock_timeout_returns_conflict(
+    client, test_engine, test_session, sample_manual, sample_session, sample_progress
+):
+    """Test a progress update blocked past the lock timeout gets a retryable 409."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    session_id = sample_session["session_id"]
+
+    # Applies to the transaction the progress request runs in
+    await test_session.execute(text("SET LOCAL lock_timeout = '100ms'"))
+
+    async with test_engine.connect() as other:
+        await other.execute(
+            text("SELECT 1 FROM sessions WHERE session_id = :id FOR UPDATE"),
+            {"id": session_id},
+        )
+        response = await asyncio.wait_for(
+            client.post(f"/api/v1/sessions/{session_id}/progress", json=sample_progress),
+            timeout=5,
+        )
+        await other.rollback()
+
+    assert response.status_code == 409
+    assert "Concurrent update" in response.json()["detail"]
@@ -1,6 +1,10 @@
 """Tests for edge cases as specified in the assignment."""
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import delete
+
+from app.models import IdempotencyKey
+from app.services.idempotency import idempotency_store
 
 
 class TestInvalidStepNumbers:
@@ -64,7 +68,7 @@ class TestDuplicateUpdates:
 
     @pytest.mark.asyncio
     async def test_duplicate_with_idempotency_key(self, client: AsyncClient, sample_manual, sample_session):
-        """Test that duplicate updates with same idempotency key are rejected."""
+        """Test that duplicate updates with same idempotency key replay the original response."""
         await client.post("/api/v1/manuals", json=sample_manual)
         await client.post("/api/v1/sessions", json=sample_session)
 
@@ -92,6 +96,35 @@ class TestDuplicateUpdates:
                 "idempotency_key": idempotency_key
             }
         )
+        assert response2.status_code == 200
+        assert response2.headers["idempotency-replayed"] == "true"
+        assert response2.json() == response1.json()
+
+        # Not processed twice
+        session = await client.get(f"/api/v1/sessions/{sample_session['session_id']}")
+        assert session.json()["current_step"] == 2
+
+    @pytest.mark.asyncio
+    async def test_duplicate_without_stored_response(self, client: AsyncClient, test_session, sample_manual, sample_session):
+        """Test that a duplicate whose stored response has expired is rejected."""
+        await client.post("/api/v1/manuals", json=sample_manual)
+        await client.post("/api/v1/sessions", json=sample_session)
+        update = {
+            "user_id": "test-user-001",
+            "current_step": 1,
+            "step_status": "DONE",
+            "idempotency_key": "unique-key-123"
+        }
+
+        response1 = await client.post(f"/api/v1/sessions/{sample_session['session_id']}/progress", json=update)
+        assert response1.status_code == 200
+
+        # Expired and pruned
+        await test_session.execute(delete(IdempotencyKey))
+        await test_session.commit()
+        idempotency_store.clear()
+
+        response2 = await client.post(f"/api/v1/sessions/{sample_session['session_id']}/progress", json=update)
         assert response2.status_code == 409
         assert "already_processed" in response2.json()["detail"]["status"]
 
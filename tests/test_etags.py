@@ -0,0 +1,142 @@
+"""Tests for ETags and conditional GET requests."""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.manual_cache import manual_cache
+from app.services.session_service import SessionService
+from app.utils.etags import etag_matches
+
+
+def test_etag_matches():
+    """Test If-None-Match uses weak comparison and accepts lists and *."""
+    assert etag_matches('"abc-1"', '"abc-1"')
+    assert etag_matches('W/"abc-1"', '"abc-1"')
+    assert etag_matches('"other", "abc-1"', '"abc-1"')
+    assert etag_matches("*", '"abc-1"')
+    assert not etag_matches('"abc-2"', '"abc-1"')
+    assert not etag_matches(None, '"abc-1"')
+
+
+async def create_session(client, sample_manual, sample_session) -> str:
+    """Create the sample manual and session; return the session ID."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    return sample_session["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_session_not_modified(client, sample_manual, sample_session):
+    """Test polling a session with its ETag returns an empty 304."""
+    session_id = await create_session(client, sample_manual, sample_session)
+
+    response = await client.get(f"/api/v1/sessions/{session_id}")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+
+    response = await client.get(f"/api/v1/sessions/{session_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+@pytest.mark.asyncio
+async def test_session_etag_changes_on_every_mutation(
+    client, sample_manual, sample_session, sample_message, sample_progress
+):
+    """Test messages, progress and status updates each change the ETag."""
+    session_id = await create_session(client, sample_manual, sample_session)
+    url = f"/api/v1/sessions/{session_id}"
+    etags = [(await client.get(url)).headers["ETag"]]
+
+    await client.post(f"{url}/messages", json=sample_message)
+    etags.append((await client.get(url)).headers["ETag"])
+
+    sample_progress["step_status"] = "ONGOING"
+    await client.post(f"{url}/progress", json=sample_progress)
+    etags.append((await client.get(url)).headers["ETag"])
+
+    sample_progress["step_status"] = "DONE"
+    await client.post(f"{url}/progress", json=sample_progress)
+    etags.append((await client.get(url)).headers["ETag"])
+
+    await client.patch(url, json={"status": "abandoned"})
+    etags.append((await client.get(url)).headers["ETag"])
+
+    assert len(set(etags)) == len(etags)
+
+    response = await client.get(url, headers={"If-None-Match": etags[0]})
+    assert response.status_code == 200
+    assert response.json()["status"] == "abandoned"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_get_distinct_versions(client, test_engine, sample_manual, sample_session):
+    """Test two writes that read the same version still bump it twice."""
+    session_id = await create_session(client, sample_manual, sample_session)
+    etag = (await client.get(f"/api/v1/sessions/{session_id}")).headers["ETag"]
+
+    session_maker = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as first_db, session_maker() as second_db:
+        first = await SessionService(first_db).get_session(session_id)
+        second = await SessionService(second_db).get_session(session_id)
+        SessionService(first_db).update_activity(first)
+        SessionService(second_db).update_activity(second)
+        await first_db.commit()
+        await second_db.commit()
+
+    response = await client.get(f"/api/v1/sessions/{session_id}")
+    assert response.headers["ETag"] == etag.replace("-1\"", "-3\"")
+
+
+@pytest.mark.asyncio
+async def test_next_step_not_modified(client, sample_manual, sample_session, sample_progress):
+    """Test the next-step poll is revalidated until progress is made."""
+    session_id = await create_session(client, sample_manual, sample_session)
+    url = f"/api/v1/sessions/{session_id}/next-step"
+
+    response = await client.get(url)
+    etag = response.headers["ETag"]
+    assert response.json()["next_step"]["step_number"] == 1
+
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    await client.post(f"/api/v1/sessions/{session_id}/progress", json=sample_progress)
+    response = await client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["next_step"]["step_number"] == 2
+
+
+@pytest.mark.asyncio
+async def test_manual_served_from_cache_with_etag(client, sample_manual):
+    """Test manual polls are answered from the cache, with 304 on a match."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    url = f"/api/v1/manuals/{sample_manual['manual_id']}"
+
+    response = await client.get(url)
+    etag = response.headers["ETag"]
+    assert response.json()["total_steps"] == 3
+
+    hits = manual_cache.hits
+    response = await client.get(url, headers={"If-None-Match": f'W/{etag}'})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert manual_cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_recreated_manual_gets_new_etag(client, sample_manual):
+    """Test deleting and recreating a manual invalidates its ETag."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    url = f"/api/v1/manuals/{sample_manual['manual_id']}"
+    etag = (await client.get(url)).headers["ETag"]
+
+    await client.delete(url)
+    await client.post("/api/v1/manuals", json=sample_manual)
+    response = await client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
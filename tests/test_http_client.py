@@ -0,0 +1,51 @@
+"""Tests for the shared webhook HTTP client."""
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import pytest
+
+from app.services.http_client import WebhookHTTPClient
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Minimal HTTP/1.1 handler that keeps connections open."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def webhook_server():
+    """Run a local webhook receiver for the duration of a test."""
+    server = HTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/webhook"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(webhook_server):
+    """Test consecutive webhooks share one pooled connection."""
+    client = WebhookHTTPClient()
+    await client.start()
+    try:
+        for i in range(5):
+            response = await client.post(webhook_server, {"event": i})
+            assert response.status_code == 200
+    finally:
+        await client.close()
+
+    stats = client.get_stats()
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connections_reused"] == 4
@@ -0,0 +1,188 @@
+"""Tests for idempotency keys and stored response replay."""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import IdempotencyKey
+from app.schemas.message import MessageResponse
+from app.schemas.session import SessionCreate
+from app.services.idempotency import IdempotencyStore, idempotency_store, MESSAGE_SCOPE
+from app.services.session_service import SessionService
+from app.utils.exceptions import SessionAlreadyExistsError
+
+
+@pytest.mark.asyncio
+async def test_message_retry_replays_response(client: AsyncClient, sample_manual, sample_session, sample_message):
+    """Test a retried message is answered with the original response and stored once."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    url = f"/api/v1/sessions/{sample_session['session_id']}/messages"
+    headers = {"Idempotency-Key": "message-key-1"}
+
+    response1 = await client.post(url, json=sample_message, headers=headers)
+    assert response1.status_code == 201
+    assert "idempotency-replayed" not in response1.headers
+
+    response2 = await client.post(url, json=sample_message, headers=headers)
+    assert response2.status_code == 201
+    assert response2.headers["idempotency-replayed"] == "true"
+    assert response2.json() == response1.json()
+
+    # Another worker, or this one after an eviction, replays from the table
+    idempotency_store.clear()
+    response3 = await client.post(url, json=sample_message, headers=headers)
+    assert response3.status_code == 201
+    assert response3.headers["idempotency-replayed"] == "true"
+    assert response3.json() == response1.json()
+
+    history = await client.get(url)
+    assert history.json()["total"] == 1
+
+    # A new key adds a new message
+    response4 = await client.post(url, json=sample_message, headers={"Idempotency-Key": "message-key-2"})
+    assert response4.status_code == 201
+    assert response4.json()["id"] != response1.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_session_retry_replays_response(client: AsyncClient, sample_manual, sample_session):
+    """Test a retried session creation is answered with the original response instead of a 409."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    headers = {"Idempotency-Key": "session-key-1"}
+
+    response1 = await client.post("/api/v1/sessions", json=sample_session, headers=headers)
+    assert response1.status_code == 201
+
+    response2 = await client.post("/api/v1/sessions", json=sample_session, headers=headers)
+    assert response2.status_code == 201
+    assert response2.headers["idempotency-replayed"] == "true"
+    assert response2.json() == response1.json()
+
+    idempotency_store.clear()
+    response3 = await client.post("/api/v1/sessions", json=sample_session, headers=headers)
+    assert response3.status_code == 201
+    assert response3.json() == response1.json()
+
+    # The stored response matches the session as read back
+    session = await client.get(f"/api/v1/sessions/{sample_session['session_id']}")
+    stored, current = response1.json(), session.json()
+    stored.pop("duration_seconds")
+    current.pop("duration_seconds")
+    assert stored == current
+
+    # Without the key the session still conflicts
+    response4 = await client.post("/api/v1/sessions", json=sample_session)
+    assert response4.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_session_id_collision_with_other_key(client: AsyncClient, test_engine, sample_manual, sample_session):
+    """Test a session_id taken by a concurrent request with another key is a conflict, not a duplicate key."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    session_data = SessionCreate(**sample_session)
+    session_maker = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_maker() as first_db, session_maker() as second_db:
+        first = SessionService(first_db)
+        get_manual_by_id = first.manual_service.get_manual_by_id
+
+        async def create_concurrently(manual_id):
+            # The other request commits after this one checked the session_id
+            await SessionService(second_db).create_session(session_data, idempotency_key="key-b")
+            return await get_manual_by_id(manual_id)
+
+        first.manual_service.get_manual_by_id = create_concurrently
+        with pytest.raises(SessionAlreadyExistsError):
+            await first.create_session(session_data, idempotency_key="key-a")
+
+        keys = await second_db.execute(select(IdempotencyKey.key))
+        assert keys.scalars().all() == ["key-b"]
+
+
+@pytest.mark.asyncio
+async def test_progress_retry_after_completion(client: AsyncClient, sample_manual, sample_session):
+    """Test retrying the update that completed a session replays it rather than reporting the session ended."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    url = f"/api/v1/sessions/{sample_session['session_id']}/progress"
+    for step in (1, 2):
+        await client.post(url, json={"user_id": "test-user-001", "current_step": step, "step_status": "DONE"})
+    update = {"user_id": "test-user-001", "current_step": 3, "step_status": "DONE", "idempotency_key": "last"}
+
+    response1 = await client.post(url, json=update)
+    assert response1.json()["status"] == "completed"
+
+    idempotency_store.clear()
+    response2 = await client.post(url, json=update)
+    assert response2.status_code == 200
+    assert response2.json() == response1.json()
+
+
+@pytest.mark.asyncio
+async def test_keys_are_scoped_per_session(client: AsyncClient, sample_manual, sample_session, sample_message):
+    """Test the same key sent to two sessions is processed for each."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    other_session = {**sample_session, "session_id": "test-session-002"}
+    headers = {"Idempotency-Key": "shared-key"}
+
+    for session in (sample_session, other_session):
+        await client.post("/api/v1/sessions", json=session)
+        response = await client.post(
+            f"/api/v1/sessions/{session['session_id']}/messages", json=sample_message, headers=headers
+        )
+        assert response.status_code == 201
+        assert "idempotency-replayed" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_store_expiry_and_prune(test_session, sample_message):
+    """Test responses expire after the TTL, in memory and in the table, and are pruned."""
+    now = [1_700_000_000.0]
+    store = IdempotencyStore(ttl_seconds=60, max_entries=2, clock=lambda: now[0])
+    response = MessageResponse(
+        id="00000000-0000-0000-0000-000000000001",
+        session_id="session-1",
+        message=sample_message["message"],
+        sender=sample_message["sender"],
+        step_at_time=1,
+        created_at="2024-01-01T00:00:00Z",
+    )
+
+    pending = store.stage(test_session, MESSAGE_SCOPE, "session-1", "key-1", 201, response)
+    await store.commit(test_session, pending)
+    stored = store.lookup(MESSAGE_SCOPE, "session-1", "key-1")
+    assert stored.status_code == 201
+    assert stored.body == pending.stored.body
+
+    now[0] += 61
+    assert store.lookup(MESSAGE_SCOPE, "session-1", "key-1") is None
+    assert await store.fetch(test_session, MESSAGE_SCOPE, "session-1", "key-1") is None
+
+    assert await store.prune(test_session) == 1
+    count = await test_session.execute(select(func.count()).select_from(IdempotencyKey))
+    assert count.scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_store_is_bounded(test_session, sample_message):
+    """Test the least recently used responses are evicted from memory but still found in the table."""
+    store = IdempotencyStore(ttl_seconds=60, max_entries=2)
+    response = MessageResponse(
+        id="00000000-0000-0000-0000-000000000001",
+        session_id="session-1",
+        message=sample_message["message"],
+        sender=sample_message["sender"],
+        step_at_time=1,
+        created_at="2024-01-01T00:00:00Z",
+    )
+
+    for key in ("key-1", "key-2", "key-3"):
+        pending = store.stage(test_session, MESSAGE_SCOPE, "session-1", key, 201, response)
+        await store.commit(test_session, pending)
+
+    assert store.get_stats()["size"] == 2
+    assert store.lookup(MESSAGE_SCOPE, "session-1", "key-1") is None
+    assert store.lookup(MESSAGE_SCOPE, "session-1", "key-3") is not None
+    assert await store.fetch(test_session, MESSAGE_SCOPE, "session-1", "key-1") is not None
+    assert store.get_stats()["db_hits"] == 1
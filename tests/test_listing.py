@@ -0,0 +1,121 @@
+"""Tests for listing totals and pagination."""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+
+from app.models import Session
+from app.utils import queries
+from app.utils.queries import count_all_rows
+
+
+async def create_sessions(client: AsyncClient, sample_manual, count: int, user_id: str = "test-user-001"):
+    """Create a manual and a number of sessions for it."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    for i in range(count):
+        response = await client.post("/api/v1/sessions", json={
+            "session_id": f"{user_id}-session-{i:03d}",
+            "user_id": user_id,
+            "manual_id": sample_manual["manual_id"],
+        })
+        assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_list_sessions_total_is_independent_of_page(client: AsyncClient, sample_manual):
+    """Test the total counts all matching rows, not just the page."""
+    await create_sessions(client, sample_manual, 5)
+    await create_sessions(client, sample_manual, 2, user_id="other-user")
+
+    response = await client.get("/api/v1/sessions?limit=2")
+    data = response.json()
+    assert data["total"] == 7
+    assert len(data["sessions"]) == 2
+
+    response = await client.get("/api/v1/sessions?user_id=other-user&limit=1")
+    assert response.json()["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_message_total(client: AsyncClient, sample_manual, sample_session, sample_message):
+    """Test the message total counts the whole transcript."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    for _ in range(4):
+        await client.post(
+            f"/api/v1/sessions/{sample_session['session_id']}/messages",
+            json=sample_message
+        )
+
+    response = await client.get(
+        f"/api/v1/sessions/{sample_session['session_id']}/messages?limit=1"
+    )
+    data = response.json()
+    assert data["total"] == 4
+    assert len(data["messages"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_estimated_count(client: AsyncClient, test_session, sample_manual, monkeypatch):
+    """Test unfiltered totals use planner statistics when enabled."""
+    await create_sessions(client, sample_manual, 3)
+    await test_session.commit()
+    await test_session.execute(text("ANALYZE sessions"))
+
+    monkeypatch.setattr(queries.settings, "ESTIMATED_COUNTS_ENABLED", True)
+    monkeypatch.setattr(queries.settings, "ESTIMATED_COUNT_THRESHOLD", 0)
+    assert await count_all_rows(test_session, Session) == 3
+
+    # Below the threshold the exact count is used
+    monkeypatch.setattr(queries.settings, "ESTIMATED_COUNT_THRESHOLD", 1000)
+    assert await count_all_rows(test_session, Session) == 3
+
+
+@pytest.mark.asyncio
+async def test_session_cursor_pagination(client: AsyncClient, sample_manual):
+    """Test following next_cursor visits every session exactly once."""
+    await create_sessions(client, sample_manual, 7)
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/v1/sessions?limit=3"
+        if cursor:
+            url += f"&cursor={cursor}"
+        data = (await client.get(url)).json()
+        seen.extend(s["session_id"] for s in data["sessions"])
+        cursor = data["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+    # Newest first
+    assert seen == sorted(seen, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_message_cursor_pagination(client: AsyncClient, sample_manual, sample_session):
+    """Test transcripts page in chronological order via cursors."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    for i in range(5):
+        await client.post(
+            f"/api/v1/sessions/{sample_session['session_id']}/messages",
+            json={"user_id": "test-user-001", "message": f"message {i}", "sender": "user"}
+        )
+
+    url = f"/api/v1/sessions/{sample_session['session_id']}/messages?limit=2"
+    first = (await client.get(url)).json()
+    second = (await client.get(f"{url}&cursor={first['next_cursor']}")).json()
+    third = (await client.get(f"{url}&cursor={second['next_cursor']}")).json()
+
+    texts = [m["message"] for page in (first, second, third) for m in page["messages"]]
+    assert texts == [f"message {i}" for i in range(5)]
+    assert third["next_cursor"] is None
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor(client: AsyncClient):
+    """Test a malformed cursor is rejected."""
+    response = await client.get("/api/v1/sessions?cursor=not-a-cursor")
+    assert response.status_code == 400
@@ -0,0 +1,117 @@
+"""Tests for the in-process manual cache."""
+import uuid
+from datetime import datetime, timezone
+import pytest
+from httpx import AsyncClient
+
+from app.services.manual_cache import CachedManual, CachedStep, ManualCache, manual_cache
+
+CREATED_AT = datetime(2024, 1, 15, 10, 0, tzinfo=timezone.utc)
+
+
+def make_manual(manual_id: str = "manual-a", total_steps: int = 3) -> CachedManual:
+    """Build a manual snapshot for testing."""
+    steps = tuple(
+        CachedStep(
+            id=uuid.uuid4(),
+            step_number=n,
+            title=f"Step {n}",
+            content=f"Content for step {n}",
+            created_at=CREATED_AT,
+        )
+        for n in range(1, total_steps + 1)
+    )
+    return CachedManual(
+        id=uuid.uuid4(),
+        manual_id=manual_id,
+        title="Cached Manual",
+        total_steps=total_steps,
+        created_at=CREATED_AT,
+        updated_at=CREATED_AT,
+        steps=steps,
+    )
+
+
+class TestManualCache:
+    """Unit tests for ManualCache."""
+
+    def test_lookup_by_uuid_and_manual_id(self):
+        """Test a stored manual is reachable through both keys."""
+        cache = ManualCache(max_size=4)
+        manual = make_manual()
+        assert cache.put(manual, cache.version)
+
+        assert cache.get(manual.id) is manual
+        assert cache.get_by_manual_id("manual-a") is manual
+
+    def test_step_lookup(self):
+        """Test steps are indexed by step number."""
+        manual = make_manual(total_steps=3)
+        assert manual.get_step(1).title == "Step 1"
+        assert manual.get_step(3).title == "Step 3"
+        assert manual.get_step(0) is None
+        assert manual.get_step(4) is None
+
+    def test_stale_load_is_rejected(self):
+        """Test a load that raced with an invalidation is not stored."""
+        cache = ManualCache(max_size=4)
+        manual = make_manual()
+        version = cache.version
+
+        cache.invalidate(manual_id="manual-a")
+
+        assert not cache.put(manual, version)
+        assert cache.get(manual.id) is None
+
+    def test_lru_eviction(self):
+        """Test the least recently used manual is evicted when full."""
+        cache = ManualCache(max_size=2)
+        first, second, third = make_manual("a"), make_manual("b"), make_manual("c")
+        cache.put(first, cache.version)
+        cache.put(second, cache.version)
+        cache.get(first.id)
+        cache.put(third, cache.version)
+
+        assert cache.get(first.id) is first
+        assert cache.get(second.id) is None
+        assert cache.get_by_manual_id("b") is None
+
+    def test_expired_entry_is_dropped(self):
+        """Test entries are not served after the TTL."""
+        cache = ManualCache(max_size=2, ttl_seconds=-1)
+        manual = make_manual()
+        cache.put(manual, cache.version)
+        assert cache.get(manual.id) is None
+
+
+@pytest.mark.asyncio
+async def test_progress_populates_cache(client: AsyncClient, sample_manual, sample_session, sample_progress):
+    """Test the progress path caches the manual and serves steps from it."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+
+    response = await client.post(
+        f"/api/v1/sessions/{sample_session['session_id']}/progress",
+        json=sample_progress
+    )
+    assert response.status_code == 200
+    assert response.json()["next_step"]["title"] == "Step 2"
+
+    cached = manual_cache.get_by_manual_id(sample_manual["manual_id"])
+    assert cached is not None
+    assert cached.total_steps == 3
+
+
+@pytest.mark.asyncio
+async def test_delete_manual_invalidates_cache(client: AsyncClient, sample_manual, sample_session):
+    """Test deleting a manual removes it from the cache."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    await client.get(f"/api/v1/sessions/{sample_session['session_id']}/next-step")
+    assert manual_cache.get_by_manual_id(sample_manual["manual_id"]) is not None
+
+    await client.delete(f"/api/v1/sessions/{sample_session['session_id']}")
+    response = await client.delete(f"/api/v1/manuals/{sample_manual['manual_id']}")
+    assert response.status_code == 204
+
+    assert manual_cache.get_by_manual_id(sample_manual["manual_id"]) is None
@@ -0,0 +1,87 @@
+"""Tests for the metrics registry, middleware and endpoint."""
+import httpx
+import pytest
+
+from app.services.http_client import webhook_http_client
+from app.services.metrics import Counter, Histogram, MetricsRegistry, http_request_duration, webhook_send_duration
+from app.services.webhook_retry_service import WebhookRetryService
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test observations land in the first bucket at or above them and render cumulatively."""
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    counter = registry.register(Counter("events_total", "Events."))
+    histogram.observe(0.1, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(3, "/a")
+    counter.inc(amount=2)
+
+    assert registry.render() == (
+        "# HELP latency_seconds Latency.\n"
+        "# TYPE latency_seconds histogram\n"
+        'latency_seconds_bucket{route="/a",le="0.1"} 1\n'
+        'latency_seconds_bucket{route="/a",le="1.0"} 2\n'
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3\n'
+        'latency_seconds_sum{route="/a"} 3.6\n'
+        'latency_seconds_count{route="/a"} 3\n'
+        "# HELP events_total Events.\n"
+        "# TYPE events_total counter\n"
+        "events_total 2\n"
+    )
+
+    with pytest.raises(ValueError):
+        registry.register(Counter("events_total", "Again."))
+
+
+@pytest.mark.asyncio
+async def test_requests_labelled_by_route_template(client, sample_manual):
+    """Test request latency is recorded per route template rather than per URL."""
+    route = "/api/v1/sessions/{session_id}"
+    before = http_request_duration.get_count("GET", route, "404")
+
+    await client.get("/api/v1/sessions/missing-1")
+    await client.get("/api/v1/sessions/missing-2")
+    unmatched = http_request_duration.get_count("GET", "unmatched", "404")
+    await client.get("/no/such/path")
+
+    assert http_request_duration.get_count("GET", route, "404") == before + 2
+    assert http_request_duration.get_count("GET", "unmatched", "404") == unmatched + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client, sample_manual):
+    """Test /metrics exposes request, pool and webhook queue metrics."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/manuals",status="201"}' in body
+    assert "http_requests_in_flight 1" in body  # the scrape itself
+    assert 'db_pool_size{pool="primary"}' in body
+    assert "\nwebhook_queue_pending 0\n" in body
+
+
+@pytest.mark.asyncio
+async def test_webhook_send_outcomes(monkeypatch):
+    """Test webhook deliveries are timed per outcome."""
+    async def timeout(url, payload):
+        raise httpx.ReadTimeout("timed out")
+
+    async def not_found(url, payload):
+        return httpx.Response(404, request=httpx.Request("POST", url))
+
+    service = WebhookRetryService()
+    timeouts = webhook_send_duration.get_count("timeout")
+    http_errors = webhook_send_duration.get_count("http_error")
+
+    monkeypatch.setattr(webhook_http_client, "post", timeout)
+    assert await service._send_webhook({}) == (False, "Timeout")
+    monkeypatch.setattr(webhook_http_client, "post", not_found)
+    assert await service._send_webhook({}) == (False, "HTTP 404")
+
+    assert webhook_send_duration.get_count("timeout") == timeouts + 1
+    assert webhook_send_duration.get_count("http_error") == http_errors + 1
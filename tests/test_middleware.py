@@ -0,0 +1,146 @@
+"""Tests for the request ID and rate limiting middleware."""
+import sys
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient, ASGITransport
+
+from app.middleware.rate_limiter import InMemoryRateLimiter, RateLimitMiddleware
+from app.middleware.request_id import RequestIDMiddleware
+from app.services.metrics import rate_limit_rejections
+
+# The package re-exports the `rate_limiter` instance under the module's name
+rate_limiter_module = sys.modules["app.middleware.rate_limiter"]
+
+
+def make_app() -> FastAPI:
+    """Create a small app wrapped in the middleware stack used by the service."""
+    app = FastAPI()
+
+    @app.get("/echo")
+    async def echo(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk-{i};".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(RateLimitMiddleware)
+    app.add_middleware(RequestIDMiddleware)
+    return app
+
+
+@pytest.fixture
+def limiter(monkeypatch) -> InMemoryRateLimiter:
+    """Enable rate limiting with a limit of two requests per minute."""
+    limiter = InMemoryRateLimiter(requests_per_minute=2, requests_per_hour=100)
+    monkeypatch.setattr(rate_limiter_module, "RATE_LIMIT_DISABLED", False)
+    monkeypatch.setattr(rate_limiter_module, "rate_limiter", limiter)
+    return limiter
+
+
+@pytest_asyncio.fixture
+async def middleware_client():
+    """Client for the middleware test app."""
+    transport = ASGITransport(app=make_app())
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_echoed(middleware_client):
+    """Test a caller-supplied request ID reaches the route and the response."""
+    response = await middleware_client.get("/echo", headers={"X-Request-ID": "req-123"})
+
+    assert response.status_code == 200
+    assert response.headers["X-Request-ID"] == "req-123"
+    assert response.json() == {"request_id": "req-123"}
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_generated(middleware_client):
+    """Test a request ID is generated when the caller sends none."""
+    response = await middleware_client.get("/echo")
+
+    request_id = response.headers["X-Request-ID"]
+    assert len(request_id) == 36
+    assert response.json() == {"request_id": request_id}
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_headers(limiter, middleware_client):
+    """Test allowed responses carry the remaining limits."""
+    response = await middleware_client.get("/echo")
+
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Limit-Minute"] == "2"
+    assert response.headers["X-RateLimit-Remaining-Minute"] == "1"
+    assert response.headers["X-RateLimit-Limit-Hour"] == "100"
+    assert response.headers["X-RateLimit-Remaining-Hour"] == "99"
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_exceeded_returns_429(limiter, middleware_client):
+    """Test requests over the limit get a 429 with a retry hint."""
+    for _ in range(2):
+        assert (await middleware_client.get("/echo")).status_code == 200
+    rejections = rate_limit_rejections.get()
+
+    response = await middleware_client.get("/echo", headers={"X-Request-ID": "req-429"})
+
+    assert response.status_code == 429
+    assert rate_limit_rejections.get() == rejections + 1
+    retry_after = int(response.headers["Retry-After"])
+    assert retry_after > 0
+    assert response.headers["X-Request-ID"] == "req-429"
+    assert response.json() == {
+        "detail": {
+            "error": "rate_limit_exceeded",
+            "message": "Too many requests. Please slow down.",
+            "retry_after_seconds": retry_after,
+        }
+    }
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_uses_forwarded_client(limiter, middleware_client):
+    """Test proxied clients are limited by their forwarded address."""
+    for _ in range(2):
+        await middleware_client.get("/echo", headers={"X-Forwarded-For": "10.0.0.1, 10.0.0.2"})
+
+    blocked = await middleware_client.get("/echo", headers={"X-Forwarded-For": "10.0.0.1"})
+    other = await middleware_client.get("/echo", headers={"X-Forwarded-For": "10.0.0.2"})
+
+    assert blocked.status_code == 429
+    assert other.status_code == 200
+    assert set(limiter.clients) == {"10.0.0.1", "10.0.0.2"}
+
+
+@pytest.mark.asyncio
+async def test_excluded_paths_are_not_limited(limiter, middleware_client):
+    """Test excluded paths neither count against nor report limits."""
+    for _ in range(5):
+        response = await middleware_client.get("/health")
+        assert response.status_code == 200
+        assert "X-RateLimit-Limit-Minute" not in response.headers
+
+    assert limiter.clients == {}
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_passes_through(limiter, middleware_client):
+    """Test streamed bodies arrive intact with middleware headers."""
+    response = await middleware_client.get("/stream", headers={"X-Request-ID": "req-stream"})
+
+    assert response.status_code == 200
+    assert response.text == "chunk-0;chunk-1;chunk-2;"
+    assert response.headers["X-Request-ID"] == "req-stream"
+    assert response.headers["X-RateLimit-Remaining-Minute"] == "1"
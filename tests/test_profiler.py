@@ -0,0 +1,146 @@
+"""Tests for the sampling profiler and its admin endpoints."""
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.api import deps
+from app.services.profiler import SamplingProfiler, profiler
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-admin-token"}
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    """Enable the admin endpoints."""
+    monkeypatch.setattr(deps.settings, "ADMIN_TOKEN", ADMIN_HEADERS["X-Admin-Token"])
+    yield
+    profiler.stop()
+
+
+def handle_request(sampler: SamplingProfiler) -> None:
+    """Stand-in for an endpoint: samples the caller's stack from another thread."""
+    thread = threading.Thread(target=sampler._sample)
+    thread.start()
+    thread.join()
+
+
+def test_samples_are_attributed_to_the_registered_request():
+    """Test only frames below the request's frame are recorded, under its route."""
+    sampler = SamplingProfiler()
+    sampler._loop_thread_id = threading.get_ident()
+    scope = {"method": "POST", "route": SimpleNamespace(path="/api/v1/sessions/{session_id}/progress")}
+
+    frame = sys._getframe()
+    sampler.enter(frame, scope)
+    handle_request(sampler)
+    handle_request(sampler)
+    sampler.exit(frame)
+    handle_request(sampler)
+
+    stack, count = sampler.collapsed().strip().rsplit(" ", 1)
+    frames = stack.split(";")
+    assert frames[0] == "POST /api/v1/sessions/{session_id}/progress"
+    assert frames[1].startswith("handle_request (tests/test_profiler.py:")
+    assert count == "2"
+    assert sampler.samples == 2
+    assert sampler.idle_samples == 1
+    assert sampler.collapsed(route="/api/v1/manuals") == ""
+
+
+def test_route_filter_and_sample_rate():
+    """Test samples of other routes are dropped and the rate selects requests."""
+    sampler = SamplingProfiler()
+    sampler._loop_thread_id = threading.get_ident()
+    sampler.route = "/api/v1/manuals"
+
+    frame = sys._getframe()
+    sampler.enter(frame, {"method": "GET", "route": SimpleNamespace(path="/api/v1/sessions")})
+    handle_request(sampler)
+    sampler.exit(frame)
+
+    assert sampler.samples == 0
+    assert sampler.idle_samples == 1
+
+    sampler.active = True
+    sampler.sample_rate = 0.25
+    selected = sum(sampler.should_profile() for _ in range(4000))
+    assert 800 < selected < 1200
+
+
+def test_stats_are_read_while_sampling():
+    """Test stats and stacks can be read by a profiled request while the sampler adds stacks."""
+    sampler = SamplingProfiler()
+    sampler._loop_thread_id = threading.get_ident()
+    frame = sys._getframe()
+    sampler.enter(frame, {"method": "GET", "route": SimpleNamespace(path="/api/v1/admin/profiler")})
+
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            sampler._sample()
+
+    def poll(depth: int) -> None:
+        # Each depth is a new stack for the sampler to add
+        if depth:
+            return poll(depth - 1)
+        sampler.get_stats()
+        sampler.collapsed()
+
+    thread = threading.Thread(target=sample)
+    thread.start()
+    try:
+        for i in range(2000):
+            poll(i % 50)
+    finally:
+        done.set()
+        thread.join()
+        sampler.exit(frame)
+
+    assert sampler.samples > 0
+
+
+@pytest.mark.asyncio
+async def test_admin_endpoints_require_token(client, monkeypatch):
+    """Test the profiler is hidden without ADMIN_TOKEN and forbidden with a wrong token."""
+    response = await client.get("/api/v1/admin/profiler")
+    assert response.status_code == 404
+    assert response.json()["error"]["code"] == "ADMIN_DISABLED"
+
+    monkeypatch.setattr(deps.settings, "ADMIN_TOKEN", "right")
+    response = await client.get("/api/v1/admin/profiler", headers={"X-Admin-Token": "wrong"})
+    assert response.status_code == 403
+    assert response.json()["error"]["code"] == "ADMIN_FORBIDDEN"
+
+
+@pytest.mark.asyncio
+async def test_profile_live_requests(client, admin_token, sample_manual):
+    """Test a run started over HTTP collects stacks of the profiled route."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    route = "/api/v1/manuals"
+
+    response = await client.post(
+        "/api/v1/admin/profiler/start",
+        json={"duration_seconds": 30, "route": route, "interval_ms": 1},
+        headers=ADMIN_HEADERS,
+    )
+    assert response.status_code == 200
+    assert response.json()["active"] is True
+
+    for _ in range(500):
+        await client.get(route)
+        await client.get(f"{route}/{sample_manual['manual_id']}")
+        if profiler.samples >= 3:
+            break
+
+    stats = (await client.post("/api/v1/admin/profiler/stop", headers=ADMIN_HEADERS)).json()
+    assert stats["active"] is False
+    assert stats["requests_profiled"] > 0
+    assert list(stats["samples_by_route"]) == [f"GET {route}"]
+
+    collapsed = await client.get("/api/v1/admin/profiler/collapsed", params={"route": route}, headers=ADMIN_HEADERS)
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    assert all(line.startswith(f"GET {route};") for line in collapsed.text.splitlines())
+    assert "list_manuals (app/api/routes/manuals.py" in collapsed.text
@@ -1,6 +1,13 @@
 """Tests for progress endpoints."""
+import asyncio
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.schemas.progress import ProgressUpdate
+from app.services.progress_service import ProgressService
+from app.utils.exceptions import DuplicateProgressUpdateError, SessionEndedError
 
 
 @pytest.mark.asyncio
@@ -120,3 +127,82 @@ async def test_get_next_step_completed_session(client: AsyncClient, sample_manua
     data = response.json()
     assert data["is_completed"] is True
     assert data["next_step"] is None
+
+
+async def update_in_own_transaction(engine, session_id: str, **update) -> object:
+    """Run a progress update on its own connection, as a separate request would."""
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+        try:
+            return await ProgressService(db).update_progress(
+                session_id, ProgressUpdate(user_id="test-user-001", **update)
+            )
+        except Exception as e:
+            return e
+
+
+@pytest.mark.asyncio
+async def test_concurrent_updates_are_serialized(
+    client: AsyncClient, test_engine, test_session, sample_manual, sample_session
+):
+    """Test two simultaneous DONE updates for the same step increment the session once."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    session_id = sample_session["session_id"]
+
+    results = await asyncio.gather(*(
+        update_in_own_transaction(test_engine, session_id, current_step=1, step_status="DONE")
+        for _ in range(2)
+    ))
+
+    # The second update waited for the lock and saw the first one's step
+    assert sorted(result.previous_step for result in results) == [1, 2]
+    assert all(result.current_step == 2 for result in results)
+    row = (await test_session.execute(
+        text("SELECT current_step, version FROM sessions WHERE session_id = :id"), {"id": session_id}
+    )).one()
+    assert row.current_step == 2
+    assert row.version == 3
+    events = (await test_session.execute(
+        text("SELECT processed FROM progress_events ORDER BY created_at")
+    )).scalars().all()
+    assert sorted(events) == [False, True]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_is_rejected(client: AsyncClient, test_engine, sample_manual, sample_session):
+    """Test a duplicate idempotency key committed while waiting for the lock is a 409, not a second event."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+
+    results = await asyncio.gather(*(
+        update_in_own_transaction(
+            test_engine, sample_session["session_id"], current_step=1, step_status="DONE", idempotency_key="same"
+        )
+        for _ in range(2)
+    ))
+
+    assert sum(isinstance(result, DuplicateProgressUpdateError) for result in results) == 1
+    assert sorted(getattr(result, "current_step", 0) for result in results) == [0, 2]
+
+
+@pytest.mark.asyncio
+async def test_session_ended_while_waiting_for_lock(client: AsyncClient, test_engine, sample_manual, sample_session):
+    """Test an update blocked behind a transaction that ends the session reports the new status."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    session_id = sample_session["session_id"]
+
+    async with test_engine.connect() as other:
+        await other.execute(text("SELECT 1 FROM sessions WHERE session_id = :id FOR UPDATE"), {"id": session_id})
+        update = asyncio.create_task(
+            update_in_own_transaction(test_engine, session_id, current_step=1, step_status="DONE")
+        )
+        await asyncio.sleep(0.2)
+        await other.execute(
+            text("UPDATE sessions SET status = 'abandoned' WHERE session_id = :id"), {"id": session_id}
+        )
+        await other.commit()
+
+    result = await asyncio.wait_for(update, timeout=5)
+    assert isinstance(result, SessionEndedError)
+    assert "abandoned" in result.message
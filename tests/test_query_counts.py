@@ -0,0 +1,91 @@
+"""Query budgets per endpoint, to catch N+1 regressions."""
+import pytest
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.utils.query_stats import track_queries
+
+# Writes that notify the webhook also insert into the outbox
+OUTBOX_INSERT = int(get_settings().WEBHOOK_ENABLED)
+
+
+async def create_session(client, sample_manual, sample_session) -> str:
+    """Create the sample manual and session; return the session ID."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    return sample_session["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_track_queries_nests(test_session):
+    """Test statements count in the current scope and every enclosing one."""
+    with track_queries() as outer:
+        await test_session.execute(text("SELECT 1"))
+        with track_queries(keep_statements=True) as inner:
+            await test_session.execute(text("SELECT 2"))
+
+    assert outer.count == 2
+    assert inner.count == 1
+    assert inner.statements == ["SELECT 2"]
+    assert outer.statements is None
+    assert inner.seconds > 0
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(client, sample_manual, sample_session):
+    """Test responses report their query count and database time."""
+    session_id = await create_session(client, sample_manual, sample_session)
+
+    response = await client.get(f"/api/v1/sessions/{session_id}")
+
+    db, app = response.headers["Server-Timing"].split(", ")
+    assert db.startswith("db;dur=") and db.endswith(';desc="3 queries"')
+    assert app.startswith("app;dur=")
+
+
+@pytest.mark.asyncio
+async def test_write_endpoint_query_budgets(
+    client, max_queries, sample_manual, sample_session, sample_message, sample_progress
+):
+    """Test each write endpoint stays within its query budget."""
+    with max_queries(6):
+        await client.post("/api/v1/manuals", json=sample_manual)
+    with max_queries(4 + OUTBOX_INSERT):
+        await client.post("/api/v1/sessions", json=sample_session)
+
+    url = f"/api/v1/sessions/{sample_session['session_id']}"
+    with max_queries(4):
+        assert (await client.post(f"{url}/messages", json=sample_message)).status_code == 201
+    # Validation, event insert and increment are one statement, plus the outbox insert
+    # and, on a cold manual cache, the manual and its steps
+    with max_queries(3 + OUTBOX_INSERT):
+        assert (await client.post(f"{url}/progress", json=sample_progress)).status_code == 200
+    with max_queries(1 + OUTBOX_INSERT):
+        assert (await client.post(f"{url}/progress", json={**sample_progress, "current_step": 2})).status_code == 200
+    with max_queries(5 + OUTBOX_INSERT):
+        assert (await client.patch(url, json={"status": "abandoned"})).status_code == 200
+    # Messages and progress events go by ON DELETE CASCADE, not one DELETE each
+    with max_queries(4):
+        assert (await client.delete(url)).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_read_endpoint_query_budgets(client, max_queries, sample_manual, sample_session):
+    """Test reads stay within budget and list queries do not grow with the page size."""
+    session_id = await create_session(client, sample_manual, sample_session)
+    for i in range(10):
+        await client.post("/api/v1/sessions", json={**sample_session, "session_id": f"extra-{i}"})
+        await client.post(f"/api/v1/sessions/{session_id}/messages", json={"message": f"m{i}", "sender": "user"})
+
+    budgets = {
+        f"/api/v1/sessions/{session_id}": 3,  # Loads the manual into the cache
+        f"/api/v1/sessions/{session_id}/next-step": 1,
+        f"/api/v1/manuals/{sample_manual['manual_id']}": 0,  # Served from the cache
+        "/api/v1/manuals": 3,
+        f"/api/v1/sessions?user_id={sample_session['user_id']}": 3,
+        f"/api/v1/sessions/{session_id}/messages": 3,
+        "/api/v1/analytics/overview": 6,
+    }
+    for path, budget in budgets.items():
+        with max_queries(budget):
+            assert (await client.get(path)).status_code == 200
@@ -0,0 +1,199 @@
+"""Tests for the sliding window counter rate limiter."""
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.middleware.rate_limiter import MAX_CLIENT_ID_LENGTH, InMemoryRateLimiter, get_client_id
+from app.middleware.shared_rate_limiter import (
+    LocalCounterStore,
+    PostgresCounterStore,
+    SharedRateLimiter,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_limiter(clock: FakeClock, **kwargs) -> InMemoryRateLimiter:
+    """Create a limiter with small limits driven by a fake clock."""
+    options = {"requests_per_minute": 10, "requests_per_hour": 100, "clock": clock}
+    options.update(kwargs)
+    return InMemoryRateLimiter(**options)
+
+
+def test_minute_limit_and_retry_after():
+    """Test requests over the minute limit are rejected with a retry hint."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+
+    for _ in range(10):
+        assert limiter.is_allowed("client") == (True, 0)
+
+    allowed, retry_after = limiter.is_allowed("client")
+    assert not allowed
+    assert 60 < retry_after <= 121
+    assert limiter.get_remaining("client")["minute"]["remaining"] == 0
+
+    # Other clients are unaffected
+    assert limiter.is_allowed("other")[0]
+
+
+def test_sliding_window_decays_previous_window():
+    """Test the previous window's count decays as the window slides."""
+    clock = FakeClock()
+    limiter = make_limiter(clock)
+    for _ in range(10):
+        limiter.is_allowed("client")
+
+    # Halfway into the next window half of the previous count still applies
+    clock.now += 90
+    remaining = limiter.get_remaining("client")["minute"]["remaining"]
+    assert remaining == 5
+    for _ in range(5):
+        assert limiter.is_allowed("client")[0]
+    assert not limiter.is_allowed("client")[0]
+
+    # Two windows later everything has decayed
+    clock.now += 120
+    assert limiter.get_remaining("client")["minute"]["remaining"] == 10
+
+
+def test_hour_limit():
+    """Test the hour limit applies across minute windows."""
+    clock = FakeClock()
+    limiter = make_limiter(clock, requests_per_minute=1000, requests_per_hour=20)
+    for _ in range(20):
+        assert limiter.is_allowed("client")[0]
+
+    clock.now += 120
+    allowed, retry_after = limiter.is_allowed("client")
+    assert not allowed
+    assert retry_after > 3000
+
+
+def test_idle_clients_are_evicted():
+    """Test idle clients are swept and the client table is bounded."""
+    clock = FakeClock()
+    limiter = make_limiter(clock, max_clients=50, sweep_interval_seconds=60)
+
+    for i in range(80):
+        limiter.is_allowed(f"client-{i}")
+    assert len(limiter.clients) == 50
+    assert limiter.evicted == 30
+
+    # The least recently seen clients go first
+    assert "client-79" in limiter.clients
+    assert "client-0" not in limiter.clients
+
+    clock.now += 2 * 3600 + 1
+    limiter.is_allowed("fresh")
+    assert list(limiter.clients) == ["fresh"]
+
+
+def make_worker(store, clock: FakeClock, **kwargs) -> SharedRateLimiter:
+    """Create a shared limiter as one worker would."""
+    options = {
+        "requests_per_minute": 10,
+        "requests_per_hour": 100,
+        "sync_interval_seconds": 1.0,
+        "sync_batch_size": 1000,
+        "clock": clock,
+    }
+    options.update(kwargs)
+    return SharedRateLimiter(store, **options)
+
+
+@pytest.mark.asyncio
+async def test_shared_limit_holds_across_workers():
+    """Test two workers sharing a store enforce one combined limit."""
+    clock = FakeClock()
+    store = LocalCounterStore()
+    first, second = make_worker(store, clock), make_worker(store, clock)
+
+    for _ in range(6):
+        assert first.is_allowed("client")[0]
+    await first.flush()
+
+    for _ in range(4):
+        assert second.is_allowed("client")[0]
+    await second.flush()
+
+    # The second worker now knows about the first worker's requests
+    assert not second.is_allowed("client")[0]
+    assert second.get_remaining("client")["minute"]["remaining"] == 0
+
+    await first.flush()
+    assert store.counters[("client", "minute", 960)] == 10
+
+
+@pytest.mark.asyncio
+async def test_shared_flush_is_batched_and_lazy():
+    """Test increments are pushed in the background once a batch fills."""
+    clock = FakeClock()
+    store = LocalCounterStore()
+    worker = make_worker(store, clock, requests_per_minute=1000, sync_batch_size=5)
+
+    for i in range(4):
+        worker.is_allowed(f"client-{i}")
+    assert store.increments == 0
+
+    worker.is_allowed("client-4")
+    await worker._flush_task
+    assert store.increments == 1
+    assert sum(count for (_, window, _), count in store.counters.items() if window == "minute") == 5
+
+
+@pytest.mark.asyncio
+async def test_postgres_counter_store(test_engine):
+    """Test the Postgres store adds batches atomically and returns totals."""
+    session_maker = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    store = PostgresCounterStore(session_maker)
+
+    key = ("10.0.0.1", "minute", 960)
+    assert await store.increment({key: 3}) == {key: 3}
+    assert await asyncio.gather(store.increment({key: 2}), store.increment({key: 4})) in (
+        [{key: 5}, {key: 9}],
+        [{key: 9}, {key: 7}],
+    )
+    assert await store.prune(961) == 1
+
+
+def test_client_id_is_bounded():
+    """Test client IDs from forwarding headers fit the counter table's column."""
+    def scope(forwarded: str) -> dict:
+        return {"type": "http", "headers": [(b"x-forwarded-for", forwarded.encode())], "client": ("10.0.0.9", 1)}
+
+    assert get_client_id(scope("203.0.113.7, 10.0.0.1")) == "203.0.113.7"
+
+    long_id = get_client_id(scope("a" * 500))
+    assert len(long_id) <= MAX_CLIENT_ID_LENGTH
+    assert long_id == get_client_id(scope("a" * 500))
+    assert long_id != get_client_id(scope("b" * 500))
+
+
+@pytest.mark.asyncio
+async def test_rejected_counter_is_dropped(test_engine):
+    """Test a counter the store rejects is dropped without blocking the rest of the batch."""
+    session_maker = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    clock = FakeClock()
+    worker = make_worker(PostgresCounterStore(session_maker), clock)
+
+    worker.is_allowed("10.0.0.1")
+    worker.is_allowed("x" * (MAX_CLIENT_ID_LENGTH + 1))
+
+    await worker.flush()
+    assert worker.get_stats()["pending_counters"] == 0
+    assert worker.dropped_counters == 2
+    assert worker._shared[("10.0.0.1", "minute", 960)] == 1
+
+    # Later flushes are not held up by the dropped counter
+    worker.is_allowed("10.0.0.1")
+    assert await worker.flush() == 2
+    assert worker._shared[("10.0.0.1", "minute", 960)] == 2
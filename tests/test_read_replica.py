@@ -0,0 +1,132 @@
+"""Tests for read-replica routing and read-your-writes."""
+import os
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.api import deps
+from app.database import Base
+from app.main import app
+from app.services.recent_writes import RecentWrites, recent_writes, session_key, user_key
+from tests.conftest import TEST_DATABASE_URL
+
+# A second database standing in for the replica; it never receives the writes
+TEST_READ_DATABASE_URL = os.getenv(
+    "TEST_READ_DATABASE_URL",
+    make_url(TEST_DATABASE_URL).set(database="sessions_replica").render_as_string(hide_password=False),
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_recent_writes_expire_after_window():
+    """Test keys count as recent only within the window."""
+    clock = FakeClock()
+    writes = RecentWrites(window_seconds=5, clock=clock)
+    writes.session_written("s1", "u1")
+
+    assert writes.is_recent(session_key("s1"))
+    assert writes.is_recent(user_key("other"), user_key("u1"))
+    assert not writes.is_recent(session_key("s2"))
+
+    clock.now += 5
+    assert not writes.is_recent(session_key("s1"))
+    assert writes.get_stats()["recent_keys"] == 0
+
+
+def test_recent_writes_bounded():
+    """Test the oldest keys are dropped beyond `max_keys`, and a zero window records nothing."""
+    writes = RecentWrites(window_seconds=5, max_keys=2, clock=FakeClock())
+    writes.record("a", "b", "c")
+
+    assert not writes.is_recent("a")
+    assert writes.is_recent("b") and writes.is_recent("c")
+
+    disabled = RecentWrites(window_seconds=0)
+    disabled.record("a")
+    assert not disabled.is_recent("a")
+
+
+@pytest_asyncio.fixture
+async def replica_session(client, monkeypatch):
+    """Route reads to an empty second database, as a lagging replica would."""
+    url = make_url(TEST_READ_DATABASE_URL)
+    admin = create_async_engine(TEST_DATABASE_URL, isolation_level="AUTOCOMMIT")
+    try:
+        async with admin.connect() as conn:
+            exists = (await conn.execute(
+                text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": url.database}
+            )).scalar()
+            if not exists:
+                await conn.execute(text(f'CREATE DATABASE "{url.database}"'))
+    except Exception as e:
+        pytest.skip(f"Replica database unavailable: {e}")
+    finally:
+        await admin.dispose()
+
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        async def override_get_read_db():
+            yield session
+
+        app.dependency_overrides[deps.get_read_db] = override_get_read_db
+        monkeypatch.setattr(deps, "has_read_replica", lambda: True)
+        yield session
+
+    async with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_follow_own_writes_then_replica(
+    client, replica_session, sample_manual, sample_session, sample_message
+):
+    """Test lists are read from the primary right after a write and from the replica after."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    session_id = sample_session["session_id"]
+    await client.post(f"/api/v1/sessions/{session_id}/messages", json=sample_message)
+
+    sessions_url = f"/api/v1/sessions?user_id={sample_session['user_id']}"
+    messages_url = f"/api/v1/sessions/{session_id}/messages"
+    assert (await client.get(sessions_url)).json()["total"] == 1
+    assert (await client.get(messages_url)).json()["total"] == 1
+    assert (await client.get("/api/v1/manuals")).json()["total"] == 1
+    assert recent_writes.primary_reads >= 3
+
+    # Once the window has passed the (empty) replica answers
+    recent_writes.clear()
+    assert (await client.get(sessions_url)).json()["total"] == 0
+    assert (await client.get(messages_url)).status_code == 404
+    assert (await client.get("/api/v1/manuals")).json()["total"] == 0
+
+    # Another user's writes do not pull this user's reads to the primary
+    await client.post("/api/v1/sessions", json={**sample_session, "session_id": "other", "user_id": "other"})
+    assert (await client.get(sessions_url)).json()["total"] == 0
+    assert (await client.get("/api/v1/sessions?user_id=other")).json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_analytics_read_from_replica(client, replica_session, sample_manual):
+    """Test analytics run on the replica without writing to it."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+
+    response = await client.get("/api/v1/analytics/overview")
+
+    assert response.status_code == 200
+    assert response.json()["manuals"]["total"] == 0
+    rows = (await replica_session.execute(text("SELECT count(*) FROM analytics_totals"))).scalar()
+    assert rows == 0
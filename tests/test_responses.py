@@ -0,0 +1,80 @@
+"""Tests for fast JSON rendering of API responses."""
+import json
+from datetime import datetime, timezone
+from uuid import UUID
+import pytest
+
+from app.schemas.message import MessageListResponse
+from app.schemas.session import SessionListResponse
+from app.utils import responses
+from app.utils.responses import FastJSONResponse
+
+
+CONTENT = {
+    "id": UUID("12345678-1234-5678-1234-567812345678"),
+    "created_at": datetime(2024, 1, 2, 3, 4, 5, 120000, tzinfo=timezone.utc),
+    "ended_at": None,
+    "counts": {1: 2},
+    "text": "étape ✓",
+    "duration_seconds": 1.5,
+}
+
+EXPECTED = {
+    "id": "12345678-1234-5678-1234-567812345678",
+    "created_at": "2024-01-02T03:04:05.120000Z",
+    "ended_at": None,
+    "counts": {"1": 2},
+    "text": "étape ✓",
+    "duration_seconds": 1.5,
+}
+
+
+def test_fast_json_response_encodes_rows():
+    """Test UUIDs, UTC datetimes and int keys render like Pydantic output."""
+    response = FastJSONResponse(CONTENT)
+
+    assert json.loads(response.body) == EXPECTED
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_stdlib_fallback_matches(monkeypatch):
+    """Test the fallback without orjson produces the same document."""
+    fast = responses.dumps(CONTENT)
+    monkeypatch.setattr(responses, "orjson", None)
+
+    assert responses.dumps(CONTENT) == fast
+
+
+@pytest.mark.asyncio
+async def test_session_list_matches_schema(client, sample_manual, sample_session):
+    """Test the list rendered from rows matches the single-session response."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    created = (await client.post("/api/v1/sessions", json=sample_session)).json()
+
+    response = await client.get("/api/v1/sessions")
+
+    assert response.status_code == 200
+    data = response.json()
+    SessionListResponse.model_validate(data)
+    listed = data["sessions"][0]
+    single = (await client.get(f"/api/v1/sessions/{sample_session['session_id']}")).json()
+    # duration_seconds is computed at request time for active sessions
+    for body in (listed, single, created):
+        body.pop("duration_seconds")
+    assert listed == single == created
+
+
+@pytest.mark.asyncio
+async def test_message_list_matches_schema(client, sample_manual, sample_session, sample_message):
+    """Test messages rendered from rows match the created message."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    session_id = sample_session["session_id"]
+    created = await client.post(f"/api/v1/sessions/{session_id}/messages", json=sample_message)
+
+    response = await client.get(f"/api/v1/sessions/{session_id}/messages")
+
+    assert response.status_code == 200
+    data = response.json()
+    MessageListResponse.model_validate(data)
+    assert data["messages"] == [created.json()]
@@ -0,0 +1,92 @@
+"""Tests for the precomputed step funnel."""
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models import StepFunnel
+from app.services.analytics_counters import analytics_counters
+from app.services.analytics_service import histogram_median
+
+
+async def post_progress(client: AsyncClient, session_id: str, step: int, status: str = "DONE"):
+    """Submit a progress update."""
+    response = await client.post(f"/api/v1/sessions/{session_id}/progress", json={
+        "user_id": "test-user-001",
+        "current_step": step,
+        "step_status": status,
+    })
+    assert response.status_code == 200
+
+
+async def get_steps(client: AsyncClient, manual_id: str) -> dict:
+    """Fetch step analytics keyed by step number."""
+    response = await client.get(f"/api/v1/analytics/manuals/{manual_id}/steps")
+    return {step["step_number"]: step for step in response.json()["step_analytics"]}
+
+
+async def create_funnel(client: AsyncClient, sample_manual, sample_session):
+    """Create one session that completes step 1 and one abandoned on step 1."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+    await client.post("/api/v1/sessions", json={**sample_session, "session_id": "quitter"})
+
+    await post_progress(client, sample_session["session_id"], 1, "ONGOING")
+    await post_progress(client, sample_session["session_id"], 1)
+    await post_progress(client, "quitter", 1, "ONGOING")
+    await client.patch("/api/v1/sessions/quitter", json={"status": "abandoned"})
+
+
+@pytest.mark.asyncio
+async def test_funnel_counts(client: AsyncClient, test_session, sample_manual, sample_session):
+    """Test the funnel tracks attempts, completions, drop-offs and time."""
+    await create_funnel(client, sample_manual, sample_session)
+
+    steps = await get_steps(client, sample_manual["manual_id"])
+    assert steps[1]["attempts"] == 3
+    assert steps[1]["completions"] == 1
+    assert steps[1]["drop_offs"] == 1
+    assert steps[1]["median_time_on_step_seconds"] is not None
+
+    # Same answer once flushed to the table
+    await analytics_counters.flush(test_session)
+    rows = (await test_session.execute(select(StepFunnel))).scalars().all()
+    assert len(rows) == 1
+    assert await get_steps(client, sample_manual["manual_id"]) == steps
+
+
+@pytest.mark.asyncio
+async def test_flush_merges_histograms(client: AsyncClient, test_session, sample_manual, sample_session):
+    """Test repeated flushes add to existing funnel rows."""
+    await create_funnel(client, sample_manual, sample_session)
+    await analytics_counters.flush(test_session)
+
+    await post_progress(client, sample_session["session_id"], 2)
+    await analytics_counters.flush(test_session)
+
+    steps = await get_steps(client, sample_manual["manual_id"])
+    assert steps[1]["attempts"] == 3
+    assert steps[2]["attempts"] == 1
+
+    rows = (await test_session.execute(select(StepFunnel))).scalars().all()
+    for row in rows:
+        await test_session.refresh(row)
+    assert sum(sum(row.time_histogram) for row in rows) == 2
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_live(client: AsyncClient, test_session, sample_manual, sample_session):
+    """Test rebuilding from progress events reproduces the live funnel."""
+    await create_funnel(client, sample_manual, sample_session)
+    await analytics_counters.flush(test_session)
+    live = await get_steps(client, sample_manual["manual_id"])
+
+    await analytics_counters.rebuild_step_funnel(test_session)
+    assert await get_steps(client, sample_manual["manual_id"]) == live
+
+
+def test_histogram_median():
+    """Test the median is interpolated within its bucket."""
+    assert histogram_median([0] * 15) is None
+    # Two values in (0, 5] and two in [10, 15): median lies at the bucket edge
+    assert histogram_median([2, 0, 2] + [0] * 12) == 5
+    assert histogram_median([0] * 14 + [3]) == 3600
@@ -0,0 +1,109 @@
+"""Tests for the claim-based webhook dispatcher."""
+import asyncio
+import json
+from datetime import datetime, timezone
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import WebhookQueueItem
+from app.services.webhook_retry_service import WebhookRetryService
+
+
+@pytest_asyncio.fixture
+async def session_maker(test_engine):
+    """Session factory bound to the test database."""
+    return async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@pytest_asyncio.fixture
+async def queued_items(session_maker):
+    """Queue 30 due webhook events."""
+    async with session_maker() as db:
+        service = WebhookRetryService(session_maker)
+        for i in range(30):
+            service.enqueue(db, {"n": i}, "progress_update", f"session-{i}")
+        await db.commit()
+
+
+def make_service(session_maker, batch_size: int = 20) -> WebhookRetryService:
+    """Create an enabled dispatcher bound to the test database."""
+    service = WebhookRetryService(session_maker)
+    service.enabled = True
+    service.batch_size = batch_size
+    return service
+
+
+async def get_items(session_maker) -> list[WebhookQueueItem]:
+    """Get all queued items."""
+    async with session_maker() as db:
+        result = await db.execute(select(WebhookQueueItem))
+        return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_are_disjoint(session_maker, queued_items):
+    """Test two workers claiming at once never receive the same row."""
+    first = make_service(session_maker)
+    second = make_service(session_maker)
+
+    (items_a, _), (items_b, _) = await asyncio.gather(
+        first.claim_batch(), second.claim_batch()
+    )
+
+    ids_a = {item.id for item in items_a}
+    ids_b = {item.id for item in items_b}
+    assert not ids_a & ids_b
+    assert len(ids_a | ids_b) == 30
+
+    # Claimed items are leased and not due again
+    again, _ = await first.claim_batch()
+    assert again == []
+
+
+@pytest.mark.asyncio
+async def test_process_records_outcomes(session_maker, queued_items):
+    """Test deliveries are recorded as success or scheduled for retry."""
+    service = make_service(session_maker, batch_size=50)
+
+    async def fake_send(payload):
+        if payload["n"] % 2 == 0:
+            return True, None
+        return False, "HTTP 503"
+
+    service._send_webhook = fake_send
+
+    assert await service.process_retry_queue() == 30
+
+    items = await get_items(session_maker)
+    succeeded = [i for i in items if i.status == "success"]
+    retrying = [i for i in items if i.status == "pending"]
+    assert len(succeeded) == 15
+    assert len(retrying) == 15
+    assert all(i.attempts == 1 for i in items)
+    assert all(i.last_error == "HTTP 503" for i in retrying)
+    assert all(json.loads(i.payload)["n"] % 2 == 1 for i in retrying)
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_outcome_is_discarded(session_maker, queued_items):
+    """Test a worker whose lease was taken over cannot overwrite the row."""
+    service = make_service(session_maker, batch_size=50)
+    items, lease_until = await service.claim_batch()
+
+    # Simulate another worker re-claiming after the lease expired
+    async with session_maker() as db:
+        for item in await get_items(session_maker):
+            row = await db.get(WebhookQueueItem, item.id)
+            row.next_retry_at = datetime(2000, 1, 1, tzinfo=timezone.utc)
+        await db.commit()
+
+    async def fake_send(payload):
+        return True, None
+
+    service._send_webhook = fake_send
+    service.claim_batch = lambda: asyncio.sleep(0, result=(items, lease_until))
+    await service.process_retry_queue()
+
+    assert all(i.status == "pending" for i in await get_items(session_maker))
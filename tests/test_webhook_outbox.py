@@ -0,0 +1,85 @@
+"""Tests for the transactional webhook outbox."""
+import json
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+
+from app.models import WebhookQueueItem
+from app.services import feedback_service
+
+
+@pytest.fixture
+def webhooks_enabled(monkeypatch):
+    """Enable webhook events without a dispatcher running."""
+    monkeypatch.setattr(feedback_service.settings, "WEBHOOK_ENABLED", True)
+
+
+async def get_queued_events(test_session) -> list[WebhookQueueItem]:
+    """Get all queued webhook events in insertion order."""
+    result = await test_session.execute(
+        select(WebhookQueueItem).order_by(WebhookQueueItem.created_at)
+    )
+    return list(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_progress_update_writes_outbox_event(
+    client: AsyncClient, test_session, webhooks_enabled, sample_manual, sample_session, sample_progress
+):
+    """Test progress updates queue their webhook instead of sending it inline."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+
+    response = await client.post(
+        f"/api/v1/sessions/{sample_session['session_id']}/progress",
+        json=sample_progress
+    )
+    assert response.status_code == 200
+    assert response.json()["feedback_sent"] is True
+
+    events = await get_queued_events(test_session)
+    assert [e.event_type for e in events] == ["session_created", "progress_update"]
+
+    progress_event = events[1]
+    assert progress_event.status == "pending"
+    assert progress_event.attempts == 0
+    payload = json.loads(progress_event.payload)
+    assert payload["previous_step"] == 1
+    assert payload["current_step"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_update_writes_no_outbox_event(
+    client: AsyncClient, test_session, webhooks_enabled, sample_manual, sample_session
+):
+    """Test rejected updates do not leave webhook events behind."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+
+    response = await client.post(
+        f"/api/v1/sessions/{sample_session['session_id']}/progress",
+        json={"user_id": "test-user-001", "current_step": 99, "step_status": "DONE"}
+    )
+    assert response.status_code == 400
+
+    events = await get_queued_events(test_session)
+    assert [e.event_type for e in events] == ["session_created"]
+
+
+@pytest.mark.asyncio
+async def test_session_end_writes_outbox_event(
+    client: AsyncClient, test_session, webhooks_enabled, sample_manual, sample_session
+):
+    """Test ending a session queues a session_ended event."""
+    await client.post("/api/v1/manuals", json=sample_manual)
+    await client.post("/api/v1/sessions", json=sample_session)
+
+    response = await client.patch(
+        f"/api/v1/sessions/{sample_session['session_id']}",
+        json={"status": "abandoned"}
+    )
+    assert response.status_code == 200
+
+    events = await get_queued_events(test_session)
+    assert events[-1].event_type == "session_ended"
+    assert json.loads(events[-1].payload)["status"] == "abandoned"